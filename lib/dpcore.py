@@ -8,17 +8,103 @@ import hashlib
 import base64
 import datetime
 import shutil
+import cPickle
+import json
+import time
+import errno
+import socket
+import select
+import signal
+import threading
+import mmap
+import StringIO
+import shlex
+import bisect
+import operator
+import math
+import itertools
+import array
+import stat
+import tempfile
+import fcntl
 
 import yaml
 
+try:
+	from yaml import CSafeLoader as _LibYAMLLoader
+	from yaml import CDumper as _LibYAMLDumper
+except ImportError:
+	_LibYAMLLoader = None
+	_LibYAMLDumper = None
+
 
 
 _rt_config = None	# runtime configuration
 
 
+_yaml_loader = yaml.SafeLoader
+_yaml_dumper = yaml.Dumper
+_yaml_backend = "python"
+
+def select_yaml_backend(use_libyaml=True):
+	""" select the loader/emitter implementation used to read and write project files
+
+	The libyaml (C) implementation is used when requested and available,
+	otherwise fall back to the pure-Python implementation of PyYAML. Both
+	backends emit identical documents for the node trees built by
+	yamlnodedump_project().
+
+	Argument:
+		use_libyaml - prefer libyaml based loader and emitter
+	Return:
+		name of selected backend ("libyaml" or "python")
+	"""
+
+	global _yaml_loader, _yaml_dumper, _yaml_backend
+
+	if use_libyaml and (_LibYAMLLoader is not None) and (_LibYAMLDumper is not None):
+		_yaml_loader = _LibYAMLLoader
+		_yaml_dumper = _LibYAMLDumper
+		_yaml_backend = "libyaml"
+	else:
+		_yaml_loader = yaml.SafeLoader
+		_yaml_dumper = yaml.Dumper
+		_yaml_backend = "python"
+
+	return _yaml_backend
+# ### def select_yaml_backend
+
+def get_yaml_backend():
+	""" return name of currently selected YAML backend ("libyaml" or "python") """
+
+	return _yaml_backend
+# ### def get_yaml_backend
+
+select_yaml_backend()
+
+
+_log_store_enabled = False
+
+def select_log_store(use_columnar=False):
+	""" select how log records of projects loaded afterward are kept
+
+	Argument:
+		use_columnar - keep log records in a column-oriented LogStore of each project instead of one Log object per record
+	Return:
+		True if column-oriented log store is selected
+	"""
+
+	global _log_store_enabled
+	_log_store_enabled = bool(use_columnar)
+	return _log_store_enabled
+# ### def select_log_store
+
+
 class IdentifiableObject(object):
 	""" defined an interface for objects which can have an identify"""
 
+	__slots__ = ()
+
 	def __init__(self, *args, **kwargs):
 		super(IdentifiableObject, self).__init__(*args, **kwargs)
 	# ### def __init__
@@ -36,6 +122,52 @@ class IdentifiableObject(object):
 	# ### def get_object_signature
 # ### class IdentifiableObject
 
+_set_attribute = object.__setattr__	# assign attribute without marking object modified (for constructors, which leave objects modified anyway)
+
+class TrackedObject(object):
+	""" defined an interface for objects which track whether they are modified since loaded
+
+	Assigning any public attribute (ex: story.note = ...) marks the object
+	modified, internal attributes (with leading underscore) do not.
+
+	Sub-classes with __slots__ should have a "_modified" slot.
+	"""
+
+	__slots__ = ()
+
+	def __init__(self, *args, **kwargs):
+		super(TrackedObject, self).__init__(*args, **kwargs)
+
+		_set_attribute(self, "_modified", True)
+	# ### def __init__
+
+	def __setattr__(self, name, value):
+		object.__setattr__(self, name, value)
+		if "_" != name[0]:
+			object.__setattr__(self, "_modified", True)
+	# ### def __setattr__
+
+	def __setstate__(self, state):
+		# restore unpickled attributes as they are (including the modified flag)
+		for s in state:
+			if s:
+				for k, v, in s.iteritems():
+					_set_attribute(self, k, v)
+	# ### def __setstate__
+
+	def is_modified(self):
+		return self._modified
+	# ### def is_modified
+
+	def mark_modified(self):
+		self._modified = True
+	# ### def mark_modified
+
+	def clear_modified(self):
+		self._modified = False
+	# ### def clear_modified
+# ### class TrackedObject
+
 def __build_object_id(sig, attempt, prefix):
 	""" create id for given object signature
 
@@ -132,78 +264,578 @@ def _get_tstamp_string(tstamp=None):
 	return "%04d-%02d-%02d %02d:%02d:%02d" % (tstamp.year, tstamp.month, tstamp.day, tstamp.hour, tstamp.minute, tstamp.second,)
 # ### def _get_tstamp_string
 
+_command_context = None	# (timestamp, author) of command being run or replayed from journal
+
+def _get_command_time():
+	""" get time for records made by current command (current time if not in a command context) """
+
+	if _command_context is not None:
+		return _command_context[0]
+	return datetime.datetime.now()
+# ### def _get_command_time
+
+def _get_command_author():
+	""" get author for records made by current command (configured user if not given by command context) """
+
+	if (_command_context is not None) and (_command_context[1] is not None):
+		return _command_context[1]
+	return _rt_config.username
+# ### def _get_command_author
+
+def run_command(proj, cmdfunc, cmdargs, tstamp, author=None):
+	""" run command with fixed timestamp and author so that it can be replayed identically
+
+	Argument:
+		proj - DevelopmentProject object
+		cmdfunc - command function
+		cmdargs - command arguments
+		tstamp - timestamp for status and log records made by the command
+		author - author of log records made by the command, use configured user if None
+	Return:
+		result of command function
+	"""
+
+	global _command_context
+	prev_context = _command_context
+	_command_context = (tstamp, author,)
+	try:
+		return cmdfunc(proj, cmdargs)
+	finally:
+		_command_context = prev_context
+		if (not _is_readonly_command(cmdfunc)) and (getattr(proj, "_registry", None) is not None):
+			proj._registry.drop_field_index()
+# ### def run_command
+
 
 
+_EMPTY_CONTAINER = ()	# shared by objects which have no sub-story, task or log until first append
+
+def _compact_list(items):
+	""" get list of given items, or the shared empty container if there is no item """
+
+	if items:
+		return list(items)
+	return _EMPTY_CONTAINER
+# ### def _compact_list
+
 class StoryContainer(object):
+	__slots__ = ()
+
 	def __init__(self, *args, **kwargs):
 		super(StoryContainer, self).__init__(*args, **kwargs)
 
-		self.substory = []
+		_set_attribute(self, "substory", _EMPTY_CONTAINER)
 	# ### def __init__
 
 	def append_substory(self, substory):
+		if self.substory is _EMPTY_CONTAINER:
+			self.substory = []
 		if isinstance(substory, Story):
 			self.substory.append(substory)
+			_adopt_objects(self, (substory,))
 		elif isinstance(substory, (list, tuple,)) and (len(substory) > 0):
 			self.substory.extend(substory)
+			_adopt_objects(self, substory)
+		else:
+			return
+		_rollup_appended_objects(self, (substory,) if isinstance(substory, Story) else substory)
+		self._modified = True
 	# ### def append_substory
 # ### class StoryContainer
 
 class TaskContainer(object):
+	__slots__ = ()
+
 	def __init__(self, *args, **kwargs):
 		super(TaskContainer, self).__init__(*args, **kwargs)
 
-		self.subtask = []
+		_set_attribute(self, "subtask", _EMPTY_CONTAINER)
 	# ### def __init__
 
 	def append_subtask(self, subtask):
+		if self.subtask is _EMPTY_CONTAINER:
+			self.subtask = []
 		if isinstance(subtask, Task):
 			self.subtask.append(subtask)
+			_adopt_objects(self, (subtask,))
 		elif isinstance(subtask, (list, tuple,)) and (len(subtask) > 0):
 			self.subtask.extend(subtask)
+			_adopt_objects(self, subtask)
+		else:
+			return
+		_rollup_appended_objects(self, (subtask,) if isinstance(subtask, Task) else subtask)
+		self._modified = True
 	# ### def append_subtask
 # ### class TaskContainer
 
 class LogContainer(object):
+	__slots__ = ()
+
 	def __init__(self, *args, **kwargs):
 		super(LogContainer, self).__init__(*args, **kwargs)
 
-		self.logrecord = []
+		_set_attribute(self, "logrecord", _EMPTY_CONTAINER)
 	# ### def __init__
 
 	def append_log(self, logrec):
+		if self.logrecord is _EMPTY_CONTAINER:
+			self.logrecord = _new_log_container(self)
 		if isinstance(logrec, Log):
 			self.logrecord.append(logrec)
 		elif isinstance(logrec, (list, tuple,)) and (len(logrec) > 0):
 			self.logrecord.extend(logrec)
+		else:
+			return
+		self._modified = True
 	# ### def append_log
 # ### class LogContainer
 
+def _new_log_container(container, logrecs=()):
+	""" create container for log records of given story or task
+
+	Argument:
+		container - Story or Task object
+		logrecs - initial log records
+	Return:
+		LogView over log store of owning project if the project has one, list otherwise
+	"""
+
+	store = getattr(getattr(container, "_registry", None), "log_store", None)
+	if store is None:
+		return list(logrecs)
+	result = LogView(store)
+	result.extend(logrecs)
+	return result
+# ### def _new_log_container
+
+
+def _remove_object_from_list(l, obj):
+	""" remove given object from list (searching from the end, where recently added objects are) """
+
+	for idx in xrange(len(l) - 1, -1, -1):
+		if l[idx] is obj:
+			del l[idx]
+			return
+# ### def _remove_object_from_list
+
+class ObjectRegistry(object):
+	""" repository of stories and tasks of a project
+
+	Stories and tasks are registered into the active registry when they are
+	constructed. Each loaded project has its own registry which lives as long
+	as the project does.
+	"""
+
+	def __init__(self):
+		super(ObjectRegistry, self).__init__()
+
+		self.by_id = {}
+		self._stories = []
+		self._tasks = []
+		self._unregistered = set()	# id() of unregistered objects which are not removed from story and task lists yet
+
+		self._field_index = None
+		self._values = {}
+
+		self.log_store = LogStore() if _log_store_enabled else None
+	# ### def __init__
+
+	def __getstate__(self):
+		# unregistered objects and field index are keyed by id() of objects, rebuild index after unpickling
+		self._purge_unregistered()
+		state = self.__dict__.copy()
+		state["_field_index"] = None
+		return state
+	# ### def __getstate__
+
+	def _purge_unregistered(self):
+		""" remove unregistered objects from story and task lists in one pass """
+
+		if not self._unregistered:
+			return
+		unregistered = self._unregistered
+		self._stories = [o for o in self._stories if id(o) not in unregistered]
+		self._tasks = [o for o in self._tasks if id(o) not in unregistered]
+		unregistered.clear()
+	# ### def _purge_unregistered
+
+	def _get_stories(self):
+		self._purge_unregistered()
+		return self._stories
+	# ### def _get_stories
+
+	stories = property(_get_stories)
+
+	def _get_tasks(self):
+		self._purge_unregistered()
+		return self._tasks
+	# ### def _get_tasks
+
+	tasks = property(_get_tasks)
+
+	def register(self, obj):
+		""" add given story or task into this registry """
+
+		obj._registry = self
+		objid = obj.get_object_id()
+		if objid is not None:
+			self.by_id[objid] = obj
+		if id(obj) in self._unregistered:
+			# still in story or task list
+			self._unregistered.discard(id(obj))
+		elif isinstance(obj, Story):
+			self._stories.append(obj)
+		else:
+			self._tasks.append(obj)
+		self._field_index = None
+	# ### def register
+
+	def unregister(self, obj):
+		""" remove given story or task from this registry
+
+		The object is removed from story and task lists on next access of the
+		lists, so that unregistering does not scan through the whole project.
+		"""
+
+		objid = obj.get_object_id()
+		if (objid is not None) and (self.by_id.get(objid) is obj):
+			del self.by_id[objid]
+		self._unregistered.add(id(obj))
+		self._field_index = None
+	# ### def unregister
+
+	def adopt(self, obj):
+		""" move given object and its (built) descendants from their registry into this registry """
+
+		for o in itertools.chain((obj,), iterate_objects(obj, False)):
+			if o._registry is not self:
+				o._registry.unregister(o)
+				self.register(o)
+	# ### def adopt
+
+	def clear(self):
+		""" forget all registered objects """
+
+		self.by_id.clear()
+		del self._stories[:]
+		del self._tasks[:]
+		self._unregistered.clear()
+		self._field_index = None
+		self._values.clear()
+	# ### def clear
+
+	def find(self, objid):
+		return self.by_id.get(objid)
+	# ### def find
+
+	def get_objects(self, kind):
+		""" get registered objects of given kind
+
+		Argument:
+			kind - "story" or "task"
+		Return:
+			list of objects
+		"""
+
+		if "story" == kind:
+			return self.stories
+		elif "task" == kind:
+			return self.tasks
+		return []
+	# ### def get_objects
+
+	def get_parent(self, obj):
+		""" get story or task which contains given object
+
+		Argument:
+			obj - registered story or task
+		Return:
+			parent story or task, None for top-level story (or object not in any container)
+		"""
+
+		parent = obj._parent
+		if isinstance(parent, DevelopmentProject):
+			return None
+		return parent
+	# ### def get_parent
+
+	def drop_field_index(self):
+		""" forget field index of query (call after field values of registered objects are changed) """
+
+		self._field_index = None
+	# ### def drop_field_index
+
+	def intern_value(self, v):
+		""" get shared copy of given value (ex: author of logs) for objects of this registry
+
+		Argument:
+			v - a hashable value
+		Return:
+			the first seen value which is equal to given value
+		"""
+
+		if v is None:
+			return None
+		return self._values.setdefault(v, v)
+	# ### def intern_value
+
+	def prepare_object_id(self):
+		""" generate IDs for registered stories and then tasks """
+
+		for story in self.stories:
+			story.prepare_story_id()
+		for task in self.tasks:
+			task.prepare_task_id()
+	# ### def prepare_object_id
+# ### class ObjectRegistry
+
+_active_registry = ObjectRegistry()
+
+def get_active_registry():
+	return _active_registry
+# ### def get_active_registry
+
+def activate_registry(registry):
+	""" make given registry the one newly constructed stories and tasks are registered into
+
+	Argument:
+		registry - ObjectRegistry object
+	Return:
+		previously active registry
+	"""
+
+	global _active_registry
+	prev_registry = _active_registry
+	_active_registry = registry
+	return prev_registry
+# ### def activate_registry
+
+def _adopt_objects(container, objs):
+	""" set container as parent of objects appended into it and move them into registry of the container """
+
+	for obj in objs:
+		obj._parent = container
+	registry = getattr(container, "_registry", None)
+	if registry is None:
+		return
+	for obj in objs:
+		if obj._registry is not registry:
+			registry.adopt(obj)
+# ### def _adopt_objects
+
+
+def _get_status_word(task):
+	""" get status of given task without timestamp ("OPEN" for task without status) """
+
+	if task.status is None:
+		return "OPEN"
+	return task.status.split(" ", 1)[0].upper()
+# ### def _get_status_word
+
+class WorkRollup(object):
+	""" aggregate of stories, tasks, points and estimated time below a story or task
+
+	Each story and task keeps the rollup of its sub-stories and tasks (not
+	including itself). Rollups are computed bottom-up on load and updated
+	along the parent chain when objects are appended or status is changed.
+	"""
+
+	__slots__ = ("stories", "tasks", "done_tasks", "points", "done_points", "estimated_time", "done_estimated_time", "status_count",)
+
+	def __init__(self):
+		super(WorkRollup, self).__init__()
+
+		self.stories = 0
+		self.tasks = 0
+		self.done_tasks = 0
+		self.points = 0
+		self.done_points = 0
+		self.estimated_time = 0
+		self.done_estimated_time = 0
+		self.status_count = {}	# status word to number of tasks
+	# ### def __init__
+
+	def get_remaining_points(self):
+		return self.points - self.done_points
+	# ### def get_remaining_points
+
+	def get_remaining_estimated_time(self):
+		return self.estimated_time - self.done_estimated_time
+	# ### def get_remaining_estimated_time
+
+	def _add_status_count(self, k, n):
+		n = self.status_count.get(k, 0) + n
+		if 0 == n:
+			self.status_count.pop(k, None)
+		else:
+			self.status_count[k] = n
+	# ### def _add_status_count
+
+	def add_object(self, obj, sign=1):
+		""" add (or subtract) work of given story or task itself into this rollup
+
+		Argument:
+			obj - Story or Task object
+			sign - 1 to add, -1 to subtract
+		"""
+
+		if isinstance(obj, Story):
+			self.stories = self.stories + sign
+			return
+		point = (obj.point or 0) * sign
+		estimated_time = (obj.estimated_time or 0) * sign
+		self.tasks = self.tasks + sign
+		self.points = self.points + point
+		self.estimated_time = self.estimated_time + estimated_time
+		if (obj.status is not None) and _check_string_prefix(obj.status, "DONE"):
+			self.done_tasks = self.done_tasks + sign
+			self.done_points = self.done_points + point
+			self.done_estimated_time = self.done_estimated_time + estimated_time
+		self._add_status_count(_get_status_word(obj), sign)
+	# ### def add_object
+
+	def add(self, other, sign=1):
+		""" add (or subtract) given rollup into this rollup
+
+		Argument:
+			other - WorkRollup object
+			sign - 1 to add, -1 to subtract
+		"""
+
+		self.stories = self.stories + other.stories * sign
+		self.tasks = self.tasks + other.tasks * sign
+		self.done_tasks = self.done_tasks + other.done_tasks * sign
+		self.points = self.points + other.points * sign
+		self.done_points = self.done_points + other.done_points * sign
+		self.estimated_time = self.estimated_time + other.estimated_time * sign
+		self.done_estimated_time = self.done_estimated_time + other.done_estimated_time * sign
+		for k, n, in other.status_count.iteritems():
+			self._add_status_count(k, n * sign)
+	# ### def add
+
+	def __reduce__(self):
+		# the shared empty rollup is unpickled as the shared one, so that it is never modified in place
+		if self is _EMPTY_ROLLUP:
+			return "_EMPTY_ROLLUP"
+		return (WorkRollup, (), tuple([getattr(self, k) for k in WorkRollup.__slots__]),)
+	# ### def __reduce__
+
+	def __setstate__(self, state):
+		for k, v, in zip(WorkRollup.__slots__, state):
+			setattr(self, k, v)
+	# ### def __setstate__
+# ### class WorkRollup
+
+_EMPTY_ROLLUP = WorkRollup()	# shared by objects which have nothing below them, never modified
+
+def get_rollup(obj):
+	""" get aggregate of work below given object
+
+	Rollup of story or task is computed (bottom-up) on first request and
+	cached, rollup of project is summed up from its top-level stories.
+
+	Argument:
+		obj - DevelopmentProject, Story or Task object
+	Return:
+		WorkRollup object (should not be modified)
+	"""
+
+	if isinstance(obj, DevelopmentProject):
+		result = WorkRollup()
+		for story in obj.substory:
+			result.add_object(story)
+			result.add(get_rollup(story))
+		return result
+	if obj._rollup is None:
+		result = None
+		for child in itertools.chain(getattr(obj, "substory", ()), obj.subtask):
+			if result is None:
+				result = WorkRollup()
+			result.add_object(child)
+			result.add(get_rollup(child))
+		obj._rollup = _EMPTY_ROLLUP if (result is None) else result
+	return obj._rollup
+# ### def get_rollup
+
+def _propagate_rollup(obj, delta):
+	""" add given change of work into cached rollups of given object and its ancestors
+
+	An object without cached rollup stops the propagation, as rollups of its
+	ancestors are not cached either.
+	"""
+
+	registry = obj._registry
+	while (obj is not None) and (getattr(obj, "_rollup", None) is not None):
+		obj._rollup.add(delta)
+		obj = registry.get_parent(obj)
+# ### def _propagate_rollup
+
+def _rollup_appended_objects(container, objs):
+	""" add work of objects appended into container into cached rollups """
+
+	if getattr(container, "_rollup", None) is None:
+		return
+	delta = WorkRollup()
+	for obj in objs:
+		delta.add_object(obj)
+		delta.add(get_rollup(obj))
+	if container._rollup is _EMPTY_ROLLUP:
+		container._rollup = WorkRollup()
+	_propagate_rollup(container, delta)
+# ### def _rollup_appended_objects
 
-_every_object = {}
+def detach_object(obj):
+	""" remove given story or task from the container it is appended into
 
-_all_story = []
-_all_task = []
+	Only the container and its ancestors are visited, the object and objects
+	under it are kept as they are.
 
+	Argument:
+		obj - Story or Task object
+	Return:
+		the container (DevelopmentProject, Story or Task), None if the object is not in any container
+	"""
+
+	parent = obj._parent
+	if parent is None:
+		return None
+	_remove_object_from_list(parent.substory if isinstance(obj, Story) else parent.subtask, obj)
+	if getattr(parent, "_rollup", None) is not None:
+		delta = WorkRollup()
+		delta.add_object(obj, -1)
+		delta.add(get_rollup(obj), -1)
+		_propagate_rollup(parent, delta)
+	obj._parent = None
+	if isinstance(parent, TrackedObject):
+		parent.mark_modified()
+	return parent
+# ### def detach_object
+
+
+class Story(IdentifiableObject, TrackedObject, StoryContainer, TaskContainer, LogContainer):
+	__slots__ = ("story_id", "story", "note", "imp_order", "imp_value", "point", "demo_method", "sort_order_key",
+			"_substory", "_subtask", "_logrecord", "_modified", "_source_chunk", "_lazy_source", "_registry", "_rollup", "_parent",)
 
-class Story(IdentifiableObject, StoryContainer, TaskContainer, LogContainer):
 	def __init__(self, story_id=None, story=None, note=None, imp_order=None, imp_value=None, point=None, demo_method=None, sort_order_key=None, *args, **kwargs):
+		_set_attribute(self, "_lazy_source", None)	# source text to build sub-stories, tasks and logs from (lazily loaded top-level story only)
+		_set_attribute(self, "_rollup", None)	# WorkRollup of sub-stories and tasks, None if not computed yet
+		_set_attribute(self, "_parent", None)	# containing DevelopmentProject or Story, None if not appended into any
+
 		super(Story, self).__init__(*args, **kwargs)
 
-		self.story_id = story_id
-		self.story = story
-		self.note = note
-		self.imp_order = imp_order
-		self.imp_value = imp_value
-		self.point = point
-		self.demo_method = demo_method
+		_set_attribute(self, "story_id", story_id)
+		_set_attribute(self, "story", story)
+		_set_attribute(self, "note", note)
+		_set_attribute(self, "imp_order", imp_order)
+		_set_attribute(self, "imp_value", imp_value)
+		_set_attribute(self, "point", point)
+		_set_attribute(self, "demo_method", demo_method)
 
-		self.sort_order_key = sort_order_key
+		_set_attribute(self, "sort_order_key", sort_order_key)
 
-		if self.story_id is not None:
-			_every_object[self.story_id] = self
+		_set_attribute(self, "_source_chunk", None)	# text of this story in loaded project file (top-level story only)
 
-		_all_story.append(self)
+		_active_registry.register(self)
 	# ### def __init__
 
 	def prepare_story_id(self):
@@ -211,9 +843,75 @@ class Story(IdentifiableObject, StoryContainer, TaskContainer, LogContainer):
 		"""
 
 		if self.story_id is None:
-			self.story_id = allocate_object_id(self, "C", _every_object)
+			self.story_id = allocate_object_id(self, "C", self._registry.by_id)
 	# ### def __prepare_story_id
 
+	def _materialize(self):
+		""" build sub-stories, tasks and logs of lazily loaded story from recorded source text """
+
+		srctext = self._lazy_source
+		self._lazy_source = None
+
+		# objects are registered into the project owning this story
+		prev_registry = activate_registry(self._registry)
+		try:
+			children = _load_story_children_events(srctext)
+		finally:
+			activate_registry(prev_registry)
+		self._substory = _compact_list(children.get("sub-story"))
+		self._subtask = _compact_list(children.get("task"))
+		logrecs = children.get("log")
+		self._logrecord = _new_log_container(self, logrecs) if logrecs else _EMPTY_CONTAINER
+		for obj in itertools.chain(self._substory, self._subtask):
+			obj._parent = self
+
+		for obj in iterate_objects(self, False):
+			if isinstance(obj, Story):
+				obj.prepare_story_id()
+			else:
+				obj.prepare_task_id()
+	# ### def _materialize
+
+	def is_materialized(self):
+		return self._lazy_source is None
+	# ### def is_materialized
+
+	def _get_substory(self):
+		if self._lazy_source is not None:
+			self._materialize()
+		return self._substory
+	# ### def _get_substory
+
+	def _set_substory(self, v):
+		self._substory = v
+	# ### def _set_substory
+
+	substory = property(_get_substory, _set_substory)
+
+	def _get_subtask(self):
+		if self._lazy_source is not None:
+			self._materialize()
+		return self._subtask
+	# ### def _get_subtask
+
+	def _set_subtask(self, v):
+		self._subtask = v
+	# ### def _set_subtask
+
+	subtask = property(_get_subtask, _set_subtask)
+
+	def _get_logrecord(self):
+		if self._lazy_source is not None:
+			self._materialize()
+		return self._logrecord
+	# ### def _get_logrecord
+
+	def _set_logrecord(self, v):
+		self._logrecord = v
+	# ### def _set_logrecord
+
+	logrecord = property(_get_logrecord, _set_logrecord)
+
 	def __repr__(self):
 		return "%s.Story(story_id=%r, story=%r, note=%r, imp_order=%r, imp_value=%r, point=%r, demo_method=%r, sort_order_key=%r)" % (self.__module__, self.story_id, self.story, self.note, self.imp_order, self.imp_value, self.point, self.demo_method, self.sort_order_key,)
 	# ### def __repr__
@@ -244,6 +942,7 @@ class Story(IdentifiableObject, StoryContainer, TaskContainer, LogContainer):
 
 	def set_object_id(self, new_id):
 		self.story_id = new_id
+		self._modified = True
 	# ### def get_object_id
 
 	def get_object_signature(self):
@@ -253,27 +952,30 @@ class Story(IdentifiableObject, StoryContainer, TaskContainer, LogContainer):
 	# ### def get_object_signature
 # ### class Story
 
-class Task(IdentifiableObject, TaskContainer, LogContainer):
+class Task(IdentifiableObject, TrackedObject, TaskContainer, LogContainer):
+	__slots__ = ("task_id", "task", "note", "estimated_time", "point", "status", "test_method",
+			"subtask", "logrecord", "_modified", "_registry", "_rollup", "_parent",)
+
 	def __init__(self, task_id=None, task=None, note=None, estimated_time=None, point=None, status=None, test_method=None, *args, **kwargs):
-		super(Task, self).__init__(*args, **kwargs)
+		_set_attribute(self, "_rollup", None)	# WorkRollup of sub-tasks, None if not computed yet
+		_set_attribute(self, "_parent", None)	# containing Story or Task, None if not appended into any
 
-		self.task_id = task_id
-		self.task = task
-		self.note = note
-		self.estimated_time = estimated_time
-		self.point = point
-		self.status = status
-		self.test_method = test_method
+		super(Task, self).__init__(*args, **kwargs)
 
-		if self.task_id is not None:
-			_every_object[self.task_id] = self
+		_set_attribute(self, "task_id", task_id)
+		_set_attribute(self, "task", task)
+		_set_attribute(self, "note", note)
+		_set_attribute(self, "estimated_time", estimated_time)
+		_set_attribute(self, "point", point)
+		_set_attribute(self, "status", status)
+		_set_attribute(self, "test_method", test_method)
 
-		_all_task.append(self)
+		_active_registry.register(self)
 	# ### def __init__
 
 	def prepare_task_id(self):
 		if self.task_id is None:
-			self.task_id = allocate_object_id(self, "T", _every_object)
+			self.task_id = allocate_object_id(self, "T", self._registry.by_id)
 	# ### def __prepare_task_id
 
 	def __repr__(self):
@@ -298,8 +1000,20 @@ class Task(IdentifiableObject, TaskContainer, LogContainer):
 		return False
 	# ### def is_empty
 
-	def set_status(self, new_status):
-		self.status = "%s (%s)" % (new_status, _get_tstamp_string(),)
+	def set_status(self, new_status, tstamp=None):
+		if tstamp is None:
+			tstamp = _get_command_time()
+		delta = None
+		if self._rollup is not None:
+			delta = WorkRollup()
+			delta.add_object(self, -1)
+		self.status = "%s (%s)" % (new_status, _get_tstamp_string(tstamp),)
+		self._modified = True
+		if delta is not None:
+			delta.add_object(self)
+			parent = self._registry.get_parent(self)
+			if parent is not None:
+				_propagate_rollup(parent, delta)
 	# ### def set_status
 
 
@@ -309,6 +1023,7 @@ class Task(IdentifiableObject, TaskContainer, LogContainer):
 
 	def set_object_id(self, new_id):
 		self.task_id = new_id
+		self._modified = True
 	# ### def get_object_id
 
 	def get_object_signature(self):
@@ -318,22 +1033,24 @@ class Task(IdentifiableObject, TaskContainer, LogContainer):
 	# ### def get_object_signature
 # ### class Task
 
-class Log(object):
+class Log(TrackedObject):
+	__slots__ = ("log_id", "log", "record_time", "author", "action", "_modified",)
+
 	def __init__(self, log_id=None, log=None, record_time=None, author=None, action=None, *args, **kwargs):
 
 		super(Log, self).__init__(*args, **kwargs)
 
-		self.log_id = log_id
-		self.log = log
-		self.record_time = record_time
-		self.author = author
-		self.action = action
+		_set_attribute(self, "log_id", log_id)
+		_set_attribute(self, "log", log)
+		_set_attribute(self, "record_time", record_time)
+		_set_attribute(self, "author", author)
+		_set_attribute(self, "action", action)
 
 		if not self.is_empty():
 			if self.record_time is None:
-				self.record_time = datetime.datetime.now()
+				self.record_time = _get_command_time()
 			if self.author is None:
-				self.author = _rt_config.username
+				self.author = _get_command_author()
 	# ### def __init__
 
 	def __repr__(self):
@@ -350,6 +1067,219 @@ class Log(object):
 	# ### def is_empty
 # ### class Log
 
+_LOG_STORE_EPOCH = datetime.datetime(1970, 1, 1)
+
+class LogStore(object):
+	""" column-oriented storage of log records of a project
+
+	Each log record is a row of parallel columns: offset and length of UTF-8
+	encoded text in a shared byte buffer, timestamp packed into microseconds since epoch,
+	and indexes of author and action in a table of interned symbols. Values
+	which can not be packed (log ID, non-datetime record time) are kept aside
+	by row.
+	"""
+
+	_NONE = -1
+	_NO_TIME = -(1 << 62)
+
+	def __init__(self):
+		super(LogStore, self).__init__()
+
+		self._symbols = []
+		self._symbol_index = {}
+
+		self._text = array.array("c")
+		self._text_start = array.array("l")
+		self._text_length = array.array("i")
+		self._record_time = array.array("l")
+		self._author = array.array("i")
+		self._action = array.array("i")
+		self._modified = array.array("b")
+
+		self._unpacked = {}
+	# ### def __init__
+
+	def __len__(self):
+		return len(self._modified)
+	# ### def __len__
+
+	def _get_symbol_index(self, v):
+		if v is None:
+			return LogStore._NONE
+		idx = self._symbol_index.get(v)
+		if idx is None:
+			idx = len(self._symbols)
+			self._symbols.append(v)
+			self._symbol_index[v] = idx
+		return idx
+	# ### def _get_symbol_index
+
+	def _get_symbol(self, idx):
+		if LogStore._NONE == idx:
+			return None
+		return self._symbols[idx]
+	# ### def _get_symbol
+
+	def add(self, logrec):
+		""" append given log record as a new row
+
+		Argument:
+			logrec - Log object
+		Return:
+			row number
+		"""
+
+		row = len(self._modified)
+		unpacked = {}
+
+		if logrec.log is None:
+			self._text_start.append(0)
+			self._text_length.append(LogStore._NONE)
+		else:
+			t = unicode(logrec.log).encode("utf-8")
+			self._text_start.append(len(self._text))
+			self._text_length.append(len(t))
+			self._text.fromstring(t)
+
+		record_time = logrec.record_time
+		if record_time is None:
+			self._record_time.append(LogStore._NO_TIME)
+		elif isinstance(record_time, datetime.datetime) and (record_time.tzinfo is None):
+			d = record_time - _LOG_STORE_EPOCH
+			self._record_time.append((d.days * 86400 + d.seconds) * 1000000 + d.microseconds)
+		else:
+			self._record_time.append(LogStore._NO_TIME)
+			unpacked["record_time"] = record_time
+
+		self._author.append(self._get_symbol_index(logrec.author))
+		self._action.append(self._get_symbol_index(logrec.action))
+		self._modified.append(1 if logrec.is_modified() else 0)
+
+		if logrec.log_id is not None:
+			unpacked["log_id"] = logrec.log_id
+		if unpacked:
+			self._unpacked[row] = unpacked
+		return row
+	# ### def add
+
+	def get_fields(self, row):
+		""" get field values of given row
+
+		Argument:
+			row - row number
+		Return:
+			tuple of (log_id, log, record_time, author, action)
+		"""
+
+		unpacked = self._unpacked.get(row, {})
+
+		log = None
+		l = self._text_length[row]
+		if LogStore._NONE != l:
+			start = self._text_start[row]
+			log = self._text[start:start+l].tostring().decode("utf-8")
+
+		record_time = unpacked.get("record_time")
+		t = self._record_time[row]
+		if LogStore._NO_TIME != t:
+			record_time = _LOG_STORE_EPOCH + datetime.timedelta(microseconds=t)
+
+		return (unpacked.get("log_id"), log, record_time, self._get_symbol(self._author[row]), self._get_symbol(self._action[row]),)
+	# ### def get_fields
+
+	def get(self, row):
+		""" get a (detached) Log object of given row """
+
+		logrec = Log.__new__(Log)
+		logrec.log_id, logrec.log, logrec.record_time, logrec.author, logrec.action, = self.get_fields(row)
+		logrec._modified = bool(self._modified[row])
+		return logrec
+	# ### def get
+
+	def is_modified(self, row):
+		return bool(self._modified[row])
+	# ### def is_modified
+
+	def clear_modified(self, row):
+		self._modified[row] = 0
+	# ### def clear_modified
+
+	def __getstate__(self):
+		columns = {}
+		for k in ("_text", "_text_start", "_text_length", "_record_time", "_author", "_action", "_modified",):
+			columns[k] = getattr(self, k).tostring()
+		return (self._symbols, columns, self._unpacked,)
+	# ### def __getstate__
+
+	def __setstate__(self, state):
+		self.__init__()
+		symbols, columns, self._unpacked, = state
+		for v in symbols:
+			self._get_symbol_index(v)
+		for k, v in columns.iteritems():
+			getattr(self, k).fromstring(v)
+	# ### def __setstate__
+# ### class LogStore
+
+class LogView(object):
+	""" list-like view of log records of a story or task kept in a LogStore
+
+	Log objects obtained from the view are built on access, modifications on
+	them are not written back. New records are added with append() or
+	extend().
+	"""
+
+	__slots__ = ("_store", "_rows",)
+
+	def __init__(self, store):
+		self._store = store
+		self._rows = array.array("l")
+	# ### def __init__
+
+	def __len__(self):
+		return len(self._rows)
+	# ### def __len__
+
+	def __iter__(self):
+		for row in self._rows:
+			yield self._store.get(row)
+	# ### def __iter__
+
+	def __getitem__(self, idx):
+		if isinstance(idx, slice):
+			return [self._store.get(row) for row in self._rows[idx]]
+		return self._store.get(self._rows[idx])
+	# ### def __getitem__
+
+	def append(self, logrec):
+		self._rows.append(self._store.add(logrec))
+	# ### def append
+
+	def extend(self, logrecs):
+		for logrec in logrecs:
+			self._rows.append(self._store.add(logrec))
+	# ### def extend
+
+	def iter_fields(self):
+		""" iterate through field tuples (log_id, log, record_time, author, action) of log records """
+
+		for row in self._rows:
+			yield self._store.get_fields(row)
+	# ### def iter_fields
+
+	def is_modified(self):
+		for row in self._rows:
+			if self._store.is_modified(row):
+				return True
+		return False
+	# ### def is_modified
+
+	def clear_modified(self):
+		for row in self._rows:
+			self._store.clear_modified(row)
+	# ### def clear_modified
+# ### class LogView
+
 
 
 def _convert_to_string(v):
@@ -401,23 +1331,20 @@ def _convert_to_integer(v):
 __regex_date = re.compile('(([0-9]{2,4})(-|/))?([0-9]+)(-|/)([0-9]+)(.*)$')
 __regex_time_1 = re.compile('([0-9]{1,2})(\:|,|.)([0-9]{1,2})((\:|,|.)([0-9]{1,2}))?')
 __regex_time_2 = re.compile('([0-9]{2})(([0-9]{2})([0-9]{2})?)?')
-def _convert_to_datetime(v):
-	""" convert given object to datetime
+def _parse_datetime_text(v):
+	""" parse date and time in loose form (ex: "7/24 18:40", "2012-07-24 1840")
 
-	If input object is None, empty string or non-numerical string then None will be return
+	Omitted date parts are taken from current time.
 
 	Argument:
-		v - the object to be convert
+		v - the string to be parse
 	Return:
-		resulted integer or None if given object is empty
+		tuple of (resulted datetime or None if failed, True if result does not depend on current time)
 	"""
 
-	if v is None:
-		return None
-
 	try:
-		v = str(v)
 		n = datetime.datetime.now()
+		is_absolute = False
 
 		year = n.year
 		month = n.month
@@ -433,6 +1360,7 @@ def _convert_to_datetime(v):
 		if m is not None:
 			m_year = _convert_to_integer(m.group(2))
 			if m_year is not None:
+				is_absolute = True
 				if m_year < 70:
 					year = m_year + 2000
 				elif m_year < 1000:
@@ -472,11 +1400,77 @@ def _convert_to_datetime(v):
 		# }}} matching time part
 
 		if matched:
-			return datetime.datetime(year, month, day, hour, minute, second)
+			return (datetime.datetime(year, month, day, hour, minute, second), is_absolute,)
 	except Exception as e:
 		print e
 		pass
-	return None
+	return (None, False,)
+# ### def _parse_datetime_text
+
+_DATETIME_MEMO_SIZE = 4096
+_datetime_memo = {}
+
+def _parse_canonical_datetime(v):
+	""" parse date and time in the form of _get_tstamp_string() (YYYY-MM-DD hh:mm:ss)
+
+	Argument:
+		v - the string to be parse
+	Return:
+		resulted datetime or None if given string is not in the form
+	"""
+
+	if (19 != len(v)) or ("-" != v[4]) or ("-" != v[7]) or (" " != v[10]) or (":" != v[13]) or (":" != v[16]):
+		return None
+	if not (v[0:4] + v[5:7] + v[8:10] + v[11:13] + v[14:16] + v[17:19]).isdigit():
+		return None
+	try:
+		return datetime.datetime(int(v[0:4]), int(v[5:7]), int(v[8:10]), int(v[11:13]), int(v[14:16]), int(v[17:19]))
+	except ValueError:
+		return None
+# ### def _parse_canonical_datetime
+
+def _convert_to_datetime(v):
+	""" convert given object to datetime
+
+	If input object is None, empty string or non-numerical string then None will be return
+
+	Datetime objects (ex: constructed by YAML loader) and strings in the form
+	of _get_tstamp_string() are converted directly. Results of other strings
+	are memorized (in a bounded table) unless they depend on current time.
+
+	Argument:
+		v - the object to be convert
+	Return:
+		resulted datetime or None if given object is empty
+	"""
+
+	if v is None:
+		return None
+
+	if isinstance(v, datetime.datetime) and (v.tzinfo is None):
+		if 0 != v.microsecond:
+			return v.replace(microsecond=0)
+		return v
+
+	try:
+		v = str(v)
+	except Exception as e:
+		print e
+		return None
+
+	result = _datetime_memo.get(v)
+	if result is not None:
+		return result
+
+	result = _parse_canonical_datetime(v)
+	is_absolute = True
+	if result is None:
+		result, is_absolute, = _parse_datetime_text(v)
+	if is_absolute and (result is not None):
+		if len(_datetime_memo) >= _DATETIME_MEMO_SIZE:
+			_datetime_memo.clear()
+		_datetime_memo[v] = result
+	return result
 # ### def _convert_to_datetime
 
 
@@ -531,7 +1525,9 @@ def load_stories(m):
 
 	result = []
 
-	if isinstance(m, (list, tuple,)):
+	if isinstance(m, Story):
+		result = (m,)
+	elif isinstance(m, (list, tuple,)):
 		for mm in m:
 			result.extend(load_stories(mm))
 	elif isinstance(m, (str, unicode,)):
@@ -608,6 +1604,7 @@ def load_stories(m):
 				obj.append_subtask(sub_tasks)
 			if logrecords is not None:
 				obj.append_log(logrecords)
+			obj.clear_modified()
 
 			if False == obj.is_empty():
 				result = (obj,)
@@ -615,9 +1612,9 @@ def load_stories(m):
 # ### def load_stories
 
 def prepare_story_id():
-	""" generate IDs for stories """
+	""" generate IDs for stories in active registry """
 
-	for story in _all_story:
+	for story in _active_registry.stories:
 		story.prepare_story_id()
 # ### def prepare_story_id
 
@@ -656,7 +1653,9 @@ def load_tasks(m):
 
 	result = []
 
-	if isinstance(m, (list, tuple,)):
+	if isinstance(m, Task):
+		result = (m,)
+	elif isinstance(m, (list, tuple,)):
 		for mm in m:
 			result.extend(load_tasks(mm))
 	elif isinstance(m, (str, unicode,)):
@@ -716,6 +1715,7 @@ def load_tasks(m):
 				obj.append_subtask(sub_tasks)
 			if logrecords is not None:
 				obj.append_log(logrecords)
+			obj.clear_modified()
 
 			if False == obj.is_empty():
 				result = (obj,)
@@ -723,9 +1723,9 @@ def load_tasks(m):
 # ### def load_tasks
 
 def prepare_task_id():
-	""" generate IDs for tasks """
+	""" generate IDs for tasks in active registry """
 
-	for task in _all_task:
+	for task in _active_registry.tasks:
 		task.prepare_task_id()
 # ### def prepare_task_id
 
@@ -763,7 +1763,9 @@ def load_logs(m):
 
 	result = []
 
-	if isinstance(m, (list, tuple,)):
+	if isinstance(m, Log):
+		result = (m,)
+	elif isinstance(m, (list, tuple,)):
 		for mm in m:
 			result.extend(load_logs(mm))
 	elif isinstance(m, (str, unicode,)):
@@ -777,6 +1779,8 @@ def load_logs(m):
 		author = None
 		action = None
 
+		is_normalized = True
+
 		is_accepted_any_attribute = False
 
 		if "l-id" in m:
@@ -787,36 +1791,46 @@ def load_logs(m):
 			is_accepted_any_attribute = True
 		if "record-time" in m:
 			record_time = _convert_to_datetime(m["record-time"])
+			is_normalized = isinstance(m["record-time"], datetime.datetime)
 			is_accepted_any_attribute = True
 		if "author" in m:
-			author = _convert_to_string(m["author"])
+			author = _active_registry.intern_value(_convert_to_string(m["author"]))
 			is_accepted_any_attribute = True
 		if "action" in m:
-			action = _convert_to_string(m["action"])
+			action = _active_registry.intern_value(_convert_to_string(m["action"]))
 			is_accepted_any_attribute = True
 
 		if is_accepted_any_attribute:
 			obj = Log(log_id, log, record_time, author, action)
+			# log is modified when time or author is filled in or time is not in normalized form
+			if is_normalized and (obj.record_time is record_time) and (obj.author is author):
+				obj.clear_modified()
 			result = (obj,)
 	return result
 # ### def load_logs
 
-def yamlnodedump_logs(e):
-	""" dump Log object to YAML Node object
-	"""
+def _yamlnodedump_log_fields(log_id, log, record_time, author, action):
+	empty_node = (log_id is None) and (log is None) and (author is None) and (action is None)
 
-	if isinstance(e, Log):
-		empty_node = e.is_empty()
+	mapping = []
 
-		mapping = []
+	_attach_mapping_value(mapping, u"l-id", log_id)
+	_attach_mapping_value(mapping, u"l", log, empty_node, True)
+	_attach_mapping_value(mapping, u"record-time", record_time, empty_node, False)
+	_attach_mapping_value(mapping, u"author", author, empty_node, False)
+	_attach_mapping_value(mapping, u"action", action, empty_node, False)
 
-		_attach_mapping_value(mapping, u"l-id", e.log_id)
-		_attach_mapping_value(mapping, u"l", e.log, empty_node, True)
-		_attach_mapping_value(mapping, u"record-time", e.record_time, empty_node, False)
-		_attach_mapping_value(mapping, u"author", e.author, empty_node, False)
-		_attach_mapping_value(mapping, u"action", e.action, empty_node, False)
+	return yaml.MappingNode(tag=u"tag:yaml.org,2002:map", value=mapping, flow_style=False)
+# ### def _yamlnodedump_log_fields
 
-		return yaml.MappingNode(tag=u"tag:yaml.org,2002:map", value=mapping, flow_style=False)
+def yamlnodedump_logs(e):
+	""" dump Log object (or log records in LogView) to YAML Node object
+	"""
+
+	if isinstance(e, Log):
+		return _yamlnodedump_log_fields(e.log_id, e.log, e.record_time, e.author, e.action)
+	elif isinstance(e, LogView):
+		return [_yamlnodedump_log_fields(*fields) for fields in e.iter_fields()]
 	elif isinstance(e, (list, tuple,)):
 		result = []
 		for elem in e:
@@ -827,7 +1841,9 @@ def yamlnodedump_logs(e):
 
 
 class DevelopmentProject(StoryContainer):
-	def __init__(self, product_backlog, tracked_issue):
+	def __init__(self, product_backlog, tracked_issue, registry=None):
+
+		self._registry = _active_registry if (registry is None) else registry
 
 		super(DevelopmentProject, self).__init__()
 
@@ -835,15 +1851,78 @@ class DevelopmentProject(StoryContainer):
 		self.tracked_issue = tracked_issue
 
 		self.substory = self.product_backlog
+		for story in (self.product_backlog or ()):
+			story._parent = self
 	# ### def __init__
-# ### class DevelopmentProject
 
-def load_project(c):
-	""" load dp document
-	"""
+	_sorted_object_ids = None	# sorted list of object IDs for prefix lookup (built on first use)
+	_archived_stories = None	# top-level stories detached by archive, appended into archive file on compaction
+	_search_index = None	# SearchIndex kept with the project (see get_project_search_index())
 
-	product_backlog = None
-	tracked_issue = None
+	def __getstate__(self):
+		# search index is kept in its own sidecar file
+		state = self.__dict__.copy()
+		state.pop("_search_index", None)
+		return state
+	# ### def __getstate__
+
+	def get_sorted_object_ids(self):
+		""" get sorted list of IDs of stories and tasks in this project
+
+		The list is built once and kept until the project is written. IDs in
+		lazily loaded top-level stories are collected from source text without
+		materializing them.
+
+		Return:
+			sorted list of object IDs
+		"""
+
+		if self._sorted_object_ids is None:
+			ids = set()
+			for obj in iterate_objects(self, False):
+				objid = obj.get_object_id()
+				if objid is not None:
+					ids.add(objid)
+			for story in self.substory:
+				if story._lazy_source is not None:
+					ids.update(_OBJECT_ID_IN_SOURCE_REGEX.findall(story._lazy_source))
+			self._sorted_object_ids = sorted(ids)
+		return self._sorted_object_ids
+	# ### def get_sorted_object_ids
+
+	def drop_sorted_object_ids(self):
+		self._sorted_object_ids = None
+	# ### def drop_sorted_object_ids
+
+	def forget_object_ids(self, objids):
+		""" remove given IDs of removed objects from sorted list of object IDs (if the list is built) """
+
+		ids = self._sorted_object_ids
+		if ids is None:
+			return
+		for objid in objids:
+			idx = bisect.bisect_left(ids, objid)
+			if (idx < len(ids)) and (objid == ids[idx]):
+				del ids[idx]
+	# ### def forget_object_ids
+# ### class DevelopmentProject
+
+def load_project(c, registry=None):
+	""" load dp document
+
+	Argument:
+		c - document to load
+		registry - ObjectRegistry object which objects in document are registered into, a new one is created if None
+	Return:
+		DevelopmentProject object
+	"""
+
+	product_backlog = None
+	tracked_issue = None
+
+	if registry is None:
+		registry = ObjectRegistry()
+		activate_registry(registry)
 
 	if "product-backlog" in c:
 		product_backlog = load_stories(c["product-backlog"])
@@ -852,14 +1931,106 @@ def load_project(c):
 	else:
 		product_backlog = load_stories(c)
 
-	dpobj = DevelopmentProject(product_backlog, tracked_issue)
+	dpobj = DevelopmentProject(product_backlog, tracked_issue, registry)
 
-	prepare_story_id()
-	prepare_task_id()
+	registry.prepare_object_id()
+	get_rollup(dpobj)
 
 	return dpobj
 # ### def load_project
 
+def iterate_objects(c, materialize=True):
+	""" iterate through stories and tasks under given container (depth-first)
+
+	Argument:
+		c - a StoryContainer and/or TaskContainer object (ex: DevelopmentProject, Story, Task)
+		materialize - build objects under lazily loaded stories, skip them if False
+	Return:
+		generator of Story and Task objects
+	"""
+
+	if (not materialize) and (getattr(c, "_lazy_source", None) is not None):
+		return
+	for s in getattr(c, "substory", ()):
+		yield s
+		for obj in iterate_objects(s, materialize):
+			yield obj
+	for t in getattr(c, "subtask", ()):
+		yield t
+		for obj in iterate_objects(t, materialize):
+			yield obj
+# ### def iterate_objects
+
+def find_object(proj, objid):
+	""" find story or task with given ID
+
+	Lazily loaded top-level stories which source text contains the ID are
+	materialized until the object is found.
+
+	Argument:
+		proj - DevelopmentProject object
+		objid - ID of object
+	Return:
+		found object or None if not found
+	"""
+
+	obj = proj._registry.find(objid)
+	if obj is not None:
+		return obj
+	for story in proj.substory:
+		if (story._lazy_source is not None) and (objid in story._lazy_source):
+			for obj in iterate_objects(story):
+				if objid == obj.get_object_id():
+					return obj
+	return None
+# ### def find_object
+
+_OBJECT_ID_IN_SOURCE_REGEX = re.compile(r"^[ -]*(?:story-id|t-id):[ ]*['\"]?([0-9A-Za-z]+)", re.MULTILINE)
+
+def resolve_object_id(proj, idprefix):
+	""" get IDs of stories and tasks which start with given prefix
+
+	Argument:
+		proj - DevelopmentProject object
+		idprefix - complete ID or leading part of ID
+	Return:
+		sorted list of matched IDs (only the given ID if it is a complete ID)
+	"""
+
+	if idprefix in proj._registry.by_id:
+		return [idprefix,]
+	ids = proj.get_sorted_object_ids()
+	result = []
+	idx = bisect.bisect_left(ids, idprefix)
+	while (idx < len(ids)) and ids[idx].startswith(idprefix):
+		result.append(ids[idx])
+		idx = idx + 1
+	return result
+# ### def resolve_object_id
+
+def find_object_by_prefix(proj, idprefix, notfound_message):
+	""" find story or task with unique ID prefix, print error message if failed
+
+	Argument:
+		proj - DevelopmentProject object
+		idprefix - complete ID or leading part of ID
+		notfound_message - error message (with a %r for given ID) to print if no object matched
+	Return:
+		found object or None if not found or prefix is ambiguous
+	"""
+
+	matched = resolve_object_id(proj, idprefix)
+	if len(matched) > 1:
+		print "ERR: ambiguous object ID [%r], %d objects matched: %s" % (idprefix, len(matched), ", ".join(matched[:8]) + (", ..." if (len(matched) > 8) else ""),)
+		return None
+	obj = None
+	if 1 == len(matched):
+		obj = find_object(proj, matched[0])
+	if obj is None:
+		print notfound_message % (idprefix,)
+	return obj
+# ### def find_object_by_prefix
+
 def yamlnodedump_project(e):
 
 	mapping = []
@@ -873,172 +2044,3367 @@ def yamlnodedump_project(e):
 	return yaml.MappingNode(tag=u"tag:yaml.org,2002:map", value=mapping, flow_style=False)
 # ### def yamlnodedump_project
 
-def read_project(filename):
-	fp = open(filename, "r")
-	c = yaml.load(fp)
-	return load_project(c)
-# ### def read_project
+def is_subtree_modified(obj):
+	""" check if given object or any object under it is modified since loaded (or written)
 
-def write_project(filename, proj):
-	fp = open(filename, "w")
-	yml = yaml.serialize(yamlnodedump_project(proj), stream=fp, encoding='utf-8', allow_unicode=True)
-	#print repr(yml)
-	#fp.write(yml)
-	fp.close()
-# ### def write_project
+	Argument:
+		obj - Story, Task or Log object
+	Return:
+		True if any object in subtree is modified, False otherwise
+	"""
 
+	if obj.is_modified():
+		return True
+	if getattr(obj, "_lazy_source", None) is not None:
+		return False
+	for subobjs in (getattr(obj, "substory", ()), getattr(obj, "subtask", ()),):
+		for o in subobjs:
+			if is_subtree_modified(o):
+				return True
+	logrecs = getattr(obj, "logrecord", ())
+	if isinstance(logrecs, LogView):
+		return logrecs.is_modified()
+	for o in logrecs:
+		if o.is_modified():
+			return True
+	return False
+# ### def is_subtree_modified
+
+def _clear_subtree_modified(obj):
+	obj.clear_modified()
+	if getattr(obj, "_lazy_source", None) is not None:
+		return
+	for subobjs in (getattr(obj, "substory", ()), getattr(obj, "subtask", ()),):
+		for o in subobjs:
+			_clear_subtree_modified(o)
+	logrecs = getattr(obj, "logrecord", ())
+	if isinstance(logrecs, LogView):
+		logrecs.clear_modified()
+	else:
+		for o in logrecs:
+			o.clear_modified()
+# ### def _clear_subtree_modified
 
-class RuntimeConfiguration(object):
-	def __init__(self, username, active_projfile, archive_projfile):
-		self.username = username
-		self.active_projfile = active_projfile
-		self.archive_projfile = archive_projfile
-	# ### def __init__
-# ### class RuntimeConfiguration
+_PRODUCT_BACKLOG_HEADER = "product-backlog:\n"
 
-def read_runtimeconfig(filename):
-	fp = open(filename, "r")
-	c = yaml.load(fp)
+def _attach_source_chunks(proj, node, srctext):
+	""" record text of each top-level story in loaded project file
 
-	username = None
-	if "DP_USERNAME" in os.environ:
-		username = os.environ["DP_USERNAME"]
-	elif "username" in c:
-		username = c["username"]
+	The text (lines from "- " of the sequence item to the line before next
+	item) is written back verbatim by _dump_project_text() as long as the
+	story and everything under it are not modified.
 
-	active_projfile = c["dp-active"]
-	archive_projfile = None
-	if "dp-archive" in c:
-		archive_projfile = c["dp-archive"]
+	Argument:
+		proj - DevelopmentProject object loaded from node
+		node - composed root node of project file
+		srctext - content of project file
+	"""
 
-	return RuntimeConfiguration(username, active_projfile, archive_projfile)
-# ### def read_runtimeconfig
+	# line breaks other than "\n" make line numbers of YAML marks differ from str.splitlines()
+	for linebreak in ("\r", "\xc2\x85", "\xe2\x80\xa8", "\xe2\x80\xa9",):
+		if linebreak in srctext:
+			return
+
+	seqnode = None
+	if isinstance(node, yaml.SequenceNode):
+		seqnode = node
+	elif isinstance(node, yaml.MappingNode):
+		for k, v in node.value:
+			if isinstance(k, yaml.ScalarNode) and (u"product-backlog" == k.value):
+				seqnode = v
+	if not isinstance(seqnode, yaml.SequenceNode):
+		return
+	_record_source_chunks(proj, [n.start_mark for n in seqnode.value], seqnode.end_mark, srctext)
+# ### def _attach_source_chunks
+
+def _record_source_chunks(proj, item_marks, end_mark, srctext):
+	""" record text of each top-level story by marks of sequence items
+
+	Argument:
+		proj - DevelopmentProject object
+		item_marks - start marks of items in top-level story sequence
+		end_mark - end mark of top-level story sequence
+		srctext - content of project file
+	"""
 
+	if (proj.product_backlog is None) or (len(item_marks) != len(proj.product_backlog)) or (0 != end_mark.column):
+		return
 
+	lines = srctext.splitlines(True)
+	linenums = [mark.line for mark in item_marks]
+	linenums.append(end_mark.line)
+	for idx in range(len(proj.product_backlog)):
+		if 2 != item_marks[idx].column:
+			continue
+		chunk = "".join(lines[linenums[idx]:linenums[idx+1]])
+		if chunk.startswith("- ") and chunk.endswith("\n"):
+			proj.product_backlog[idx]._source_chunk = chunk
+# ### def _record_source_chunks
 
-def command_noop(proj, args):
-	""" respond to "rebuild", "r.b.", "rb", "r" command
+def _dump_project_chunks(proj):
+	""" serialize project into chunks of YAML document
+
+	Top-level stories which have recorded source text and are not modified
+	are written back with the recorded text, only modified stories are
+	serialized. The result is identical to serializing yamlnodedump_project()
+	when the loaded project file is in normalized form.
+
+	Argument:
+		proj - DevelopmentProject object
+	Return:
+		list of (UTF-8 encoded text, kind of root node ("project", "story" or None),)
 	"""
-	return True
-# ### def command_noop
 
-def command_add_story(proj, args):
-	""" respond to "add-story", "addstory", "a.s.", "as" command
+	if (proj.product_backlog is None) or (0 == len(proj.product_backlog)) or (proj.tracked_issue is not None):
+		return [(yaml.serialize(yamlnodedump_project(proj), Dumper=_yaml_dumper, encoding='utf-8', allow_unicode=True), "project",),]
+
+	chunks = [(_PRODUCT_BACKLOG_HEADER, None,),]
+	for story in proj.product_backlog:
+		chunks.append( (_dump_story_chunk(story), "story",) )
+	return chunks
+# ### def _dump_project_chunks
+
+def _dump_story_chunk(story):
+	""" serialize top-level story into an item of product-backlog sequence
+
+	Recorded source text is used if the story is not modified.
+
+	Argument:
+		story - top-level Story object
+	Return:
+		UTF-8 encoded text
 	"""
 
-	add_after = None
+	if (story._source_chunk is None) or is_subtree_modified(story):
+		mapping = []
+		_attach_mapping_sequence(mapping, u"product-backlog", [yamlnodedump_stories(story),], False, False)
+		yml = yaml.serialize(yaml.MappingNode(tag=u"tag:yaml.org,2002:map", value=mapping, flow_style=False), Dumper=_yaml_dumper, encoding='utf-8', allow_unicode=True)
+		story._source_chunk = yml[len(_PRODUCT_BACKLOG_HEADER):]
+		_clear_subtree_modified(story)
+	return story._source_chunk
+# ### def _dump_story_chunk
 
-	if len(args) >= 1:
-		add_after = args[0]
+def _dump_project_text(proj):
+	""" serialize project into YAML document (see _dump_project_chunks())
 
-	nobj = Story()
-	if add_after is None:
-		proj.append_substory(nobj)
-	elif add_after in _every_object:
-		_every_object[add_after].append_substory(nobj)
-	else:
-		print "ERR: parent object not found: [%r]" % (add_after,)
-		return False
+	Argument:
+		proj - DevelopmentProject object
+	Return:
+		UTF-8 encoded YAML document
+	"""
 
-	return True
-# ### def command_add_story
+	return "".join([chunk for chunk, rootkind in _dump_project_chunks(proj)])
+# ### def _dump_project_text
 
-def command_add_task(proj, args):
-	""" respond to "add-task", "addtask", "a.t.", "at" command
+def _load_project_composed(srctext):
+	""" load project by composing and constructing whole document
+
+	Argument:
+		srctext - content of project file
+	Return:
+		DevelopmentProject object
 	"""
 
-	add_after = None
+	registry = ObjectRegistry()
+	activate_registry(registry)
+	loader = _yaml_loader(srctext)
+	try:
+		node = loader.get_single_node()
+		c = None
+		if node is not None:
+			c = loader.construct_document(node)
+	finally:
+		loader.dispose()
+	proj = load_project(c, registry)
+	_attach_source_chunks(proj, node, srctext)
+	return proj
+# ### def _load_project_composed
+
+
+# kind of objects held by (kind of container, key)
+_stream_subkind = {
+	("project", "product-backlog"): "story",
+	("story", "sub-story"): "story",
+	("story", "task"): "task",
+	("story", "log"): "log",
+	("task", "sub-task"): "task",
+	("task", "log"): "log",
+}
+
+_YAML_MERGE_TAG = u"tag:yaml.org,2002:merge"
+
+class _AnchorFoundError(Exception):
+	""" raised by _ProjectEventBuilder on anchor, alias or merge key, which are only supported by composing whole document """
+	pass
+# ### class _AnchorFoundError
+
+class _ProjectEventBuilder(object):
+	""" build Story, Task and Log objects directly from parsing events
+
+	Mappings and sequences under a story/task/log are handed to
+	load_stories(), load_tasks() or load_logs() as soon as they are parsed,
+	so that only the object graph (but not the whole document in dict/list
+	form) is kept in memory. Anchors, aliases and merge keys are not
+	supported, _AnchorFoundError is raised when one is found (also in
+	skipped values).
+	"""
 
-	if len(args) >= 1:
-		add_after = args[0]
+	def __init__(self, loader, lazy=False):
+		self.loader = loader
+		self.lazy = lazy
+		self.item_marks = None
+		self.end_mark = None
+		self.lazy_stories = []
+	# ### def __init__
 
-	nobj = Task()
-	if add_after is None:
-		proj.append_subtask(nobj)
-	elif add_after in _every_object:
-		_every_object[add_after].append_subtask(nobj)
-	else:
-		print "ERR: parent object not found: [%r]" % (add_after,)
-		return False
+	def _get_node_event(self):
+		event = self.loader.get_event()
+		if event.anchor is not None:
+			raise _AnchorFoundError()
+		return event
+	# ### def _get_node_event
+
+	def _skip_value(self):
+		depth = 0
+		while True:
+			event = self.loader.get_event()
+			if getattr(event, "anchor", None) is not None:
+				raise _AnchorFoundError()
+			if isinstance(event, yaml.ScalarEvent) and (u"<<" == event.value) and event.implicit[0]:
+				raise _AnchorFoundError()	# merge key (or plain "<<" value, which is rare enough to compose)
+			if isinstance(event, (yaml.SequenceStartEvent, yaml.MappingStartEvent,)):
+				depth = depth + 1
+			elif isinstance(event, (yaml.SequenceEndEvent, yaml.MappingEndEvent,)):
+				depth = depth - 1
+			if 0 == depth:
+				return
+	# ### def _skip_value
+
+	def _build_lazy_story(self):
+		""" build top-level story without sub-stories, tasks and logs (which will be built from source text on access) """
+
+		self._get_node_event()
+		m = {}
+		has_children = False
+		while not self.loader.check_event(yaml.MappingEndEvent):
+			k = self.build_value(None)
+			if _stream_subkind.get(("story", k)) is not None:
+				self._skip_value()
+				has_children = True
+			else:
+				m[k] = self.build_value(None)
+		self.loader.get_event()
+
+		result = load_stories(m)
+		if has_children:
+			if 0 == len(result):
+				result = (Story(),)
+			self.lazy_stories.append(result[0])
+		return result
+	# ### def _build_lazy_story
 
-	return True
-# ### def command_add_task
+	def build_story_children(self):
+		""" build sub-stories, tasks and logs of the story in a single-item sequence document
 
-def command_mark_complete(proj, args):
-	""" respond to "done", "complete" command
+		Return:
+			dict of "sub-story", "task" and "log" to list of objects
+		"""
+
+		result = {}
+		self.loader.get_event()	# StreamStartEvent
+		self.loader.get_event()	# DocumentStartEvent
+		self.loader.get_event()	# SequenceStartEvent
+		self.loader.get_event()	# MappingStartEvent
+		while not self.loader.check_event(yaml.MappingEndEvent):
+			k = self.build_value(None)
+			kind = _stream_subkind.get(("story", k))
+			if kind is not None:
+				result[k] = self.build_value(kind)
+			else:
+				self._skip_value()
+		return result
+	# ### def build_story_children
+
+	def _construct_scalar(self, event):
+		tag = event.tag
+		if (tag is None) or (u"!" == tag):
+			tag = self.loader.resolve(yaml.ScalarNode, event.value, event.implicit)
+			if _YAML_MERGE_TAG == tag:
+				raise _AnchorFoundError()
+		node = yaml.ScalarNode(tag, event.value, event.start_mark, event.end_mark, event.style)
+		constructor = self.loader.yaml_constructors.get(tag, self.loader.yaml_constructors[None])
+		return constructor(self.loader, node)
+	# ### def _construct_scalar
+
+	def _build_mapping_value(self, kind):
+		m = {}
+		while not self.loader.check_event(yaml.MappingEndEvent):
+			k = self.build_value(None)
+			if isinstance(k, str):
+				k = intern(k)
+			m[k] = self.build_value(_stream_subkind.get((kind, k)))
+		self.loader.get_event()
+		return m
+	# ### def _build_mapping_value
+
+	def build_value(self, kind):
+		""" build value of next node
+
+		Argument:
+			kind - "story", "task" or "log" to build objects of that kind, None for plain value
+		Return:
+			list of objects for given kind, or plain value
+		"""
+
+		event = self.loader.get_event()
+		if event.anchor is not None:
+			raise _AnchorFoundError()
+		if isinstance(event, yaml.ScalarEvent):
+			v = self._construct_scalar(event)
+		elif isinstance(event, yaml.SequenceStartEvent):
+			v = []
+			while not self.loader.check_event(yaml.SequenceEndEvent):
+				if kind is None:
+					v.append(self.build_value(None))
+				else:
+					v.extend(self.build_value(kind))
+			self.loader.get_event()
+		elif isinstance(event, yaml.MappingStartEvent):
+			v = self._build_mapping_value(kind)
+		else:
+			raise yaml.composer.ComposerError(None, None, "unexpected %s" % (event.__class__.__name__,), event.start_mark)
+
+		if "story" == kind:
+			return load_stories(v)
+		elif "task" == kind:
+			return load_tasks(v)
+		elif "log" == kind:
+			return load_logs(v)
+		return v
+	# ### def build_value
+
+	def _build_toplevel_stories(self):
+		""" build top-level stories and record start marks of items """
+
+		self.item_marks = []
+		if not self.loader.check_event(yaml.SequenceStartEvent):
+			return self.build_value("story")
+
+		result = []
+		self._get_node_event()
+		while not self.loader.check_event(yaml.SequenceEndEvent):
+			mark = self.loader.peek_event().start_mark
+			self.item_marks.append(mark)
+			if self.lazy and (2 == mark.column) and self.loader.check_event(yaml.MappingStartEvent):
+				result.extend(self._build_lazy_story())
+			else:
+				result.extend(self.build_value("story"))
+		self.end_mark = self.loader.get_event().end_mark
+		return result
+	# ### def _build_toplevel_stories
+
+	def build_document(self):
+		""" build project document
+
+		Return:
+			document (in the form which load_project() accepts) or None if stream is empty
+		"""
+
+		self.loader.get_event()	# StreamStartEvent
+		if self.loader.check_event(yaml.StreamEndEvent):
+			return None
+		self.loader.get_event()	# DocumentStartEvent
+
+		if self.loader.check_event(yaml.MappingStartEvent):
+			self._get_node_event()
+			c = {}
+			while not self.loader.check_event(yaml.MappingEndEvent):
+				k = self.build_value(None)
+				if "product-backlog" == k:
+					c[k] = self._build_toplevel_stories()
+				else:
+					c[k] = self.build_value(None)
+			self.loader.get_event()
+		elif self.loader.check_event(yaml.SequenceStartEvent):
+			c = self._build_toplevel_stories()
+		else:
+			c = self.build_value("story")
+
+		self.loader.get_event()	# DocumentEndEvent
+		if not self.loader.check_event(yaml.StreamEndEvent):
+			event = self.loader.get_event()
+			raise yaml.composer.ComposerError("expected a single document in the stream", None, "but found another document", event.start_mark)
+		return c
+	# ### def build_document
+# ### class _ProjectEventBuilder
+
+def _load_project_events(srctext, lazy=False):
+	""" load project by building objects from parsing events
+
+	Project with anchors, aliases or merge keys is loaded by composing whole
+	document instead (not lazily).
+
+	Argument:
+		srctext - content of project file
+		lazy - build sub-stories, tasks and logs of top-level stories on first access
+	Return:
+		DevelopmentProject object
 	"""
 
-	add_after = None
+	registry = ObjectRegistry()
+	activate_registry(registry)
+	loader = _yaml_loader(srctext)
+	try:
+		builder = _ProjectEventBuilder(loader, lazy)
+		c = builder.build_document()
+	except _AnchorFoundError:
+		return _load_project_composed(srctext)
+	finally:
+		loader.dispose()
+	proj = load_project(c, registry)
+	if builder.end_mark is not None:
+		_record_source_chunks(proj, builder.item_marks, builder.end_mark, srctext)
+
+	for story in builder.lazy_stories:
+		if story._source_chunk is None:
+			# source text of story is not available, load eagerly instead
+			return _load_project_events(srctext, False)
+		story._lazy_source = story._source_chunk
+		story._rollup = None
+	return proj
+# ### def _load_project_events
+
+def _load_story_children_events(srctext):
+	""" build sub-stories, tasks and logs from source text of a top-level story
 
-	if len(args) >= 1:
-		add_after = args[0]
-	else:
-		print "ERR: need object ID to mark done"
-		return False
+	Argument:
+		srctext - source text of story (a single-item sequence)
+	Return:
+		dict of "sub-story", "task" and "log" to list of objects
+	"""
 
-	if add_after in _every_object:
-		t = _every_object[add_after]
-		t.set_status("DONE")
-		t.append_log(Log(log="mark task as done."))
-	else:
-		print "ERR: object for done is not found: [%r]" % (add_after,)
-		return False
+	loader = _yaml_loader(srctext)
+	try:
+		return _ProjectEventBuilder(loader).build_story_children()
+	finally:
+		loader.dispose()
+# ### def _load_story_children_events
 
-	return True
-# ### def command_mark_complete
+def read_project(filename, use_cache=False, lazy=False):
+	""" read project from given file
 
-def do_backup_project(filename, maxbackup=9):
-	for idx in range(maxbackup, 1, -1):
-		tgt_filename = ".".join( (filename, str(idx)) )
-		prv_filename = ".".join( (filename, str(idx-1)) )
+	Argument:
+		filename - path of project file
+		use_cache - try to load project from cache sidecar file and refresh the cache on miss
+		lazy - build sub-stories, tasks and logs of top-level stories on first access
+	Return:
+		DevelopmentProject object
+	"""
+
+	if use_cache:
+		fident = _get_file_identity(filename)
+		proj = _load_project_cache(filename, fident)
+		if proj is not None:
+			return proj
+
+	fp = open(filename, "r")
+	srctext = fp.read()
+	fp.close()
+	proj = _load_project_events(srctext, lazy)
+
+	if use_cache:
+		_save_project_cache(filename, fident, proj)
+	return proj
+# ### def read_project
+
+def _replace_file(filename, chunks):
+	""" atomically replace content of given file
+
+	Symbolic link is followed, the file it points to is replaced.
+
+	Argument:
+		filename - path of file
+		chunks - list of strings to write
+	"""
+
+	filename = os.path.realpath(filename)
+	dirname, basename, = os.path.split(filename)
+	try:
+		mode = stat.S_IMODE(os.stat(filename).st_mode)
+	except OSError:
+		umask = os.umask(0)
+		os.umask(umask)
+		mode = 0666 & ~umask
+
+	fd, tmp_filename, = tempfile.mkstemp(prefix="." + basename + ".", suffix=".tmp", dir=dirname)
+	try:
+		fp = os.fdopen(fd, "wb")
 		try:
-			os.unlink(tgt_filename)
-		except:
+			for chunk in chunks:
+				fp.write(chunk)
+			fp.flush()
+			os.fsync(fp.fileno())
+		finally:
+			fp.close()
+		os.chmod(tmp_filename, mode)
+		os.rename(tmp_filename, filename)
+	except:
+		try:
+			os.unlink(tmp_filename)
+		except OSError:
 			pass
-		if os.access(prv_filename, os.F_OK):
-			os.rename(prv_filename, tgt_filename)
+		raise
 
-	tgt_filename = ".".join( (filename, "1") )
-	shutil.copy(filename, tgt_filename)
-# ### def do_backup_project
+	# make the rename itself durable
+	try:
+		dfd = os.open(dirname, os.O_RDONLY)
+		try:
+			os.fsync(dfd)
+		finally:
+			os.close(dfd)
+	except OSError:
+		pass
+# ### def _replace_file
 
+def write_project(filename, proj, use_cache=False, backup=None, replacing=None):
+	""" write project into given file
 
-def main():
-	global _rt_config
-	_rt_config = read_runtimeconfig(".dprc")
+	The file is left untouched if it already has the serialized content.
+	Otherwise the content is written into a temporary file in the same folder,
+	synced to disk and renamed over the project file, so that other processes
+	never see a partially written project file (and backups hard linked to the
+	previous file are not affected).
 
-	cmdfunc = None
-	cmdargs = []
+	Argument:
+		filename - path of project file
+		proj - DevelopmentProject object to write
+		use_cache - update cache, index and search index sidecar files with written project
+		backup - function to call with filename and MD5 hex digest of its current content right before the file is rewritten (ex: do_backup_project)
+		replacing - function to call with MD5 hex digest of content to be written right before the file is replaced (after backup)
+	Return:
+		True if project file is written, False if content is unchanged
+	"""
 
-	for opt in sys.argv:
-		if cmdfunc is not None:
-			cmdargs.append(opt)
-		elif opt in ("add-story", "addstory", "a.s.", "as",):
-			cmdfunc = command_add_story
-		elif opt in ("add-task", "addtask", "a.t.", "at",):
-			cmdfunc = command_add_task
-		elif opt in ("done", "complete",):
-			cmdfunc = command_mark_complete
-		elif opt in ("rebuild", "r.b.", "rb", "r",):
-			cmdfunc = command_noop
-
-	if cmdfunc is None:
-		print "ERR: no command"
-		sys.exit(1)
+	chunks = _dump_project_chunks(proj)
+	# IDs may be allocated for new objects on dump
+	proj.drop_sorted_object_ids()
 
-	proj = read_project(_rt_config.active_projfile)
+	h = hashlib.md5()
+	for chunk, rootkind in chunks:
+		h.update(chunk)
+	digest = h.hexdigest()
 
-	if not cmdfunc(proj, cmdargs):
-		sys.exit(3)
+	try:
+		fident = _get_file_identity(filename)
+	except (IOError, OSError,):
+		fident = None
+	if (fident is not None) and (fident[2] == digest):
+		if use_cache:
+			if (_PROJECT_CACHE_VERSION, fident,) != _read_sidecar_header(_get_project_cache_filename(filename)):
+				_save_project_cache(filename, fident, proj)
+			if (_PROJECT_INDEX_VERSION, fident,) != _read_sidecar_header(_get_project_index_filename(filename)):
+				_save_project_index(filename, fident, chunks)
+			if (_SEARCH_INDEX_VERSION, fident,) != _read_sidecar_header(_get_search_index_filename(filename)):
+				_save_search_index(filename, fident, proj, chunks)
+		return False
+	if backup is not None:
+		backup(filename, None if (fident is None) else fident[2])
+	if replacing is not None:
+		replacing(digest)
+
+	_replace_file(filename, [chunk for chunk, rootkind in chunks])
+
+	if use_cache:
+		fident = _get_file_identity(filename, digest=digest)
+		_save_project_cache(filename, fident, proj)
+		_save_project_index(filename, fident, chunks)
+		_save_search_index(filename, fident, proj, chunks)
+	return True
+# ### def write_project
 
-	do_backup_project(_rt_config.active_projfile)
-	write_project(_rt_config.active_projfile, proj)
 
-	print 'OK'
+_PROJECT_CACHE_VERSION = 5
 
-	sys.exit(0)
-# ### def main
+def _get_project_cache_filename(filename):
+	return ".".join( (filename, "cache") )
+# ### def _get_project_cache_filename
+
+def _get_file_identity(filename, content=None, digest=None):
+	""" get identity of given file
+
+	Argument:
+		filename - path of file
+		content - content of file if it is already known (ex: just written)
+		digest - MD5 hex digest of content if it is already known
+	Return:
+		tuple of (size, modification time, MD5 hex digest of content)
+	"""
+
+	st = os.stat(filename)
+	if digest is not None:
+		return (st.st_size, st.st_mtime, digest,)
+	if content is not None:
+		return (st.st_size, st.st_mtime, hashlib.md5(content).hexdigest(),)
+	h = hashlib.md5()
+	fp = open(filename, "rb")
+	buf = fp.read(65536)
+	while buf:
+		h.update(buf)
+		buf = fp.read(65536)
+	fp.close()
+	return (st.st_size, st.st_mtime, h.hexdigest(),)
+# ### def _get_file_identity
+
+def _read_sidecar_header(sidecar_filename):
+	""" read (format version, identity of project file) from the head of cache or index sidecar file
+
+	Return:
+		tuple of (version, fident) or None if not available
+	"""
+
+	try:
+		fp = open(sidecar_filename, "rb")
+		try:
+			return cPickle.load(fp)
+		finally:
+			fp.close()
+	except Exception:
+		return None
+# ### def _read_sidecar_header
+
+def _load_project_cache(filename, fident):
+	""" load project from cache sidecar file of given project file
+
+	Argument:
+		filename - path of project file
+		fident - identity of project file from _get_file_identity()
+	Return:
+		DevelopmentProject object or None if cache is missing or outdated
+	"""
+
+	try:
+		fp = open(_get_project_cache_filename(filename), "rb")
+		try:
+			cache_version, cache_fident = cPickle.load(fp)
+			if (_PROJECT_CACHE_VERSION != cache_version) or (fident != cache_fident):
+				return None
+			proj = cPickle.load(fp)
+		finally:
+			fp.close()
+	except Exception:
+		return None
+
+	activate_registry(proj._registry)
+	return proj
+# ### def _load_project_cache
+
+def _save_project_cache(filename, fident, proj):
+	""" save project into cache sidecar file of given project file
+
+	Failures are ignored, the cache will simply be rebuilt on next read.
 
+	Argument:
+		filename - path of project file
+		fident - identity of project file from _get_file_identity()
+		proj - DevelopmentProject object loaded from or written to project file
+	"""
+
+	cache_filename = _get_project_cache_filename(filename)
+	try:
+		fp = open(cache_filename, "wb")
+		try:
+			cPickle.dump( (_PROJECT_CACHE_VERSION, fident,), fp, cPickle.HIGHEST_PROTOCOL)
+			cPickle.dump(proj, fp, cPickle.HIGHEST_PROTOCOL)
+		finally:
+			fp.close()
+	except Exception:
+		try:
+			os.unlink(cache_filename)
+		except:
+			pass
+# ### def _save_project_cache
+
+
+_PROJECT_INDEX_VERSION = 1
+
+def _get_project_index_filename(filename):
+	return ".".join( (filename, "idx") )
+# ### def _get_project_index_filename
+
+class _ChunkIndexer(object):
+	""" find line ranges of stories and tasks in YAML text from parsing events
+
+	Only sequence items which begin a line ("- " preceded by spaces) and end
+	at a line boundary are recorded.
+	"""
+
+	def __init__(self, loader, lines):
+		self.loader = loader
+		self.lines = lines
+		self.entries = []	# list of (object ID, kind, start line, end line, parent chain)
+	# ### def __init__
+
+	def _is_item_start(self, mark):
+		if mark.line >= len(self.lines):
+			return False
+		l = self.lines[mark.line]
+		c = mark.column
+		return (c >= 2) and ("- " == l[c-2:c]) and ("" == l[:c-2].strip())
+	# ### def _is_item_start
+
+	def _is_item_end(self, mark):
+		if mark.line >= len(self.lines):
+			return (mark.line == len(self.lines)) and (0 == mark.column)
+		return "" == self.lines[mark.line][:mark.column].strip()
+	# ### def _is_item_end
+
+	def index_value(self, kind, chain):
+		""" walk through next node and record stories and tasks in it
+
+		Argument:
+			kind - "story", "task", "project" or "log" for the node, None for plain value
+			chain - IDs of parent objects
+		Return:
+			ID of the node if it is a story or task with ID, None otherwise
+		"""
+
+		event = self.loader.get_event()
+		if isinstance(event, yaml.SequenceStartEvent):
+			items = []
+			while not self.loader.check_event(yaml.SequenceEndEvent):
+				mark = self.loader.peek_event().start_mark
+				items.append( (mark, self.index_value(kind, chain),) )
+			end_mark = self.loader.get_event().start_mark
+			for idx in range(len(items)):
+				mark, objid = items[idx]
+				if (objid is None) or (not self._is_item_start(mark)):
+					continue
+				if (idx + 1) < len(items):
+					next_mark = items[idx+1][0]
+					is_line_bounded = self._is_item_start(next_mark)
+				else:
+					next_mark = end_mark
+					is_line_bounded = self._is_item_end(next_mark)
+				if is_line_bounded:
+					self.entries.append( (objid, kind, mark.line, next_mark.line, chain,) )
+		elif isinstance(event, yaml.MappingStartEvent):
+			objid = None
+			idkey = {"story": "story-id", "task": "t-id"}.get(kind)
+			while not self.loader.check_event(yaml.MappingEndEvent):
+				if self.loader.check_event(yaml.ScalarEvent):
+					k = self.loader.get_event().value
+				else:
+					self.index_value(None, chain)
+					k = None
+				if (idkey is not None) and (idkey == k) and self.loader.check_event(yaml.ScalarEvent):
+					objid = str(self.loader.get_event().value)
+				elif objid is not None:
+					self.index_value(_stream_subkind.get((kind, k)), chain + (objid,))
+				else:
+					self.index_value(_stream_subkind.get((kind, k)), chain)
+			self.loader.get_event()
+			return objid
+		return None
+	# ### def index_value
+# ### class _ChunkIndexer
+
+def _index_chunk(chunk, rootkind):
+	""" find byte ranges of stories and tasks in given chunk of YAML document
+
+	Argument:
+		chunk - UTF-8 encoded text
+		rootkind - kind of root node ("project" or "story")
+	Return:
+		list of (object ID, kind, start offset, end offset, parent chain)
+	"""
+
+	lines = chunk.splitlines(True)
+	loader = _yaml_loader(chunk)
+	try:
+		indexer = _ChunkIndexer(loader, lines)
+		loader.get_event()	# StreamStartEvent
+		if loader.check_event(yaml.StreamEndEvent):
+			return []
+		loader.get_event()	# DocumentStartEvent
+		indexer.index_value(rootkind, ())
+	finally:
+		loader.dispose()
+
+	offsets = [0,]
+	for l in lines:
+		offsets.append(offsets[-1] + len(l))
+	return [(objid, kind, offsets[startline], offsets[endline], chain,) for objid, kind, startline, endline, chain in indexer.entries]
+# ### def _index_chunk
+
+def _load_project_index(filename, with_chunks=False):
+	""" load index sidecar file of given project file
+
+	Argument:
+		filename - path of project file
+		with_chunks - also load the index of each chunk (for rebuilding index)
+	Return:
+		tuple of (identity of indexed project file, dict of object ID to (kind, start offset, end offset, parent chain), dict of chunk digest to chunk index or None)
+		or None if index is not available
+	"""
+
+	try:
+		fp = open(_get_project_index_filename(filename), "rb")
+		try:
+			index_version, fident = cPickle.load(fp)
+			if _PROJECT_INDEX_VERSION != index_version:
+				return None
+			entries = cPickle.load(fp)
+			chunkindex = None
+			if with_chunks:
+				chunkindex = cPickle.load(fp)
+		finally:
+			fp.close()
+	except Exception:
+		return None
+	return (fident, entries, chunkindex,)
+# ### def _load_project_index
+
+def _save_project_index(filename, fident, chunks):
+	""" save ID index of given project file into index sidecar file
+
+	Chunks which are unchanged since last index are not parsed again.
+
+	Argument:
+		filename - path of project file
+		fident - identity of project file from _get_file_identity()
+		chunks - chunks of project file from _dump_project_chunks()
+	"""
+
+	index_filename = _get_project_index_filename(filename)
+
+	prev_chunkindex = {}
+	previndex = _load_project_index(filename, True)
+	if previndex is not None:
+		prev_chunkindex = previndex[2]
+
+	entries = {}
+	chunkindex = {}
+	offset = 0
+	try:
+		for chunk, rootkind in chunks:
+			if rootkind is not None:
+				for linebreak in ("\r", "\xc2\x85", "\xe2\x80\xa8", "\xe2\x80\xa9",):
+					if linebreak in chunk:
+						raise ValueError("unsupported line break")
+				digest = hashlib.md5(chunk).digest()
+				if digest in prev_chunkindex:
+					cidx = prev_chunkindex[digest]
+				else:
+					cidx = _index_chunk(chunk, rootkind)
+				chunkindex[digest] = cidx
+				for objid, kind, startoffset, endoffset, chain in cidx:
+					entries[objid] = (kind, offset + startoffset, offset + endoffset, chain,)
+			offset = offset + len(chunk)
+
+		fp = open(index_filename, "wb")
+		try:
+			cPickle.dump( (_PROJECT_INDEX_VERSION, fident,), fp, cPickle.HIGHEST_PROTOCOL)
+			cPickle.dump(entries, fp, cPickle.HIGHEST_PROTOCOL)
+			cPickle.dump(chunkindex, fp, cPickle.HIGHEST_PROTOCOL)
+		finally:
+			fp.close()
+	except Exception:
+		try:
+			os.unlink(index_filename)
+		except:
+			pass
+# ### def _save_project_index
+
+def lookup_object_text(filename, objid):
+	""" find text of given object in project file through index sidecar file
+
+	Argument:
+		filename - path of project file
+		objid - ID of story or task
+	Return:
+		tuple of (kind ("story" or "task"), UTF-8 encoded text of object, parent chain)
+		or None if index is outdated or object is not in index
+	"""
+
+	idx = _load_project_index(filename)
+	if (idx is None) or (objid not in idx[1]):
+		return None
+
+	kind, startoffset, endoffset, chain = idx[1][objid]
+	# identity is taken from the opened file (not the path), so that project
+	# file replaced by a writer meanwhile is never read with outdated offsets
+	fp = open(filename, "rb")
+	try:
+		st = os.fstat(fp.fileno())
+		if (0 == st.st_size) or (idx[0][:2] != (st.st_size, st.st_mtime,)):
+			return None
+		mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+		try:
+			if idx[0][2] != hashlib.md5(mm).hexdigest():
+				return None
+			text = mm[startoffset:endoffset]
+		finally:
+			mm.close()
+	finally:
+		fp.close()
+	return (kind, text, chain,)
+# ### def lookup_object_text
+
+
+_SEARCH_INDEX_VERSION = 1
+
+_SEARCH_TOKEN_REGEX = re.compile(u'([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]+)|([0-9a-z_\u00c0-\u024f]+)', re.UNICODE)
+
+def tokenize_text(text):
+	""" split text into search tokens
+
+	Runs of CJK characters become overlapped bigrams (a single character for
+	run of one character), other words are lower-cased Latin words.
+
+	Argument:
+		text - unicode (or UTF-8 encoded) text
+	Return:
+		list of unicode tokens
+	"""
+
+	if text is None:
+		return []
+	if not isinstance(text, unicode):
+		text = str(text).decode("utf-8", "replace")
+	result = []
+	for cjk, word, in _SEARCH_TOKEN_REGEX.findall(text.lower()):
+		if word:
+			result.append(word)
+		elif 1 == len(cjk):
+			result.append(cjk)
+		else:
+			for idx in xrange(len(cjk) - 1):
+				result.append(cjk[idx:idx+2])
+	return result
+# ### def tokenize_text
+
+def _get_search_entry(obj):
+	""" get search index entry of given story or task from its text, note and log records
+
+	Return:
+		tuple of (object ID, kind, title, dict of token to count)
+	"""
+
+	if isinstance(obj, Story):
+		kind = "story"
+		texts = [obj.story, obj.note,]
+	else:
+		kind = "task"
+		texts = [obj.task, obj.note,]
+	texts.extend([logfields[1] for logfields in _iterate_log_fields(obj)])
+
+	counts = {}
+	for t in texts:
+		for token in tokenize_text(t):
+			counts[token] = counts.get(token, 0) + 1
+	title = _to_output_string(texts[0]).strip().split("\n", 1)[0]
+	return (obj.get_object_id(), kind, title, counts,)
+# ### def _get_search_entry
+
+class SearchIndex(object):
+	""" inverted index of text of stories and tasks
+
+	Entries are grouped by chunk (top-level story) of project file, so that
+	only changed chunks are tokenized again when the index is updated.
+	Matched objects are ranked by BM25.
+	"""
+
+	K1 = 1.2
+	B = 0.75
+
+	def __init__(self):
+		super(SearchIndex, self).__init__()
+
+		self.chunks = {}	# chunk key (digest) to list of object IDs
+		self.docs = {}	# object ID to (kind, title, number of tokens, distinct tokens)
+		self.postings = {}	# token to dict of object ID to count
+		self.total_length = 0
+	# ### def __init__
+
+	def add_chunk(self, key, objs):
+		""" index given stories and tasks as a chunk
+
+		Argument:
+			key - key of chunk (digest of chunk text)
+			objs - Story and Task objects in the chunk
+		"""
+
+		objids = []
+		for obj in objs:
+			objid, kind, title, counts, = _get_search_entry(obj)
+			if (objid is None) or (objid in self.docs):
+				continue
+			objids.append(objid)
+			length = sum(counts.itervalues())
+			self.docs[objid] = (kind, title, length, tuple(counts),)
+			self.total_length = self.total_length + length
+			for token, c in counts.iteritems():
+				self.postings.setdefault(token, {})[objid] = c
+		self.chunks[key] = objids
+	# ### def add_chunk
+
+	def remove_chunk(self, key):
+		for objid in self.chunks.pop(key, ()):
+			kind, title, length, tokens, = self.docs.pop(objid)
+			self.total_length = self.total_length - length
+			for token in tokens:
+				p = self.postings[token]
+				del p[objid]
+				if not p:
+					del self.postings[token]
+	# ### def remove_chunk
+
+	def update(self, proj, chunks):
+		""" make index reflect given chunks of project
+
+		Argument:
+			proj - DevelopmentProject object
+			chunks - chunks of project from _dump_project_chunks()
+		"""
+
+		stories = iter(proj.product_backlog or ())
+		keys = set()
+		added = []
+		for chunk, rootkind in chunks:
+			if rootkind is None:
+				continue
+			story = stories.next() if ("story" == rootkind) else proj
+			key = hashlib.md5(chunk).digest()
+			keys.add(key)
+			if key not in self.chunks:
+				added.append( (key, story,) )
+		# remove first, objects of a modified story move to a new chunk
+		for key in [k for k in self.chunks if k not in keys]:
+			self.remove_chunk(key)
+		for key, story, in added:
+			if story is proj:
+				self.add_chunk(key, iterate_objects(proj))
+			else:
+				self.add_chunk(key, itertools.chain((story,), iterate_objects(story)))
+	# ### def update
+
+	def _get_postings(self, token):
+		if (1 == len(token)) and (u"\u3040" <= token):
+			# single CJK character is matched against itself and bigrams containing it
+			p = {}
+			for k, v in self.postings.iteritems():
+				if token in k:
+					for objid, c in v.iteritems():
+						p[objid] = p.get(objid, 0) + c
+			return p
+		return self.postings.get(token) or {}
+	# ### def _get_postings
+
+	def search(self, text):
+		""" find stories and tasks containing all tokens of given text
+
+		Argument:
+			text - search text
+		Return:
+			list of (score, object ID, kind, title) in descending order of score
+		"""
+
+		tokens = set(tokenize_text(text))
+		if (not tokens) or (not self.docs):
+			return []
+		postings = [self._get_postings(token) for token in tokens]
+		postings.sort(key=len)
+		if 0 == len(postings[0]):
+			return []
+
+		n = len(self.docs)
+		avglen = float(self.total_length) / n or 1.0
+		result = []
+		for objid in postings[0]:
+			if objid not in self.docs:
+				continue
+			kind, title, length, tokens, = self.docs[objid]
+			score = 0.0
+			for p in postings:
+				c = p.get(objid)
+				if c is None:
+					score = None
+					break
+				idf = math.log(1.0 + (n - len(p) + 0.5) / (len(p) + 0.5))
+				score = score + idf * c * (SearchIndex.K1 + 1) / (c + SearchIndex.K1 * (1 - SearchIndex.B + SearchIndex.B * length / avglen))
+			if score is not None:
+				result.append( (score, objid, kind, title,) )
+		result.sort(key=lambda r: (-r[0], r[1],))
+		return result
+	# ### def search
+# ### class SearchIndex
+
+def _get_search_index_filename(filename):
+	return ".".join( (filename, "search") )
+# ### def _get_search_index_filename
+
+def _load_search_index(filename):
+	""" load search index sidecar file of given project file
+
+	Return:
+		tuple of (identity of indexed project file, SearchIndex object) or None if not available
+	"""
+
+	try:
+		fp = open(_get_search_index_filename(filename), "rb")
+		try:
+			index_version, fident = cPickle.load(fp)
+			if _SEARCH_INDEX_VERSION != index_version:
+				return None
+			sidx = cPickle.load(fp)
+		finally:
+			fp.close()
+	except Exception:
+		return None
+	return (fident, sidx,)
+# ### def _load_search_index
+
+def _save_search_index(filename, fident, proj, chunks):
+	""" update search index sidecar file of given project file (only changed chunks are tokenized)
+
+	Argument:
+		filename - path of project file
+		fident - identity of project file from _get_file_identity()
+		proj - DevelopmentProject object loaded from or written to project file
+		chunks - chunks of project file from _dump_project_chunks()
+	Return:
+		the updated SearchIndex object
+	"""
+
+	sidx = proj._search_index
+	if sidx is None:
+		prev = _load_search_index(filename)
+		sidx = SearchIndex() if (prev is None) else prev[1]
+	sidx.update(proj, chunks)
+
+	index_filename = _get_search_index_filename(filename)
+	try:
+		fp = open(index_filename, "wb")
+		try:
+			cPickle.dump( (_SEARCH_INDEX_VERSION, fident,), fp, cPickle.HIGHEST_PROTOCOL)
+			cPickle.dump(sidx, fp, cPickle.HIGHEST_PROTOCOL)
+		finally:
+			fp.close()
+	except Exception:
+		try:
+			os.unlink(index_filename)
+		except:
+			pass
+	return sidx
+# ### def _save_search_index
+
+def get_search_index(filename):
+	""" get search index of given project file, the index is updated if project file changed
+
+	Argument:
+		filename - path of project file
+	Return:
+		SearchIndex object
+	"""
+
+	fident = _get_file_identity(filename)
+	r = _load_search_index(filename)
+	if (r is not None) and (r[0] == fident):
+		return r[1]
+	proj = read_project(filename, True, True)
+	return _save_search_index(filename, fident, proj, _dump_project_chunks(proj))
+# ### def get_search_index
+
+def attach_search_index(filename, proj):
+	""" let given project start with the index of search index sidecar file (if available)
+
+	Only chunks changed since the sidecar file was written are tokenized on
+	next search.
+
+	Argument:
+		filename - path of project file
+		proj - DevelopmentProject object loaded from project file
+	"""
+
+	r = _load_search_index(filename)
+	if r is not None:
+		proj._search_index = r[1]
+# ### def attach_search_index
+
+def get_project_search_index(proj):
+	""" get search index kept with given project, the index is updated to reflect current project
+
+	Only top-level stories changed since last update are tokenized again.
+
+	Argument:
+		proj - DevelopmentProject object
+	Return:
+		SearchIndex object
+	"""
+
+	chunks = _dump_project_chunks(proj)
+	# IDs may be allocated for new objects on dump
+	proj.drop_sorted_object_ids()
+	if proj._search_index is None:
+		proj._search_index = SearchIndex()
+	proj._search_index.update(proj, chunks)
+	return proj._search_index
+# ### def get_project_search_index
+
+class RuntimeConfiguration(object):
+	def __init__(self, username, active_projfile, archive_projfile, log_store=False, journal_threshold=0, backup_count=9, lock_timeout=10.0, optimistic_lock=True, auto_archive=None):
+		self.username = username
+		self.active_projfile = active_projfile
+		self.archive_projfile = archive_projfile
+		self.log_store = log_store
+		self.journal_threshold = journal_threshold	# compact journal when it reaches given number of entries, 0 disables journal
+		self.backup_count = backup_count
+		self.lock_timeout = lock_timeout	# seconds to wait for lock of project file
+		self.optimistic_lock = optimistic_lock	# only lock project file on write, re-run command if file changed meanwhile
+		self.auto_archive = auto_archive	# archive stories done for given days on compaction, None disables
+	# ### def __init__
+# ### class RuntimeConfiguration
+
+def read_runtimeconfig(filename):
+	fp = open(filename, "r")
+	c = yaml.load(fp, Loader=_yaml_loader)
+	fp.close()
+
+	username = None
+	if "DP_USERNAME" in os.environ:
+		username = os.environ["DP_USERNAME"]
+	elif "username" in c:
+		username = c["username"]
+
+	active_projfile = c["dp-active"]
+	archive_projfile = None
+	if "dp-archive" in c:
+		archive_projfile = c["dp-archive"]
+
+	log_store = False
+	if "DP_LOG_STORE" in os.environ:
+		log_store = ("columnar" == os.environ["DP_LOG_STORE"].lower())
+	elif "log-store" in c:
+		log_store = ("columnar" == str(c["log-store"]).lower())
+
+	journal_threshold = 0
+	if "journal-threshold" in c:
+		journal_threshold = _convert_to_integer(c["journal-threshold"]) or 0
+
+	backup_count = 9
+	if "backup-count" in c:
+		backup_count = _convert_to_integer(c["backup-count"])
+		if backup_count is None:
+			backup_count = 9
+
+	lock_timeout = 10.0
+	if "lock-timeout" in c:
+		lock_timeout = float(c["lock-timeout"])
+
+	optimistic_lock = True
+	if "lock-mode" in c:
+		optimistic_lock = ("exclusive" != str(c["lock-mode"]).lower())
+
+	auto_archive = None
+	if "auto-archive" in c:
+		auto_archive = _convert_to_integer(c["auto-archive"])
+
+	return RuntimeConfiguration(username, active_projfile, archive_projfile, log_store, journal_threshold, backup_count, lock_timeout, optimistic_lock, auto_archive)
+# ### def read_runtimeconfig
+
+
+
+def command_rebuild(proj, args):
+	""" respond to "rebuild", "r.b.", "rb", "r" command
+
+	Recorded source text of stories is dropped so that whole project will be
+	serialized in normalized form.
+	"""
+
+	for story in proj.substory:
+		story._source_chunk = None
+	return True
+# ### def command_rebuild
+
+def command_add_story(proj, args):
+	""" respond to "add-story", "addstory", "a.s.", "as" command
+	"""
+
+	add_after = None
+
+	if len(args) >= 1:
+		add_after = args[0]
+
+	nobj = Story()
+	if add_after is None:
+		proj.append_substory(nobj)
+	else:
+		parent = find_object_by_prefix(proj, add_after, "ERR: parent object not found: [%r]")
+		if parent is None:
+			return False
+		parent.append_substory(nobj)
+
+	return True
+# ### def command_add_story
+
+def command_add_task(proj, args):
+	""" respond to "add-task", "addtask", "a.t.", "at" command
+	"""
+
+	add_after = None
+
+	if len(args) >= 1:
+		add_after = args[0]
+
+	nobj = Task()
+	if add_after is None:
+		proj.append_subtask(nobj)
+	else:
+		parent = find_object_by_prefix(proj, add_after, "ERR: parent object not found: [%r]")
+		if parent is None:
+			return False
+		parent.append_subtask(nobj)
+
+	return True
+# ### def command_add_task
+
+_DONE_LOG_TEXT = "mark task as done."
+
+def command_mark_complete(proj, args):
+	""" respond to "done", "complete" command
+	"""
+
+	add_after = None
+
+	if len(args) >= 1:
+		add_after = args[0]
+	else:
+		print "ERR: need object ID to mark done"
+		return False
+
+	t = find_object_by_prefix(proj, add_after, "ERR: object for done is not found: [%r]")
+	if t is None:
+		return False
+	t.set_status("DONE")
+	t.append_log(Log(log=_DONE_LOG_TEXT))
+
+	return True
+# ### def command_mark_complete
+
+def command_move(proj, args):
+	""" respond to "move", "mv" command
+
+	Move given story or task (with everything under it) to the end of new
+	parent, a story is moved to top-level if new parent is not given.
+	"""
+
+	if len(args) < 1:
+		print "ERR: need object ID to move"
+		return False
+	obj = find_object_by_prefix(proj, args[0], "ERR: object to move is not found: [%r]")
+	if obj is None:
+		return False
+	if len(args) >= 2:
+		parent = find_object_by_prefix(proj, args[1], "ERR: new parent object not found: [%r]")
+		if parent is None:
+			return False
+	elif isinstance(obj, Story):
+		parent = proj
+	else:
+		print "ERR: need new parent object ID to move task"
+		return False
+
+	if isinstance(obj, Story) and isinstance(parent, Task):
+		print "ERR: story cannot be moved under task: [%r]" % (args[1],)
+		return False
+	ancestor = parent
+	while ancestor is not None:
+		if ancestor is obj:
+			print "ERR: object cannot be moved under itself: [%r]" % (args[1],)
+			return False
+		ancestor = getattr(ancestor, "_parent", None)
+
+	# lazily loaded children are only looked up through top-level stories
+	if getattr(obj, "_lazy_source", None) is not None:
+		obj._materialize()
+	detach_object(obj)
+	obj.mark_modified()
+	if isinstance(obj, Story):
+		parent.append_substory(obj)
+	else:
+		parent.append_subtask(obj)
+
+	return True
+# ### def command_move
+
+def command_remove(proj, args):
+	""" respond to "rm", "remove" command
+
+	Remove given story or task with everything under it.
+	"""
+
+	if len(args) < 1:
+		print "ERR: need object ID to remove"
+		return False
+	obj = find_object_by_prefix(proj, args[0], "ERR: object to remove is not found: [%r]")
+	if obj is None:
+		return False
+
+	if getattr(obj, "_lazy_source", None) is not None:
+		obj._materialize()
+	detach_object(obj)
+	objids = []
+	for o in itertools.chain((obj,), iterate_objects(obj, False)):
+		objid = o.get_object_id()
+		if objid is not None:
+			objids.append(objid)
+		o._registry.unregister(o)
+	proj.forget_object_ids(objids)
+
+	return True
+# ### def command_remove
+
+def command_batch(proj, args):
+	""" respond to "batch" command
+
+	Run given command lines (one command per line, "#" begins a comment)
+	against the project. Every line is run even if some of them failed so
+	that all errors are reported.
+
+	Argument:
+		proj - DevelopmentProject object
+		args - command lines to run
+	Return:
+		True if all commands succeed, False otherwise
+	"""
+
+	result = True
+	lineno = 0
+	# lines are run through run_command() with context of the batch, so that derived data (ex: field index) is refreshed after each line
+	tstamp, author, = _command_context if (_command_context is not None) else (_get_command_time(), None,)
+
+	for l in args:
+		lineno = lineno + 1
+		if isinstance(l, unicode):
+			l = l.encode("utf-8")
+		try:
+			cmdline = shlex.split(l, True)
+		except ValueError as e:
+			print "ERR: batch line %d: %s" % (lineno, e,)
+			result = False
+			continue
+		if 0 == len(cmdline):
+			continue
+
+		cmdfunc = _lookup_command(cmdline[0])
+		if (cmdfunc is None) or (cmdfunc is command_batch):
+			print "ERR: batch line %d: unknown command: [%r]" % (lineno, cmdline[0],)
+			result = False
+		elif not run_command(proj, cmdfunc, cmdline[1:], tstamp, author):
+			print "ERR: batch line %d: command failed: %s" % (lineno, l.strip(),)
+			result = False
+
+	return result
+# ### def command_batch
+
+def _read_batch_input(args):
+	""" read command lines for "batch" command
+
+	Argument:
+		args - command arguments, first argument is the file to read (or "-" for stdin)
+	Return:
+		list of command lines
+	"""
+
+	if (len(args) >= 1) and ("-" != args[0]):
+		fp = open(args[0], "r")
+		try:
+			return fp.read().splitlines()
+		finally:
+			fp.close()
+	return sys.stdin.read().splitlines()
+# ### def _read_batch_input
+
+
+def _to_output_string(v):
+	""" convert given value to (UTF-8 encoded) string for printing """
+
+	if v is None:
+		return ""
+	if isinstance(v, unicode):
+		return v.encode("utf-8")
+	return str(v)
+# ### def _to_output_string
+
+def _get_object_summary(obj):
+	""" get one line summary of given story or task
+
+	Argument:
+		obj - Story or Task object
+	Return:
+		summary string in form of "ID KIND STATUS TITLE"
+	"""
+
+	if isinstance(obj, Story):
+		kind = "story"
+		status = "-"
+		title = obj.story
+	else:
+		kind = "task"
+		status = "open"
+		if obj.status is not None:
+			status = obj.status.split(" ", 1)[0]
+		title = obj.task
+	title = _to_output_string(title).strip().split("\n", 1)[0]
+	return "%s %s %s %s" % (_to_output_string(obj.get_object_id()) or "-", kind, _to_output_string(status), title,)
+# ### def _get_object_summary
+
+def _get_command_target(proj, args, cmdname):
+	""" get object specified by first command argument (or project if not given)
+
+	Argument:
+		proj - DevelopmentProject object
+		args - command arguments
+		cmdname - name of command for error message
+	Return:
+		found object or None if object is not found
+	"""
+
+	if len(args) < 1:
+		return proj
+	return find_object_by_prefix(proj, args[0], "ERR: object for " + cmdname + " is not found: [%r]")
+# ### def _get_command_target
+
+def command_show(proj, args):
+	""" respond to "show" command (read-only)
+	"""
+
+	if len(args) < 1:
+		print "ERR: need object ID to show"
+		return False
+	if (_rt_config is not None) and (_rt_config.archive_projfile is not None) and (0 == len(resolve_object_id(proj, args[0]))):
+		r = lookup_archived_object(_rt_config.archive_projfile, args[0])
+		if (r is not None) and _print_object_text(r[0], r[1]):
+			return True
+	obj = _get_command_target(proj, args, "show")
+	if obj is None:
+		return False
+
+	_print_object_yaml(obj)
+
+	return True
+# ### def command_show
+
+def _print_object_yaml(obj):
+	if isinstance(obj, Story):
+		node = yamlnodedump_stories(obj)
+	else:
+		node = yamlnodedump_tasks(obj)
+	sys.stdout.write(yaml.serialize(node, Dumper=_yaml_dumper, encoding='utf-8', allow_unicode=True))
+# ### def _print_object_yaml
+
+def show_object_by_index(filename, objid):
+	""" show object with given ID by reading only its text from project file (see lookup_object_text())
+
+	Argument:
+		filename - path of project file
+		objid - ID of story or task
+	Return:
+		True if object is shown, False if object cannot be found through index
+	"""
+
+	r = lookup_object_text(filename, objid)
+	if r is None:
+		return False
+	return _print_object_text(r[0], r[1])
+# ### def show_object_by_index
+
+def _print_object_text(kind, text):
+	""" print object from its text in project file
+
+	Argument:
+		kind - "story" or "task"
+		text - UTF-8 encoded text of the object (an item of sequence)
+	Return:
+		True if object is printed, False if text does not contain exactly one object
+	"""
+
+	c = yaml.load(text, Loader=_yaml_loader)
+	# keep built objects out of registry of loaded project (if any)
+	prev_registry = activate_registry(ObjectRegistry())
+	try:
+		if "story" == kind:
+			objs = load_stories(c)
+		else:
+			objs = load_tasks(c)
+	finally:
+		activate_registry(prev_registry)
+	if 1 != len(objs):
+		return False
+	_print_object_yaml(objs[0])
+	return True
+# ### def _print_object_text
+
+def command_list(proj, args):
+	""" respond to "ls", "list" command (read-only)
+	"""
+
+	obj = _get_command_target(proj, args, "ls")
+	if obj is None:
+		return False
+
+	for s in getattr(obj, "substory", ()):
+		print _get_object_summary(s)
+	for t in getattr(obj, "subtask", ()):
+		print _get_object_summary(t)
+
+	return True
+# ### def command_list
+
+def _print_tree(obj, depth):
+	for s in getattr(obj, "substory", ()):
+		print "  " * depth + _get_object_summary(s)
+		_print_tree(s, depth + 1)
+	for t in getattr(obj, "subtask", ()):
+		print "  " * depth + _get_object_summary(t)
+		_print_tree(t, depth + 1)
+# ### def _print_tree
+
+def command_tree(proj, args):
+	""" respond to "tree" command (read-only)
+	"""
+
+	obj = _get_command_target(proj, args, "tree")
+	if obj is None:
+		return False
+
+	_print_tree(obj, 0)
+
+	return True
+# ### def command_tree
+
+def command_status(proj, args):
+	""" respond to "status", "st" command (read-only)
+	"""
+
+	obj = _get_command_target(proj, args, "status")
+	if obj is None:
+		return False
+
+	rollup = get_rollup(obj)
+	print "stories: %d" % (rollup.stories,)
+	print "tasks: %d (done: %d, open: %d)" % (rollup.tasks, rollup.done_tasks, rollup.tasks - rollup.done_tasks,)
+	print "points: %d (done: %d, remaining: %d)" % (rollup.points, rollup.done_points, rollup.get_remaining_points(),)
+
+	return True
+# ### def command_status
+
+_QUERY_TERM_REGEX = re.compile(r'^([a-z-]+)(<=|>=|!=|=|<|>)(.*)$')
+
+_QUERY_OPERATORS = {
+	"=": operator.eq,
+	"!=": operator.ne,
+	"<": operator.lt,
+	"<=": operator.le,
+	">": operator.gt,
+	">=": operator.ge,
+}
+
+# fields of query: (allowed operators, is field of log records)
+_QUERY_FIELDS = {
+	"kind": (("=",), False,),
+	"under": (("=",), False,),
+	"status": (("=", "!=",), False,),
+	"point": (("=", "!=", "<", "<=", ">", ">=",), False,),
+	"estimated-time": (("=", "!=", "<", "<=", ">", ">=",), False,),
+	"author": (("=", "!=",), True,),
+	"time": (("=", "!=", "<", "<=", ">", ">=",), True,),
+}
+
+def parse_query(args):
+	""" parse arguments of query command
+
+	Each filter term is in form of FIELD OP VALUE without spaces (ex:
+	"point>=3", "status=done", "time<2012-08-01"), all terms must be
+	satisfied. "--limit N" stops after N results.
+
+	Argument:
+		args - command arguments
+	Return:
+		tuple of (list of (field, operator, converted value), limit or None)
+	Raise:
+		ValueError if any argument is malformed
+	"""
+
+	terms = []
+	limit = None
+	args = list(args)
+	while args:
+		a = args.pop(0)
+		if "--limit" == a:
+			if not args:
+				raise ValueError("need number for --limit")
+			a = "--limit=" + args.pop(0)
+		if a.startswith("--limit="):
+			limit = _convert_to_integer(a[8:])
+			if (limit is None) or (limit < 0):
+				raise ValueError("need number for --limit: %r" % (a[8:],))
+			continue
+
+		m = _QUERY_TERM_REGEX.match(a)
+		if (m is None) or (m.group(1) not in _QUERY_FIELDS):
+			raise ValueError("malformed filter term: %r" % (a,))
+		field, op, v, = m.groups()
+		if op not in _QUERY_FIELDS[field][0]:
+			raise ValueError("operator %s is not supported by %s" % (op, field,))
+
+		if "kind" == field:
+			v = v.lower()
+			if v not in ("story", "task", "log",):
+				raise ValueError("kind should be one of story, task or log: %r" % (v,))
+		elif "status" == field:
+			v = v.upper()
+		elif field in ("point", "estimated-time",):
+			v = _convert_to_integer(v)
+			if v is None:
+				raise ValueError("need number for %s: %r" % (field, a,))
+		elif "time" == field:
+			v = _convert_to_datetime(v)
+			if v is None:
+				raise ValueError("need date and time for %s: %r" % (field, a,))
+		elif "author" == field:
+			v = v.decode("utf-8")
+		terms.append( (field, op, v,) )
+	return (terms, limit,)
+# ### def parse_query
+
+class _FieldIndex(object):
+	""" per-field index of stories and tasks of a project for query
+
+	Objects are numbered in document order (depth-first), so that objects
+	under a story or task occupy a continuous range of positions. For each
+	indexed field, positions are grouped by field value. Value of "status"
+	is the first word of task status (None for open task), values of
+	"author" and "time" are taken from log records of the object.
+	"""
+
+	FIELDS = ("status", "point", "estimated-time", "author", "time",)
+
+	def __init__(self, proj):
+		super(_FieldIndex, self).__init__()
+
+		self.objects = []
+		self.position = {}	# id() of object to position
+		self.subtree_end = []	# position next to the last descendant of each object
+		self.values = {}
+		for field in _FieldIndex.FIELDS:
+			self.values[field] = {}
+		self._add_subtree(proj)
+
+		self.keys = {}
+		for field in _FieldIndex.FIELDS:
+			self.keys[field] = sorted([k for k in self.values[field] if k is not None])
+	# ### def __init__
+
+	def _add_value(self, field, v, pos):
+		self.values[field].setdefault(v, []).append(pos)
+	# ### def _add_value
+
+	def _add_subtree(self, c):
+		for obj in itertools.chain(getattr(c, "substory", ()), getattr(c, "subtask", ())):
+			pos = len(self.objects)
+			self.objects.append(obj)
+			self.position[id(obj)] = pos
+			self.subtree_end.append(None)
+
+			if isinstance(obj, Task):
+				self._add_value("status", None if (obj.status is None) else obj.status.split(" ", 1)[0].upper(), pos)
+				if obj.estimated_time is not None:
+					self._add_value("estimated-time", obj.estimated_time, pos)
+			if obj.point is not None:
+				self._add_value("point", obj.point, pos)
+			authors = set()
+			times = set()
+			for log_id, log, record_time, author, action, in _iterate_log_fields(obj):
+				if author is not None:
+					authors.add(author)
+				if isinstance(record_time, datetime.datetime):
+					times.add(record_time)
+			for v in authors:
+				self._add_value("author", v, pos)
+			for v in times:
+				self._add_value("time", v, pos)
+
+			self._add_subtree(obj)
+			self.subtree_end[pos] = len(self.objects)
+	# ### def _add_subtree
+
+	def lookup(self, field, op, v):
+		""" find positions of objects which may satisfy given term
+
+		Argument:
+			field - name of field
+			op - operator
+			v - converted value
+		Return:
+			set of positions, or None if the term cannot be looked up through index
+		"""
+
+		if (field not in self.values) or ("!=" == op):
+			return None
+		values = self.values[field]
+		if "status" == field:
+			if "OPEN" == v:
+				matched_keys = (None,)
+			else:
+				matched_keys = [k for k in self.keys[field] if k.startswith(v) or v.startswith(k)]
+		else:
+			keys = self.keys[field]
+			if "=" == op:
+				matched_keys = (v,)
+			elif "<" == op:
+				matched_keys = keys[:bisect.bisect_left(keys, v)]
+			elif "<=" == op:
+				matched_keys = keys[:bisect.bisect_right(keys, v)]
+			elif ">" == op:
+				matched_keys = keys[bisect.bisect_right(keys, v):]
+			else:
+				matched_keys = keys[bisect.bisect_left(keys, v):]
+		result = set()
+		for k in matched_keys:
+			result.update(values.get(k, ()))
+		return result
+	# ### def lookup
+# ### class _FieldIndex
+
+def get_field_index(proj):
+	""" get field index of given project (built on first use, all stories are materialized) """
+
+	registry = proj._registry
+	if registry._field_index is None:
+		registry._field_index = _FieldIndex(proj)
+	return registry._field_index
+# ### def get_field_index
+
+def _iterate_log_fields(obj):
+	""" iterate through field tuples (log_id, log, record_time, author, action) of log records of given story or task """
+
+	logrecs = obj.logrecord
+	if isinstance(logrecs, LogView):
+		return logrecs.iter_fields()
+	return ((l.log_id, l.log, l.record_time, l.author, l.action,) for l in logrecs)
+# ### def _iterate_log_fields
+
+def _match_object_term(obj, field, op, v):
+	if "status" == field:
+		if not isinstance(obj, Task):
+			return False
+		if "OPEN" == v:
+			matched = obj.status is None
+		else:
+			matched = (obj.status is not None) and _check_string_prefix(obj.status, v)
+		return matched if ("=" == op) else (not matched)
+	if "point" == field:
+		objv = obj.point
+	else:
+		objv = getattr(obj, "estimated_time", None)
+	return (objv is not None) and _QUERY_OPERATORS[op](objv, v)
+# ### def _match_object_term
+
+def _match_log_terms(logfields, terms):
+	log_id, log, record_time, author, action, = logfields
+	for field, op, v, in terms:
+		if "author" == field:
+			if (author is None) or (not _QUERY_OPERATORS[op](author, v)):
+				return False
+		elif (not isinstance(record_time, datetime.datetime)) or (not _QUERY_OPERATORS[op](record_time, v)):
+			return False
+	return True
+# ### def _match_log_terms
+
+def iterate_query(proj, terms):
+	""" lazily iterate through objects satisfying given filter terms (in document order)
+
+	Terms on indexed fields are looked up through field index to get
+	candidates, "under" limits candidates to descendants of the object. Every
+	candidate is still checked against all terms.
+
+	Argument:
+		proj - DevelopmentProject object
+		terms - list of (field, operator, value) from parse_query(), value of "under" term should be the Story or Task object
+	Return:
+		generator of Story and Task objects, or (owner object, log field tuple) for "kind=log"
+	"""
+
+	kind = None
+	under = None
+	object_terms = []
+	log_terms = []
+	for field, op, v, in terms:
+		if "kind" == field:
+			kind = v
+		elif "under" == field:
+			under = v
+		elif _QUERY_FIELDS[field][1]:
+			log_terms.append( (field, op, v,) )
+		else:
+			object_terms.append( (field, op, v,) )
+
+	positions = None
+	index_terms = [t for t in terms if t[0] in _FieldIndex.FIELDS]
+	if index_terms:
+		idx = get_field_index(proj)
+		for field, op, v, in index_terms:
+			p = idx.lookup(field, op, v)
+			if p is not None:
+				positions = p if (positions is None) else (positions & p)
+	if positions is not None:
+		positions = sorted(positions)
+		if under is not None:
+			upos = idx.position[id(under)]
+			positions = positions[bisect.bisect_right(positions, upos):bisect.bisect_left(positions, idx.subtree_end[upos])]
+		candidates = (idx.objects[pos] for pos in positions)
+	else:
+		candidates = iterate_objects(proj if (under is None) else under)
+
+	for obj in candidates:
+		if (("story" == kind) and (not isinstance(obj, Story))) or (("task" == kind) and (not isinstance(obj, Task))):
+			continue
+		is_matched = True
+		for field, op, v, in object_terms:
+			if not _match_object_term(obj, field, op, v):
+				is_matched = False
+				break
+		if not is_matched:
+			continue
+		if "log" == kind:
+			for logfields in _iterate_log_fields(obj):
+				if _match_log_terms(logfields, log_terms):
+					yield (obj, logfields,)
+		elif log_terms:
+			for logfields in _iterate_log_fields(obj):
+				if _match_log_terms(logfields, log_terms):
+					yield obj
+					break
+		else:
+			yield obj
+# ### def iterate_query
+
+def command_query(proj, args):
+	""" respond to "query", "q" command (read-only)
+
+	Print stories, tasks (or log records with "kind=log") satisfying all
+	given filter terms, see parse_query() for the form of terms.
+	Fields: kind (story, task or log), status (prefix of status or "open"),
+	point, estimated-time, author and time (of log records, object matches
+	if any of its log records matches), under (ID of ancestor).
+	"""
+
+	try:
+		terms, limit, = parse_query(args)
+	except ValueError as e:
+		print "ERR: %s" % (e,)
+		return False
+
+	for idx in range(len(terms)):
+		field, op, v, = terms[idx]
+		if "under" == field:
+			obj = find_object_by_prefix(proj, v, "ERR: object for query is not found: [%r]")
+			if obj is None:
+				return False
+			terms[idx] = (field, op, obj,)
+
+	for r in itertools.islice(iterate_query(proj, terms), limit):
+		if isinstance(r, tuple):
+			owner, logfields, = r
+			log_id, log, record_time, author, action, = logfields
+			if isinstance(record_time, datetime.datetime):
+				record_time = _get_tstamp_string(record_time)
+			print "%s log %s %s %s" % (_to_output_string(owner.get_object_id()) or "-", _to_output_string(record_time) or "-", _to_output_string(author) or "-", _to_output_string(log or "").strip().split("\n", 1)[0],)
+		else:
+			print _get_object_summary(r)
+
+	return True
+# ### def command_query
+
+def _parse_search_args(args):
+	""" split arguments of search command into (search text, limit or None)
+
+	Raise:
+		ValueError if --limit is malformed
+	"""
+
+	words = []
+	limit = None
+	args = list(args)
+	while args:
+		a = args.pop(0)
+		if "--limit" == a:
+			a = "--limit=" + (args.pop(0) if args else "")
+		if a.startswith("--limit="):
+			limit = _convert_to_integer(a[8:])
+			if (limit is None) or (limit < 0):
+				raise ValueError("need number for --limit: %r" % (a[8:],))
+		else:
+			words.append(a)
+	return (" ".join(words), limit,)
+# ### def _parse_search_args
+
+def _print_search_result(sidx, text, limit):
+	for score, objid, kind, title, in sidx.search(text)[:limit]:
+		print "%s %s %.3f %s" % (objid, kind, score, title,)
+# ### def _print_search_result
+
+def command_search(proj, args):
+	""" respond to "search" command (read-only)
+
+	Print stories and tasks which text, note or log records contain all
+	words of given text, ranked by relevance. Chinese (and other CJK) text is
+	matched by character bigrams. "--limit N" prints at most N results.
+	"""
+
+	try:
+		text, limit, = _parse_search_args(args)
+	except ValueError as e:
+		print "ERR: %s" % (e,)
+		return False
+	if 0 == len(tokenize_text(text)):
+		print "ERR: need words to search"
+		return False
+
+	_print_search_result(get_project_search_index(proj), text, limit)
+
+	return True
+# ### def command_search
+
+def search_by_index(filename, args):
+	""" run search command through search index sidecar file of given project file (see get_search_index())
+
+	Argument:
+		filename - path of project file
+		args - arguments of search command
+	Return:
+		True if search is done, False if arguments should be reported by command_search()
+	"""
+
+	try:
+		text, limit, = _parse_search_args(args)
+	except ValueError:
+		return False
+	if 0 == len(tokenize_text(text)):
+		return False
+	_print_search_result(get_search_index(filename), text, limit)
+	return True
+# ### def search_by_index
+
+def _get_task_done_time(task):
+	""" get completion time of given task
+
+	Argument:
+		task - Task object
+	Return:
+		time recorded in status (or time of the latest "mark task as done." log, or the latest log if there is none),
+		datetime.datetime.min if task is done at unknown time, None if task is not done
+	"""
+
+	if (task.status is None) or (not _check_string_prefix(task.status, "DONE")):
+		return None
+	t = _convert_to_datetime(task.status[4:].strip().strip("()"))
+	if t is None:
+		done_time = None
+		for log_id, log, record_time, author, action, in _iterate_log_fields(task):
+			if not isinstance(record_time, datetime.datetime):
+				continue
+			if (_DONE_LOG_TEXT == log) and ((done_time is None) or (record_time > done_time)):
+				done_time = record_time
+			if (t is None) or (record_time > t):
+				t = record_time
+		if done_time is not None:
+			t = done_time
+	return t or datetime.datetime.min
+# ### def _get_task_done_time
+
+def get_story_done_time(story):
+	""" get completion time of given story (a story is done when it has tasks and all tasks under it are done)
+
+	Argument:
+		story - Story object
+	Return:
+		latest completion time of tasks under the story, None if story is not done
+	"""
+
+	done_time = None
+	for obj in iterate_objects(story):
+		if isinstance(obj, Story):
+			continue
+		t = _get_task_done_time(obj)
+		if t is None:
+			return None
+		if (done_time is None) or (t > done_time):
+			done_time = t
+	return done_time
+# ### def get_story_done_time
+
+def select_archivable_stories(proj, min_age, now=None, materialize=True):
+	""" find top-level stories which are done for at least given days
+
+	Argument:
+		proj - DevelopmentProject object
+		min_age - days since completion
+		now - current time, use datetime.datetime.now() if None
+		materialize - check lazily loaded stories (build them) as well
+	Return:
+		list of Story objects
+	"""
+
+	if now is None:
+		now = datetime.datetime.now()
+	deadline = now - datetime.timedelta(days=min_age)
+	result = []
+	for story in (proj.product_backlog or ()):
+		if (not materialize) and (story._lazy_source is not None):
+			continue
+		t = get_story_done_time(story)
+		if (t is not None) and (t <= deadline):
+			result.append(story)
+	return result
+# ### def select_archivable_stories
+
+def detach_archived_stories(proj, stories):
+	""" remove given top-level stories from project, they are appended into archive file on next compaction
+
+	Argument:
+		proj - DevelopmentProject object
+		stories - list of top-level Story objects
+	"""
+
+	for story in stories:
+		objs = [story,] + list(iterate_objects(story))
+		for o in objs:
+			if isinstance(o, Story):
+				o.prepare_story_id()
+			else:
+				o.prepare_task_id()
+		for o in objs:
+			o._registry.unregister(o)
+		detach_object(story)
+	proj.drop_sorted_object_ids()
+	if proj._archived_stories is None:
+		proj._archived_stories = []
+	proj._archived_stories.extend(stories)
+# ### def detach_archived_stories
+
+def _get_archive_index_filename(archive_filename):
+	return ".".join( (archive_filename, "aidx") )
+# ### def _get_archive_index_filename
+
+def _read_archive_index(archive_filename):
+	""" read index of archive file
+
+	The index is a sequence of JSON lines, one for each append to archive
+	file: {"start": ..., "end": ..., "objects": [[ID, kind, start offset, end offset, parent chain], ...]}.
+
+	Argument:
+		archive_filename - path of archive file
+	Return:
+		tuple of (dict of object ID to (kind, start offset, end offset, parent chain), size of archive file covered by index)
+	"""
+
+	entries = {}
+	indexed_size = 0
+	try:
+		fp = open(_get_archive_index_filename(archive_filename), "r")
+	except IOError:
+		return (entries, indexed_size,)
+	try:
+		lines = fp.read().split("\n")
+	finally:
+		fp.close()
+
+	for l in lines:
+		if 0 == len(l):
+			continue
+		try:
+			c = json.loads(l)
+		except ValueError:
+			break	# partially written entry
+		for objid, kind, startoffset, endoffset, chain, in c["objects"]:
+			entries[str(objid)] = (str(kind), startoffset, endoffset, tuple([str(v) for v in chain]),)
+		indexed_size = c["end"]
+	return (entries, indexed_size,)
+# ### def _read_archive_index
+
+def _append_archive_index(archive_filename, startoffset, text, rootkind, entries, restart=False):
+	""" index given text appended to archive file at given offset, record into index file and given entries """
+
+	objects = []
+	for objid, kind, s, e, chain, in _index_chunk(text, rootkind):
+		objects.append( (objid, kind, startoffset + s, startoffset + e, list(chain),) )
+		entries[objid] = (kind, startoffset + s, startoffset + e, chain,)
+
+	fp = open(_get_archive_index_filename(archive_filename), "w" if restart else "a")
+	try:
+		fp.write(json.dumps({"start": startoffset, "end": startoffset + len(text), "objects": objects}) + "\n")
+		fp.flush()
+		os.fsync(fp.fileno())
+	finally:
+		fp.close()
+# ### def _append_archive_index
+
+def _sync_archive_index(archive_filename):
+	""" index the part of archive file which is not covered by index (ex: archiving interrupted, archive file edited)
+
+	Argument:
+		archive_filename - path of archive file
+	Return:
+		dict of object ID to (kind, start offset, end offset, parent chain)
+	"""
+
+	entries, indexed_size, = _read_archive_index(archive_filename)
+	size = os.path.getsize(archive_filename)
+	if indexed_size == size:
+		return entries
+	restart = (indexed_size > size)
+	if restart:
+		entries = {}
+		indexed_size = 0
+
+	fp = open(archive_filename, "rb")
+	try:
+		fp.seek(indexed_size)
+		text = fp.read()
+	finally:
+		fp.close()
+	_append_archive_index(archive_filename, indexed_size, text, "story" if (indexed_size > 0) else "project", entries, restart)
+	return entries
+# ### def _sync_archive_index
+
+def append_archive(archive_filename, stories):
+	""" append given top-level stories into archive file
+
+	Archive file is a project file which only grows: stories are appended to
+	the end of its product-backlog and their text offsets are appended to
+	index file <archive_filename>.aidx, both are synced to disk. Stories
+	already in archive (ex: archived again after an interrupted compaction)
+	are skipped.
+
+	Argument:
+		archive_filename - path of archive file
+		stories - list of top-level Story objects
+	Return:
+		number of appended stories
+	"""
+
+	if not os.path.exists(archive_filename):
+		_replace_file(archive_filename, [_PRODUCT_BACKLOG_HEADER,])
+	entries = _sync_archive_index(archive_filename)
+
+	chunks = []
+	for story in stories:
+		chunk = _dump_story_chunk(story)
+		if story.get_object_id() in entries:
+			continue
+		chunks.append(chunk)
+	if 0 == len(chunks):
+		return 0
+	text = "".join(chunks)
+
+	fp = open(archive_filename, "r+b")
+	try:
+		fp.seek(0, os.SEEK_END)
+		startoffset = fp.tell()
+		if startoffset > 0:
+			fp.seek(-1, os.SEEK_END)
+			if "\n" != fp.read(1):
+				fp.write("\n")
+				startoffset = startoffset + 1
+		fp.write(text)
+		fp.flush()
+		os.fsync(fp.fileno())
+	finally:
+		fp.close()
+
+	_append_archive_index(archive_filename, startoffset, text, "story", entries)
+	return len(chunks)
+# ### def append_archive
+
+def lookup_archived_object(archive_filename, idprefix):
+	""" find text of archived story or task through archive index
+
+	Argument:
+		archive_filename - path of archive file
+		idprefix - complete ID or unique leading part of ID
+	Return:
+		tuple of (kind ("story" or "task"), UTF-8 encoded text of object, parent chain)
+		or None if not found (or prefix is ambiguous)
+	"""
+
+	entries, indexed_size, = _read_archive_index(archive_filename)
+	if idprefix in entries:
+		objid = idprefix
+	else:
+		matched = [k for k in entries if k.startswith(idprefix)]
+		if 1 != len(matched):
+			return None
+		objid = matched[0]
+	kind, startoffset, endoffset, chain = entries[objid]
+
+	try:
+		fp = open(archive_filename, "rb")
+	except IOError:
+		return None
+	try:
+		if os.fstat(fp.fileno()).st_size < indexed_size:
+			return None
+		fp.seek(startoffset)
+		text = fp.read(endoffset - startoffset)
+	finally:
+		fp.close()
+	return (kind, text, chain,)
+# ### def lookup_archived_object
+
+_REPORT_NUMPY_THRESHOLD = 100000	# use NumPy (if available) for burndown series of projects with this many tasks
+
+_numpy = None
+
+def _get_numpy():
+	""" import NumPy on first use (it is optional and slow to import)
+
+	Return:
+		numpy module or None if not available
+	"""
+
+	global _numpy
+	if _numpy is None:
+		try:
+			import numpy
+			_numpy = numpy
+		except ImportError:
+			_numpy = False
+	return _numpy or None
+# ### def _get_numpy
+
+def collect_report_columns(target):
+	""" walk through tasks under given object once, aggregate them by status and collect columns for burndown
+
+	Argument:
+		target - DevelopmentProject, Story or Task object
+	Return:
+		tuple of (dict of status word ("OPEN" for task without status) to [tasks, points, estimated-time],
+		array of completion day ordinals (0 for open task, 1 for done at unknown time),
+		array of points)
+	"""
+
+	by_status = {}
+	done_days = array.array("l")
+	points = array.array("l")
+	for obj in iterate_objects(target):
+		if not isinstance(obj, Task):
+			continue
+		point = obj.point or 0
+		estimated_time = obj.estimated_time or 0
+		k = _get_status_word(obj)
+		aggr = by_status.get(k)
+		if aggr is None:
+			aggr = [0, 0, 0,]
+			by_status[k] = aggr
+		aggr[0] = aggr[0] + 1
+		aggr[1] = aggr[1] + point
+		aggr[2] = aggr[2] + estimated_time
+
+		t = _get_task_done_time(obj)
+		done_days.append(0 if (t is None) else t.toordinal())
+		points.append(point)
+	return (by_status, done_days, points,)
+# ### def collect_report_columns
+
+def _compute_burndown_python(done_days, points, first_day, last_day):
+	n = last_day - first_day + 1
+	tasks_by_day = [0,] * n
+	points_by_day = [0,] * n
+	tasks_before = 0
+	points_before = 0
+	for d, p, in itertools.izip(done_days, points):
+		if 0 == d:
+			continue
+		if d < first_day:
+			tasks_before = tasks_before + 1
+			points_before = points_before + p
+		elif d <= last_day:
+			tasks_by_day[d - first_day] = tasks_by_day[d - first_day] + 1
+			points_by_day[d - first_day] = points_by_day[d - first_day] + p
+	return (tasks_before, points_before, tasks_by_day, points_by_day,)
+# ### def _compute_burndown_python
+
+def _compute_burndown_numpy(numpy, done_days, points, first_day, last_day):
+	n = last_day - first_day + 1
+	days = numpy.frombuffer(done_days, dtype=numpy.dtype(done_days.typecode)).astype(numpy.int64)
+	pts = numpy.frombuffer(points, dtype=numpy.dtype(points.typecode)).astype(numpy.int64)
+	offsets = days - first_day
+	is_done = (days != 0)
+	before = is_done & (offsets < 0)
+	inrange = is_done & (offsets >= 0) & (offsets < n)
+	tasks_by_day = numpy.bincount(offsets[inrange], minlength=n)
+	points_by_day = numpy.bincount(offsets[inrange], weights=pts[inrange], minlength=n)
+	return (int(before.sum()), int(pts[before].sum()), [int(v) for v in tasks_by_day], [int(v) for v in points_by_day],)
+# ### def _compute_burndown_numpy
+
+def compute_burndown(done_days, points, first_day=None, last_day=None, use_numpy=None):
+	""" compute per-day burndown and velocity series from columns of collect_report_columns()
+
+	Argument:
+		done_days - array of completion day ordinals
+		points - array of points
+		first_day - ordinal of first day of series, the earliest known completion day if None
+		last_day - ordinal of last day of series, the latest completion day if None
+		use_numpy - vectorize with NumPy, decided by number of tasks (and availability of NumPy) if None
+	Return:
+		list of (day ordinal, tasks done on the day, points done on the day, points done in 7 days up to the day,
+		remaining tasks, remaining points), empty if there is no day in range
+	"""
+
+	if (first_day is None) or (last_day is None):
+		known_days = [d for d in done_days if d > 1]
+		if not known_days:
+			return []
+		if first_day is None:
+			first_day = min(known_days)
+		if last_day is None:
+			last_day = max(known_days)
+	if last_day < first_day:
+		return []
+
+	numpy = None
+	if (use_numpy is None) and (len(done_days) >= _REPORT_NUMPY_THRESHOLD):
+		use_numpy = True
+	if use_numpy:
+		numpy = _get_numpy()
+	if numpy is not None:
+		tasks_before, points_before, tasks_by_day, points_by_day, = _compute_burndown_numpy(numpy, done_days, points, first_day, last_day)
+	else:
+		tasks_before, points_before, tasks_by_day, points_by_day, = _compute_burndown_python(done_days, points, first_day, last_day)
+
+	remaining_tasks = len(done_days) - tasks_before
+	remaining_points = sum(points) - points_before
+	result = []
+	for idx in xrange(len(tasks_by_day)):
+		remaining_tasks = remaining_tasks - tasks_by_day[idx]
+		remaining_points = remaining_points - points_by_day[idx]
+		velocity = sum(points_by_day[max(0, idx - 6):idx + 1])
+		result.append( (first_day + idx, tasks_by_day[idx], points_by_day[idx], velocity, remaining_tasks, remaining_points,) )
+	return result
+# ### def compute_burndown
+
+def command_report(proj, args):
+	""" respond to "report" command (read-only)
+
+	Print tasks, points and estimated-time aggregated by status, and per-day
+	burndown of tasks under given object (or whole project). Days range from
+	the first to the last completion day unless "--since DATE" or "--until
+	DATE" is given.
+	"""
+
+	target_args = []
+	since = None
+	until = None
+	args = list(args)
+	while args:
+		a = args.pop(0)
+		if a in ("--since", "--until",):
+			v = _convert_to_datetime(args.pop(0)) if args else None
+			if v is None:
+				print "ERR: need date for %s" % (a,)
+				return False
+			if "--since" == a:
+				since = v.toordinal()
+			else:
+				until = v.toordinal()
+		else:
+			target_args.append(a)
+
+	obj = _get_command_target(proj, target_args, "report")
+	if obj is None:
+		return False
+
+	by_status, done_days, points, = collect_report_columns(obj)
+	print "status tasks points estimated-time"
+	for k in sorted(by_status.keys()):
+		print "%s %d %d %d" % (_to_output_string(k), by_status[k][0], by_status[k][1], by_status[k][2],)
+
+	print "date done-tasks done-points velocity-7d remaining-tasks remaining-points"
+	for day, tasks_done, points_done, velocity, remaining_tasks, remaining_points, in compute_burndown(done_days, points, since, until):
+		print "%s %d %d %d %d %d" % (datetime.date.fromordinal(day).isoformat(), tasks_done, points_done, velocity, remaining_tasks, remaining_points,)
+
+	return True
+# ### def command_report
+
+_AUTO_ARCHIVE_SCAN_INTERVAL = 86400	# seconds between checking every story (include lazily loaded ones) for auto-archive
+
+def _auto_archive(proj):
+	""" detach stories done for configured days ("auto-archive" of runtime configuration)
+
+	Stories already built (ex: modified by command) are always checked, all
+	stories are checked at most once in _AUTO_ARCHIVE_SCAN_INTERVAL (tracked
+	by modify time of archive index).
+
+	Argument:
+		proj - DevelopmentProject object
+	"""
+
+	if (_rt_config is None) or (_rt_config.archive_projfile is None) or (_rt_config.auto_archive is None):
+		return
+	index_filename = _get_archive_index_filename(_rt_config.archive_projfile)
+	try:
+		full_scan = ((time.time() - os.path.getmtime(index_filename)) >= _AUTO_ARCHIVE_SCAN_INTERVAL)
+	except OSError:
+		full_scan = True
+
+	stories = select_archivable_stories(proj, _rt_config.auto_archive, None, full_scan)
+	if stories:
+		detach_archived_stories(proj, stories)
+	if full_scan:
+		open(index_filename, "a").close()
+		os.utime(index_filename, None)
+# ### def _auto_archive
+
+def command_archive(proj, args):
+	""" respond to "archive" command, move stories done for at least given days (default 0) into archive file
+	"""
+
+	if (_rt_config is None) or (_rt_config.archive_projfile is None):
+		print "ERR: archive file (dp-archive) is not configured"
+		return False
+	min_age = 0
+	if len(args) >= 1:
+		min_age = _convert_to_integer(args[0])
+		if min_age is None:
+			print "ERR: need number of days for archive: [%r]" % (args[0],)
+			return False
+
+	stories = select_archivable_stories(proj, min_age, _get_command_time())
+	detach_archived_stories(proj, stories)
+	print "archived stories: %d" % (len(stories),)
+
+	return True
+# ### def command_archive
+
+def _get_backup_store_dirname(filename):
+	return ".".join( (filename, "backup") )
+# ### def _get_backup_store_dirname
+
+def _store_backup_content(filename, digest):
+	""" put content of given file into backup store (once for each distinct content)
+
+	The stored copy is a hard link of given file if possible.
+
+	Argument:
+		filename - path of project file
+		digest - MD5 hex digest of content of project file
+	Return:
+		path of stored copy
+	"""
+
+	store_dirname = _get_backup_store_dirname(filename)
+	if not os.path.isdir(store_dirname):
+		os.mkdir(store_dirname)
+	stored_filename = os.path.join(store_dirname, digest)
+	if not os.path.exists(stored_filename):
+		try:
+			os.link(filename, stored_filename)
+		except OSError:
+			shutil.copy(filename, stored_filename)
+	return stored_filename
+# ### def _store_backup_content
+
+def _prune_backup_store(filename):
+	""" remove stored copies which are no longer linked by any backup """
+
+	store_dirname = _get_backup_store_dirname(filename)
+	try:
+		names = os.listdir(store_dirname)
+	except OSError:
+		return
+	for n in names:
+		p = os.path.join(store_dirname, n)
+		try:
+			if 1 == os.stat(p).st_nlink:
+				os.unlink(p)
+		except OSError:
+			pass
+# ### def _prune_backup_store
+
+def do_backup_project(filename, digest=None, maxbackup=None):
+	""" keep a backup of project file before it is rewritten
+
+	Backups are <filename>.1 (newest) to <filename>.<maxbackup>, rotated by
+	renames. Each backup is a hard link to a content-addressed copy in
+	<filename>.backup/, so identical snapshots are stored once and taking a
+	backup does not copy the project file (write_project() writes a new file
+	instead of truncating a linked one).
+
+	Argument:
+		filename - path of project file
+		digest - MD5 hex digest of content of project file, computed from the file if None
+		maxbackup - number of backups to keep, use "backup-count" of runtime configuration (or 9) if None
+	"""
+
+	if maxbackup is None:
+		maxbackup = _rt_config.backup_count if (_rt_config is not None) else 9
+	if maxbackup < 1:
+		return
+
+	try:
+		os.unlink(".".join( (filename, str(maxbackup)) ))
+	except OSError:
+		pass
+	for idx in range(maxbackup, 1, -1):
+		prv_filename = ".".join( (filename, str(idx-1)) )
+		if os.path.lexists(prv_filename):
+			os.rename(prv_filename, ".".join( (filename, str(idx)) ))
+
+	if digest is None:
+		digest = _get_file_identity(filename)[2]
+	stored_filename = _store_backup_content(filename, digest)
+	tgt_filename = ".".join( (filename, "1") )
+	try:
+		os.link(stored_filename, tgt_filename)
+	except OSError:
+		shutil.copy(stored_filename, tgt_filename)
+	_prune_backup_store(filename)
+# ### def do_backup_project
+
+
+# commands which are recorded into journal instead of rewriting project file, only commands
+# addressing existing objects by ID so that they can be replayed onto a hand edited project file
+# (new stories and tasks are written into project file at once, to be filled in by hand)
+_journaled_commands = (command_mark_complete,)
+
+def _get_project_journal_filename(filename):
+	return ".".join( (filename, "journal") )
+# ### def _get_project_journal_filename
+
+def _read_journal(filename):
+	""" read journal of given project file
+
+	Argument:
+		filename - path of project file
+	Return:
+		tuple of (MD5 hex digest of project file the journal based on, list of entry dicts,
+		MD5 hex digest of project file written by compaction or None), or None if there is no journal
+	"""
+
+	try:
+		fp = open(_get_project_journal_filename(filename), "r")
+	except IOError:
+		return None
+	try:
+		lines = fp.read().split("\n")
+	finally:
+		fp.close()
+
+	base = None
+	entries = []
+	compacted = None
+	for l in lines:
+		if 0 == len(l):
+			continue
+		try:
+			c = json.loads(l)
+		except ValueError:
+			break	# partially written entry
+		if base is None:
+			base = c.get("base")
+		elif "compacted" in c:
+			compacted = c["compacted"]
+		else:
+			entries.append(c)
+	if base is None:
+		return None
+	return (base, entries, compacted,)
+# ### def _read_journal
+
+def replay_journal(filename, proj):
+	""" apply commands recorded in journal of given project file onto project loaded from the file
+
+	Journal is skipped if project file is the one written by an interrupted
+	compaction of the journal. If project file is changed otherwise since the
+	journal is started (ex: edited by hand), the entries are replayed onto the
+	changed project (with a warning) and the project should be compacted.
+
+	Argument:
+		filename - path of project file
+		proj - DevelopmentProject object read from project file
+	Return:
+		number of replayed entries, or None if journal is replayed onto changed project file
+	"""
+
+	r = _read_journal(filename)
+	if r is None:
+		return 0
+	base, entries, compacted, = r
+	digest = _get_file_identity(filename)[2]
+	if base == digest:
+		replayed = len(entries)
+	elif compacted == digest:
+		return 0
+	else:
+		sys.stderr.write("WARN: project file is changed since journal %s is started, replaying onto changed project file\n" % (_get_project_journal_filename(filename),))
+		replayed = None
+
+	for idx, entry in enumerate(entries):
+		cmdfunc = _lookup_command(entry.get("command"))
+		tstamp = _convert_to_datetime(entry.get("time"))
+		captured = StringIO.StringIO()
+		orig_stdout = sys.stdout
+		sys.stdout = captured
+		try:
+			result = (cmdfunc is not None) and run_command(proj, cmdfunc, entry.get("args", []), tstamp, entry.get("author"))
+		finally:
+			sys.stdout = orig_stdout
+		if not result:
+			sys.stderr.write("WARN: failed on replaying journal entry %d (%r): %s\n" % (idx + 1, entry.get("command"), captured.getvalue().strip(),))
+	return replayed
+# ### def replay_journal
+
+def append_journal(filename, cmdname, cmdargs, tstamp, author, restart=False):
+	""" record a command into journal of given project file (synced to disk before return)
+
+	Argument:
+		filename - path of project file
+		cmdname - name of command
+		cmdargs - command arguments
+		tstamp - timestamp the command run with
+		author - author the command run with
+		restart - discard existing journal and start a new one (only when all of its entries are in project file)
+	"""
+
+	journal_filename = _get_project_journal_filename(filename)
+	lines = []
+	if restart or (not os.path.exists(journal_filename)):
+		mode = "w"
+		lines.append(json.dumps({"base": _get_file_identity(filename)[2]}))
+	else:
+		mode = "a"
+	lines.append(json.dumps({"time": _get_tstamp_string(tstamp), "author": author, "command": cmdname, "args": cmdargs}))
+
+	fp = open(journal_filename, mode)
+	try:
+		fp.write("\n".join(lines) + "\n")
+		fp.flush()
+		os.fsync(fp.fileno())
+	finally:
+		fp.close()
+# ### def append_journal
+
+def _mark_journal_compacted(filename, digest):
+	""" record digest of project file which is about to be written by compaction into journal (synced to disk before return)
+
+	The mark tells an interrupted compaction (journal left behind the written
+	project file) from a hand edit of project file.
+
+	Argument:
+		filename - path of project file
+		digest - MD5 hex digest of content to be written
+	"""
+
+	try:
+		fp = open(_get_project_journal_filename(filename), "r+")
+	except IOError:
+		return
+	try:
+		fp.seek(0, os.SEEK_END)
+		fp.write(json.dumps({"compacted": digest}) + "\n")
+		fp.flush()
+		os.fsync(fp.fileno())
+	finally:
+		fp.close()
+# ### def _mark_journal_compacted
+
+def discard_journal(filename):
+	try:
+		os.unlink(_get_project_journal_filename(filename))
+	except OSError:
+		pass
+# ### def discard_journal
+
+def compact_project(filename, proj, use_cache=False):
+	""" write project (with replayed journal) into project file and drop the journal
+
+	Backup is taken only when the project file is actually rewritten. Stories
+	detached by archiving are appended into archive file before project file
+	is written.
+
+	Argument:
+		filename - path of project file
+		proj - DevelopmentProject object
+		use_cache - update cache and index sidecar files
+	Return:
+		True if project file is written, False if content is unchanged
+	"""
+
+	_auto_archive(proj)
+	if proj._archived_stories:
+		append_archive(_rt_config.archive_projfile, proj._archived_stories)
+		proj._archived_stories = None
+
+	result = write_project(filename, proj, use_cache, do_backup_project, lambda digest: _mark_journal_compacted(filename, digest))
+	discard_journal(filename)
+	return result
+# ### def compact_project
+
+
+def _get_project_lock_filename(filename):
+	return ".".join( (filename, "lock") )
+# ### def _get_project_lock_filename
+
+def lock_project(filename, timeout=None):
+	""" take exclusive advisory lock of given project file
+
+	The lock is held on <filename>.lock since project file is replaced (not
+	rewritten) on write. Only writers take the lock, readers rely on the
+	atomic replace of project file.
+
+	Argument:
+		filename - path of project file
+		timeout - seconds to wait for the lock, wait forever if None
+	Return:
+		file object holding the lock (release with unlock_project()), or None if the lock is not taken in time
+	"""
+
+	fp = open(_get_project_lock_filename(filename), "a")
+	try:
+		if timeout is None:
+			fcntl.flock(fp.fileno(), fcntl.LOCK_EX)
+			return fp
+		deadline = time.time() + timeout
+		delay = 0.005
+		while True:
+			try:
+				fcntl.flock(fp.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+				return fp
+			except IOError as e:
+				if e.errno not in (errno.EAGAIN, errno.EACCES,):
+					raise
+			remain = deadline - time.time()
+			if remain <= 0:
+				fp.close()
+				return None
+			time.sleep(min(delay, remain))
+			delay = min(delay * 2, 0.2)
+	except:
+		fp.close()
+		raise
+# ### def lock_project
+
+def unlock_project(lockfp):
+	fcntl.flock(lockfp.fileno(), fcntl.LOCK_UN)
+	lockfp.close()
+# ### def unlock_project
+
+def _get_project_snapshot(filename):
+	""" get identity of project file and its journal, changed by every write and journal append
+
+	Argument:
+		filename - path of project file
+	Return:
+		tuple of (inode, size, modify time) of project file and journal (None for missing file)
+	"""
+
+	r = []
+	for f in (filename, _get_project_journal_filename(filename),):
+		try:
+			st = os.stat(f)
+			r.append( (st.st_ino, st.st_size, st.st_mtime,) )
+		except OSError:
+			r.append(None)
+	return tuple(r)
+# ### def _get_project_snapshot
+
+_OPTIMISTIC_ATTEMPTS = 3	# attempts without lock before reading project file under lock
+
+def update_project(filename, cmdname, cmdargs, tstamp, use_cache=False):
+	""" run modifying command on project file and save the result, safe for concurrent invocations
+
+	In optimistic mode (default) project file is read and command is run
+	without lock, the lock is only held to check that project file is not
+	changed meanwhile and to write the result (or journal the command). If
+	project file changed, the command is run again on the fresh copy. After
+	_OPTIMISTIC_ATTEMPTS conflicts, or in exclusive mode, the lock is held
+	for the whole read-modify-write cycle. Output of command is printed once
+	for the run which is saved.
+
+	Argument:
+		filename - path of project file
+		cmdname - name of command
+		cmdargs - command arguments
+		tstamp - timestamp the command run with
+		use_cache - use cache and index sidecar files
+	Return:
+		tuple of (result of command, True if project file or journal is written), or None if lock is not taken in time
+	"""
+
+	cmdfunc = _lookup_command(cmdname)
+	lock_timeout = _rt_config.lock_timeout
+	attempts = _OPTIMISTIC_ATTEMPTS if _rt_config.optimistic_lock else 0
+
+	lockfp = None
+	try:
+		attempt = 0
+		while True:
+			if (lockfp is None) and (attempt >= attempts):
+				lockfp = lock_project(filename, lock_timeout)
+				if lockfp is None:
+					return None
+			snapshot = _get_project_snapshot(filename)
+			proj = read_project(filename, use_cache, True)
+			journal_length = replay_journal(filename, proj)
+
+			captured = StringIO.StringIO()
+			orig_stdout = sys.stdout
+			sys.stdout = captured
+			try:
+				result = run_command(proj, cmdfunc, cmdargs, tstamp)
+			finally:
+				sys.stdout = orig_stdout
+			if not result:
+				sys.stdout.write(captured.getvalue())
+				return (False, False,)
+
+			if lockfp is None:
+				lockfp = lock_project(filename, lock_timeout)
+				if lockfp is None:
+					return None
+				if snapshot != _get_project_snapshot(filename):
+					unlock_project(lockfp)
+					lockfp = None
+					attempt = attempt + 1
+					continue
+
+			sys.stdout.write(captured.getvalue())
+			# journal replayed onto changed project file is always compacted
+			if (_rt_config.journal_threshold > 0) and (cmdfunc in _journaled_commands) and (journal_length is not None) and (journal_length + 1 < _rt_config.journal_threshold):
+				append_journal(filename, cmdname, cmdargs, tstamp, _rt_config.username, 0 == journal_length)
+				return (True, True,)
+			return (True, compact_project(filename, proj, use_cache),)
+	finally:
+		if lockfp is not None:
+			unlock_project(lockfp)
+# ### def update_project
+
+
+# (command names, command function, is read-only)
+_command_table = (
+	(("add-story", "addstory", "a.s.", "as",), command_add_story, False,),
+	(("add-task", "addtask", "a.t.", "at",), command_add_task, False,),
+	(("done", "complete",), command_mark_complete, False,),
+	(("move", "mv",), command_move, False,),
+	(("rm", "remove",), command_remove, False,),
+	(("rebuild", "r.b.", "rb", "r",), command_rebuild, False,),
+	(("batch",), command_batch, False,),
+	(("archive",), command_archive, False,),
+	(("show",), command_show, True,),
+	(("ls", "list",), command_list, True,),
+	(("tree",), command_tree, True,),
+	(("status", "st",), command_status, True,),
+	(("query", "q",), command_query, True,),
+	(("search",), command_search, True,),
+	(("report",), command_report, True,),
+)
+
+def _lookup_command(cmdname):
+	""" find command function for given command name
+
+	Argument:
+		cmdname - name (or alias) of command
+	Return:
+		command function or None if given name is not a command
+	"""
+
+	for cmdnames, cmdfunc, is_readonly in _command_table:
+		if cmdname in cmdnames:
+			return cmdfunc
+	return None
+# ### def _lookup_command
+
+def _is_readonly_command(cmdfunc):
+	""" check if given command function does not modify project (so that project need not be written) """
+
+	for cmdnames, f, is_readonly in _command_table:
+		if f is cmdfunc:
+			return is_readonly
+	return False
+# ### def _is_readonly_command
+
+
+def _get_server_socket_filename(filename):
+	return ".".join( (filename, "sock") )
+# ### def _get_server_socket_filename
+
+def _recv_line(sock):
+	""" receive one newline terminated line from given socket """
+
+	buf = []
+	while True:
+		d = sock.recv(4096)
+		if not d:
+			break
+		buf.append(d)
+		if "\n" in d:
+			break
+	return "".join(buf).split("\n", 1)[0]
+# ### def _recv_line
+
+def _is_main_thread():
+	""" check if running in main thread (signal handlers can only be set there) """
+
+	return isinstance(threading.current_thread(), threading._MainThread)
+# ### def _is_main_thread
+
+class ProjectServer(object):
+	""" keep project resident and run commands received from local socket
+
+	Each request is one line of JSON object {"command": ..., "args": [...], "username": ...}
+	and is answered with one line of JSON object {"result": ..., "output": ...}.
+	Modifications are written to project file once no command arrived for
+	flush_delay seconds (or at most max_flush_delay seconds after the first
+	unwritten modification) and when server shutdown. Unwritten commands are
+	kept so that they can be re-applied if project file is changed by others
+	before the flush.
+	"""
+
+	REQUEST_TIMEOUT = 5.0	# seconds to wait for request and response of a connection
+
+	def __init__(self, projfile, sockfile, use_cache=True, flush_delay=2.0, max_flush_delay=20.0):
+		self.projfile = projfile
+		self.sockfile = sockfile
+		self.use_cache = use_cache
+		self.flush_delay = flush_delay
+		self.max_flush_delay = max_flush_delay
+
+		self.proj = None
+		self.proj_fident = None
+		self.dirty_since = None
+		self.last_modify = None
+		self.pending = []	# (command name, arguments, timestamp, author) not yet written
+		self.is_running = False
+		self.sock = None
+	# ### def __init__
+
+	def _get_projfile_stat(self):
+		return _get_project_snapshot(self.projfile)
+	# ### def _get_projfile_stat
+
+	def load(self):
+		""" (re-)load project from project file, unwritten commands are dropped """
+
+		self.proj_fident = self._get_projfile_stat()
+		self.proj = read_project(self.projfile, self.use_cache, True)
+		if self.use_cache:
+			attach_search_index(self.projfile, self.proj)
+		replay_journal(self.projfile, self.proj)
+		self.pending = []
+	# ### def load
+
+	def _reapply_pending(self):
+		""" reload project and run unwritten commands again on it """
+
+		pending = self.pending
+		self.load()
+		orig_stdout = sys.stdout
+		sys.stdout = StringIO.StringIO()
+		try:
+			for cmdname, cmdargs, tstamp, author, in pending:
+				if run_command(self.proj, _lookup_command(cmdname), cmdargs, tstamp, author):
+					self.pending.append( (cmdname, cmdargs, tstamp, author,) )
+		finally:
+			sys.stdout = orig_stdout
+	# ### def _reapply_pending
+
+	def flush(self):
+		""" write pending modifications into project file
+
+		Return:
+			True if project file is written, False otherwise
+		"""
+
+		if self.dirty_since is None:
+			return False
+		lockfp = lock_project(self.projfile, _rt_config.lock_timeout)
+		if lockfp is None:
+			sys.stderr.write("WARN: project file %s is locked by others, flush postponed\n" % (self.projfile,))
+			return False
+		try:
+			if self.proj_fident != self._get_projfile_stat():
+				self._reapply_pending()
+			compact_project(self.projfile, self.proj, self.use_cache)
+			self.proj_fident = self._get_projfile_stat()
+		finally:
+			unlock_project(lockfp)
+		self.dirty_since = None
+		self.last_modify = None
+		self.pending = []
+		return True
+	# ### def flush
+
+	def get_flush_timeout(self):
+		""" get seconds to wait before pending modifications should be flushed
+
+		Return:
+			seconds to wait or None if there is no pending modification
+		"""
+
+		if self.dirty_since is None:
+			return None
+		n = time.time()
+		t = min(self.last_modify + self.flush_delay, self.dirty_since + self.max_flush_delay)
+		return max(0.0, t - n)
+	# ### def get_flush_timeout
+
+	def handle_request(self, req):
+		""" run command of given request
+
+		Argument:
+			req - request dict
+		Return:
+			response dict
+		"""
+
+		cmdfunc = _lookup_command(req.get("command"))
+		if cmdfunc is None:
+			return {"result": False, "output": "ERR: unknown command: [%r]\n" % (req.get("command"),)}
+
+		# reload project if project file is modified by others
+		if (self.dirty_since is None) and (self.proj_fident != self._get_projfile_stat()):
+			self.load()
+		# batch is all-or-nothing: write pending modifications first so that failed batch can be dropped by reload
+		if cmdfunc is command_batch:
+			self.flush()
+			if self.dirty_since is not None:
+				# pending modifications could not be written, a failed batch would drop them
+				return {"result": False, "output": "ERR: project file is locked by others, cannot run batch now\n"}
+
+		author = req.get("username")
+		if author is None:
+			author = _rt_config.username
+
+		tstamp = datetime.datetime.now().replace(microsecond=0)
+		captured = StringIO.StringIO()
+		orig_stdout = sys.stdout
+		sys.stdout = captured
+		try:
+			result = run_command(self.proj, cmdfunc, req.get("args", []), tstamp, author)
+		finally:
+			sys.stdout = orig_stdout
+
+		if (not result) and (cmdfunc is command_batch):
+			self.load()
+		elif result and (not _is_readonly_command(cmdfunc)):
+			self.pending.append( (req["command"], req.get("args", []), tstamp, author,) )
+			n = time.time()
+			if self.dirty_since is None:
+				self.dirty_since = n
+			self.last_modify = n
+		return {"result": bool(result), "output": captured.getvalue()}
+	# ### def handle_request
+
+	def _serve_connection(self, conn):
+		try:
+			# a stalled client must not block the server (and its flush)
+			conn.settimeout(ProjectServer.REQUEST_TIMEOUT)
+			try:
+				req = json.loads(_recv_line(conn))
+				resp = self.handle_request(req)
+			except Exception as e:
+				resp = {"result": False, "output": "ERR: failed on serving request: %s\n" % (e,)}
+			try:
+				conn.sendall(json.dumps(resp) + "\n")
+			except socket.error:
+				pass
+		finally:
+			conn.close()
+	# ### def _serve_connection
+
+	def shutdown(self, *args):
+		self.is_running = False
+	# ### def shutdown
+
+	def serve_forever(self):
+		""" serve requests until shutdown() is called or SIGTERM/SIGINT is received """
+
+		if self.proj is None:
+			self.load()
+
+		try:
+			os.unlink(self.sockfile)
+		except OSError:
+			pass
+		self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		self.sock.bind(self.sockfile)
+		self.sock.listen(16)
+
+		if _is_main_thread():
+			signal.signal(signal.SIGTERM, self.shutdown)
+			signal.signal(signal.SIGINT, self.shutdown)
+
+		self.is_running = True
+		try:
+			while self.is_running:
+				timeout = self.get_flush_timeout()
+				if (timeout is None) or (timeout > 0.5):
+					timeout = 0.5
+				try:
+					r, w, x = select.select([self.sock], [], [], timeout)
+				except select.error as e:
+					if errno.EINTR == e.args[0]:
+						continue
+					raise
+				if r:
+					conn, addr = self.sock.accept()
+					self._serve_connection(conn)
+				if 0 == self.get_flush_timeout():
+					self.flush()
+		finally:
+			self.sock.close()
+			try:
+				os.unlink(self.sockfile)
+			except OSError:
+				pass
+			self.flush()
+	# ### def serve_forever
+# ### class ProjectServer
+
+_FORWARD_TIMEOUT = 30.0	# seconds to wait for project server to answer a forwarded command
+
+def forward_command(sockfile, cmdname, cmdargs, username=None, timeout=None):
+	""" forward command to running project server
+
+	Argument:
+		sockfile - path of server socket
+		cmdname - name of command
+		cmdargs - arguments of command
+		username - user name for logs
+		timeout - seconds to wait for the answer, use _FORWARD_TIMEOUT if None
+	Return:
+		tuple of (result, output) or None if server is not reachable or does not answer in time
+	"""
+
+	if not os.path.exists(sockfile):
+		return None
+
+	sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	try:
+		sock.settimeout(_FORWARD_TIMEOUT if (timeout is None) else timeout)
+		try:
+			sock.connect(sockfile)
+			req = {"command": cmdname, "args": cmdargs, "username": username}
+			sock.sendall(json.dumps(req) + "\n")
+			resp = json.loads(_recv_line(sock))
+		except (socket.error, ValueError,):
+			return None
+	finally:
+		sock.close()
+
+	return (resp["result"], resp["output"],)
+# ### def forward_command
+
+
+def main():
+	global _rt_config
+	_rt_config = read_runtimeconfig(".dprc")
+
+	cmdname = None
+	cmdfunc = None
+	cmdargs = []
+	verbose = False
+	use_cache = True
+	use_server = True
+	serve_mode = False
+
+	if "DP_YAML_BACKEND" in os.environ:
+		select_yaml_backend("python" != os.environ["DP_YAML_BACKEND"].lower())
+	select_log_store(_rt_config.log_store)
+
+	for opt in sys.argv:
+		if (cmdfunc is not None) or serve_mode:
+			cmdargs.append(opt)
+		elif opt in ("-v", "--verbose",):
+			verbose = True
+		elif "--no-cache" == opt:
+			use_cache = False
+		elif "--no-server" == opt:
+			use_server = False
+		elif "serve" == opt:
+			serve_mode = True
+		elif _lookup_command(opt) is not None:
+			cmdname = opt
+			cmdfunc = _lookup_command(opt)
+
+	if (cmdfunc is None) and (not serve_mode):
+		print "ERR: no command"
+		sys.exit(1)
+
+	if verbose:
+		sys.stderr.write("INFO: YAML backend: %s\n" % (get_yaml_backend(),))
+
+	sockfile = _get_server_socket_filename(_rt_config.active_projfile)
+
+	if cmdfunc is command_batch:
+		cmdargs = _read_batch_input(cmdargs)
+
+	if serve_mode:
+		flush_delay = 2.0
+		if len(cmdargs) >= 1:
+			flush_delay = float(cmdargs[0])
+		server = ProjectServer(_rt_config.active_projfile, sockfile, use_cache, flush_delay)
+		server.serve_forever()
+		sys.exit(0)
+
+	if use_server:
+		r = forward_command(sockfile, cmdname, cmdargs, _rt_config.username)
+		if r is not None:
+			result, output = r
+			sys.stdout.write(output.encode("utf-8"))
+			if not result:
+				sys.exit(3)
+			if not _is_readonly_command(cmdfunc):
+				print 'OK'
+			sys.exit(0)
+
+	journal_filename = _get_project_journal_filename(_rt_config.active_projfile)
+
+	if use_cache and (cmdfunc is command_show) and (len(cmdargs) >= 1) and (not os.path.exists(journal_filename)):
+		if show_object_by_index(_rt_config.active_projfile, cmdargs[0]):
+			sys.exit(0)
+	if use_cache and (cmdfunc is command_search) and (not os.path.exists(journal_filename)):
+		if search_by_index(_rt_config.active_projfile, cmdargs):
+			sys.exit(0)
+
+	tstamp = datetime.datetime.now().replace(microsecond=0)
+
+	if _is_readonly_command(cmdfunc):
+		proj = read_project(_rt_config.active_projfile, use_cache, True)
+		if use_cache and (cmdfunc is command_search):
+			attach_search_index(_rt_config.active_projfile, proj)
+		replay_journal(_rt_config.active_projfile, proj)
+		if not run_command(proj, cmdfunc, cmdargs, tstamp):
+			sys.exit(3)
+		sys.exit(0)
+
+	r = update_project(_rt_config.active_projfile, cmdname, cmdargs, tstamp, use_cache)
+	if r is None:
+		print "ERR: project file is locked by others, give up after %r seconds" % (_rt_config.lock_timeout,)
+		sys.exit(4)
+	result, written, = r
+	if not result:
+		sys.exit(3)
+	if not written:
+		print 'OK (unchanged)'
+		sys.exit(0)
+
+	print 'OK'
+
+	sys.exit(0)
+# ### def main
 
 
 if __name__ == '__main__':
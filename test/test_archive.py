@@ -0,0 +1,174 @@
+
+# -*- coding: utf-8 -*-
+
+import datetime
+import os
+import shutil
+import sys
+import StringIO
+import tempfile
+import unittest
+
+import testing_common
+
+import dpcore
+
+
+_sample_doc = """product-backlog:
+- story-id: CkhKPbtZP6sCVXnYoDkOTUw
+  story: story 1.
+  task:
+  - t-id: TXziJidzClwYymTAjDlONQA
+    t: task of story 1.
+    status: DONE (2012-07-24 18:40:49)
+    log:
+    - l: mark task as done.
+      record-time: 2012-07-24 18:40:49
+      author: Test User
+- story-id: Cqq28BRXWH70ZmfX60xVwPA
+  story: story 2.
+  task:
+  - t-id: TELS6qH02CTdclq1as7HhNw
+    t: task of story 2.
+    status: DONE (2012-07-30 09:00:00)
+  - t-id: T0TtvAXLuEqwZAQEwgZwZUA
+    t: open task of story 2.
+- story-id: CYPQV1AHmYevCXeO1v1do0g
+  story: story 3.
+  task:
+  - t-id: To9M2jIpZaArrAHYq38T40A
+    t: task of story 3.
+    status: DONE (2012-07-30 09:00:00)
+"""
+
+_appended_story = """- story-id: C7DeKTmQ9gkhSuWt4ybFpSw
+  story: story appended by hand.
+  task:
+  - t-id: TgUVvQvgzJ3rFvWfIoM4f9g
+    t: task appended by hand.
+"""
+
+
+class TestArchive(unittest.TestCase):
+	""" test moving completed stories into archive file """
+
+	def setUp(self):
+		self.workdir = tempfile.mkdtemp()
+		self.projfile = os.path.join(self.workdir, "dp.txt")
+		self.archfile = os.path.join(self.workdir, "archive.txt")
+		fp = open(self.projfile, "w")
+		fp.write(_sample_doc)
+		fp.close()
+		self.orig_rt_config = dpcore._rt_config
+		dpcore._rt_config = dpcore.RuntimeConfiguration("Test User", self.projfile, self.archfile)
+		self.orig_stdout = sys.stdout
+		sys.stdout = StringIO.StringIO()
+	# ### def setUp
+
+	def tearDown(self):
+		sys.stdout = self.orig_stdout
+		dpcore._rt_config = self.orig_rt_config
+		shutil.rmtree(self.workdir)
+	# ### def tearDown
+
+	def _archive(self, args, tstamp):
+		proj = dpcore.read_project(self.projfile, False, True)
+		self.assertTrue(dpcore.run_command(proj, dpcore.command_archive, args, tstamp))
+		dpcore.compact_project(self.projfile, proj)
+		return dpcore.read_project(self.projfile)
+	# ### def _archive
+
+	def _read_archive(self):
+		fp = open(self.archfile, "r")
+		c = fp.read()
+		fp.close()
+		return c
+	# ### def _read_archive
+
+	def test_done_time(self):
+		""" story is done when all of its tasks are done """
+
+		proj = dpcore.read_project(self.projfile)
+		self.assertEqual(datetime.datetime(2012, 7, 24, 18, 40, 49), dpcore.get_story_done_time(proj.product_backlog[0]))
+		self.assertTrue(dpcore.get_story_done_time(proj.product_backlog[1]) is None)
+		self.assertEqual(datetime.datetime(2012, 7, 30, 9, 0, 0), dpcore.get_story_done_time(proj.product_backlog[2]))
+	# ### def test_done_time
+
+	def test_archive(self):
+		""" done stories older than given days are moved into archive and can be looked up """
+
+		proj = self._archive(["3"], datetime.datetime(2012, 8, 1, 0, 0, 0))
+		self.assertEqual(["Cqq28BRXWH70ZmfX60xVwPA", "CYPQV1AHmYevCXeO1v1do0g",], [s.story_id for s in proj.product_backlog])
+		self.assertTrue(dpcore.find_object(proj, "TXziJidzClwYymTAjDlONQA") is None)
+
+		kind, text, chain, = dpcore.lookup_archived_object(self.archfile, "TXzi")
+		self.assertEqual("task", kind)
+		self.assertEqual(("CkhKPbtZP6sCVXnYoDkOTUw",), chain)
+		self.assertTrue("mark task as done." in text)
+
+		proj = self._archive([], datetime.datetime(2012, 8, 1, 0, 0, 0))
+		self.assertEqual(["Cqq28BRXWH70ZmfX60xVwPA",], [s.story_id for s in proj.product_backlog])
+		self.assertEqual(["CkhKPbtZP6sCVXnYoDkOTUw", "CYPQV1AHmYevCXeO1v1do0g",], [s.story_id for s in dpcore.read_project(self.archfile).product_backlog])
+
+		self.assertTrue(dpcore.command_show(proj, ["CYPQ"]))
+		self.assertTrue("task of story 3." in sys.stdout.getvalue())
+	# ### def test_archive
+
+	def test_append_only(self):
+		""" archive is only appended, archived stories are not appended again """
+
+		proj = dpcore.read_project(self.projfile)
+		story = proj.product_backlog[0]
+		self.assertEqual(1, dpcore.append_archive(self.archfile, [story,]))
+		c = self._read_archive()
+		self.assertEqual(0, dpcore.append_archive(self.archfile, [story,]))
+		self.assertEqual(c, self._read_archive())
+
+		self.assertEqual(1, dpcore.append_archive(self.archfile, [proj.product_backlog[2],]))
+		self.assertTrue(self._read_archive().startswith(c))
+	# ### def test_append_only
+
+	def test_index_recovery(self):
+		""" text appended without index is indexed on next archiving """
+
+		proj = dpcore.read_project(self.projfile)
+		dpcore.append_archive(self.archfile, [proj.product_backlog[0],])
+		fp = open(self.archfile, "a")
+		fp.write(_appended_story)
+		fp.close()
+		self.assertTrue(dpcore.lookup_archived_object(self.archfile, "TgUV") is None)
+
+		dpcore.append_archive(self.archfile, [proj.product_backlog[2],])
+		self.assertEqual("task", dpcore.lookup_archived_object(self.archfile, "TgUV")[0])
+		self.assertEqual("story", dpcore.lookup_archived_object(self.archfile, "CYPQ")[0])
+	# ### def test_index_recovery
+
+	def test_auto_archive(self):
+		""" done stories are archived on compaction by policy """
+
+		dpcore._rt_config.auto_archive = 7
+		proj = dpcore.read_project(self.projfile)
+		dpcore.command_mark_complete(proj, ["T0Tt"])
+		dpcore.compact_project(self.projfile, proj)
+
+		proj = dpcore.read_project(self.projfile)
+		self.assertEqual(["Cqq28BRXWH70ZmfX60xVwPA",], [s.story_id for s in proj.product_backlog])
+		self.assertEqual(2, len(dpcore.read_project(self.archfile).product_backlog))
+	# ### def test_auto_archive
+
+	def test_not_configured(self):
+		""" archive command fails without archive file """
+
+		dpcore._rt_config.archive_projfile = None
+		proj = dpcore.read_project(self.projfile)
+		self.assertFalse(dpcore.command_archive(proj, []))
+		self.assertTrue(sys.stdout.getvalue().startswith("ERR:"))
+	# ### def test_not_configured
+# ### class TestArchive
+
+
+
+if __name__ == '__main__':
+	unittest.main()
+
+# vim: ts=4 sw=4 ai nowarp
@@ -0,0 +1,135 @@
+
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import testing_common
+
+import dpcore
+
+
+_sample_doc = """product-backlog:
+- story-id: CkhKPbtZP6sCVXnYoDkOTUw
+  story: story 1.
+  task:
+  - t-id: TXziJidzClwYymTAjDlONQA
+    t: task of story 1.
+"""
+
+
+class TestBackup(unittest.TestCase):
+	""" test do_backup_project() function """
+
+	def setUp(self):
+		self.orig_rt_config = dpcore._rt_config
+		dpcore._rt_config = dpcore.RuntimeConfiguration("Test User", None, None)
+		self.workdir = tempfile.mkdtemp()
+		self.projfile = os.path.join(self.workdir, "dp.txt")
+		fp = open(self.projfile, "w")
+		fp.write(_sample_doc)
+		fp.close()
+		self.orig_get_file_identity = dpcore._get_file_identity
+	# ### def setUp
+
+	def tearDown(self):
+		dpcore._get_file_identity = self.orig_get_file_identity
+		dpcore._rt_config = self.orig_rt_config
+		shutil.rmtree(self.workdir)
+	# ### def tearDown
+
+	def _read(self, filename):
+		fp = open(filename, "r")
+		c = fp.read()
+		fp.close()
+		return c
+	# ### def _read
+
+	def _backup_filename(self, idx):
+		return ".".join( (self.projfile, str(idx)) )
+	# ### def _backup_filename
+
+	def _modify_and_write(self):
+		proj = dpcore.read_project(self.projfile)
+		dpcore.command_add_task(proj, ["CkhKPbtZP6sCVXnYoDkOTUw"])
+		proj.product_backlog[0].subtask[-1].task = "task %d." % (len(proj.product_backlog[0].subtask),)
+		dpcore.do_backup_project(self.projfile)
+		dpcore.write_project(self.projfile, proj)
+	# ### def _modify_and_write
+
+	def test_backup_kept(self):
+		""" backup is not changed by rewriting project file """
+
+		self._modify_and_write()
+
+		self.assertEqual(_sample_doc, self._read(self._backup_filename(1)))
+		self.assertNotEqual(_sample_doc, self._read(self.projfile))
+		self.assertEqual(1, os.stat(self.projfile).st_nlink)
+	# ### def test_backup_kept
+
+	def test_deduplicate(self):
+		""" identical snapshots are stored once """
+
+		dpcore.do_backup_project(self.projfile)
+		dpcore.do_backup_project(self.projfile)
+		dpcore.do_backup_project(self.projfile)
+
+		st1 = os.stat(self._backup_filename(1))
+		st3 = os.stat(self._backup_filename(3))
+		self.assertEqual(st1.st_ino, st3.st_ino)
+		self.assertEqual(1, len(os.listdir(dpcore._get_backup_store_dirname(self.projfile))))
+	# ### def test_deduplicate
+
+	def test_rotation(self):
+		""" number of backups follows configuration and unused snapshots are removed """
+
+		dpcore._rt_config.backup_count = 3
+		for i in range(5):
+			self._modify_and_write()
+
+		self.assertTrue(os.path.exists(self._backup_filename(3)))
+		self.assertFalse(os.path.exists(self._backup_filename(4)))
+		self.assertEqual(3, len(os.listdir(dpcore._get_backup_store_dirname(self.projfile))))
+		self.assertTrue("task 5." in self._read(self._backup_filename(1)))
+		self.assertFalse("task 5." in self._read(self._backup_filename(2)))
+	# ### def test_rotation
+
+	def test_unchanged(self):
+		""" no backup and write for unchanged content """
+
+		proj = dpcore.read_project(self.projfile)
+		dpcore.command_rebuild(proj, [])
+		self.assertFalse(dpcore.compact_project(self.projfile, proj))
+		self.assertFalse(os.path.exists(self._backup_filename(1)))
+
+		dpcore.command_mark_complete(proj, ["TXzi"])
+		self.assertTrue(dpcore.compact_project(self.projfile, proj))
+		self.assertEqual(_sample_doc, self._read(self._backup_filename(1)))
+	# ### def test_unchanged
+
+	def test_hashed_once(self):
+		""" project file is hashed once for write and backup """
+
+		hashed = []
+		def counting_get_file_identity(filename, content=None, digest=None):
+			if (content is None) and (digest is None):
+				hashed.append(filename)
+			return self.orig_get_file_identity(filename, content, digest)
+		dpcore._get_file_identity = counting_get_file_identity
+
+		proj = dpcore.read_project(self.projfile)
+		dpcore.command_mark_complete(proj, ["TXzi"])
+		self.assertTrue(dpcore.compact_project(self.projfile, proj))
+		self.assertEqual([self.projfile,], hashed)
+		self.assertEqual(_sample_doc, self._read(self._backup_filename(1)))
+	# ### def test_hashed_once
+# ### class TestBackup
+
+
+
+if __name__ == '__main__':
+	unittest.main()
+
+# vim: ts=4 sw=4 ai nowarp
@@ -0,0 +1,125 @@
+
+# -*- coding: utf-8 -*-
+
+import sys
+import StringIO
+import unittest
+import yaml
+
+import testing_common
+
+import dpcore
+
+
+_sample_doc = """product-backlog:
+- story-id: CkhKPbtZP6sCVXnYoDkOTUw
+  story: a story with task.
+  task:
+  - t-id: TXziJidzClwYymTAjDlONQA
+    t: task 1 of story.
+  - t-id: TELS6qH02CTdclq1as7HhNw
+    t: task 2 of story.
+"""
+
+
+class CommandTestBase(unittest.TestCase):
+	def setUp(self):
+		self.orig_rt_config = dpcore._rt_config
+		dpcore._rt_config = dpcore.RuntimeConfiguration("Test User", None, None)
+		self.proj = dpcore.load_project(yaml.safe_load(_sample_doc))
+		self.orig_stdout = sys.stdout
+		sys.stdout = StringIO.StringIO()
+	# ### def setUp
+
+	def tearDown(self):
+		sys.stdout = self.orig_stdout
+		dpcore._rt_config = self.orig_rt_config
+	# ### def tearDown
+# ### class CommandTestBase
+
+
+class TestBatchCommand(CommandTestBase):
+	""" test command_batch() function """
+
+	def test_batch_success(self):
+		""" run multiple commands """
+
+		lines = ["# close tasks", "done TXziJidzClwYymTAjDlONQA", "", "done 'TELS6qH02CTdclq1as7HhNw'", "add-task CkhKPbtZP6sCVXnYoDkOTUw"]
+		r = dpcore.command_batch(self.proj, lines)
+
+		self.assertTrue(r)
+		story = self.proj.product_backlog[0]
+		self.assertEqual(3, len(story.subtask))
+		self.assertTrue(dpcore._check_string_prefix(story.subtask[0].status, "DONE"))
+		self.assertTrue(dpcore._check_string_prefix(story.subtask[1].status, "DONE"))
+	# ### def test_batch_success
+
+	def test_batch_error_report(self):
+		""" report every failed line """
+
+		lines = ["done TNotExist", "done TXziJidzClwYymTAjDlONQA", "no-such-command", "batch"]
+		r = dpcore.command_batch(self.proj, lines)
+
+		self.assertFalse(r)
+		output = sys.stdout.getvalue()
+		self.assertTrue("batch line 1:" in output)
+		self.assertFalse("batch line 2:" in output)
+		self.assertTrue("batch line 3: unknown command" in output)
+		self.assertTrue("batch line 4: unknown command" in output)
+	# ### def test_batch_error_report
+# ### class TestBatchCommand
+
+
+class TestReadonlyCommand(CommandTestBase):
+	""" test read-only commands """
+
+	def test_readonly_flag(self):
+		""" check read-only flag of commands """
+
+		self.assertTrue(dpcore._is_readonly_command(dpcore._lookup_command("show")))
+		self.assertTrue(dpcore._is_readonly_command(dpcore._lookup_command("ls")))
+		self.assertTrue(dpcore._is_readonly_command(dpcore._lookup_command("tree")))
+		self.assertTrue(dpcore._is_readonly_command(dpcore._lookup_command("status")))
+		self.assertFalse(dpcore._is_readonly_command(dpcore._lookup_command("done")))
+		self.assertFalse(dpcore._is_readonly_command(dpcore._lookup_command("rebuild")))
+	# ### def test_readonly_flag
+
+	def test_show(self):
+		""" show a task """
+
+		r = dpcore.command_show(self.proj, ["TELS6qH02CTdclq1as7HhNw"])
+
+		self.assertTrue(r)
+		c = yaml.safe_load(sys.stdout.getvalue())
+		self.assertEqual("task 2 of story.", c["t"])
+	# ### def test_show
+
+	def test_tree(self):
+		""" list objects in tree """
+
+		r = dpcore.command_tree(self.proj, [])
+
+		self.assertTrue(r)
+		lines = sys.stdout.getvalue().splitlines()
+		self.assertEqual(3, len(lines))
+		self.assertTrue(lines[0].startswith("CkhKPbtZP6sCVXnYoDkOTUw story"))
+		self.assertTrue(lines[2].startswith("  TELS6qH02CTdclq1as7HhNw task open"))
+	# ### def test_tree
+
+	def test_status(self):
+		""" summary of project """
+
+		dpcore.command_mark_complete(self.proj, ["TELS6qH02CTdclq1as7HhNw"])
+		r = dpcore.command_status(self.proj, [])
+
+		self.assertTrue(r)
+		self.assertTrue("tasks: 2 (done: 1, open: 1)" in sys.stdout.getvalue())
+	# ### def test_status
+# ### class TestReadonlyCommand
+
+
+
+if __name__ == '__main__':
+	unittest.main()
+
+# vim: ts=4 sw=4 ai nowarp
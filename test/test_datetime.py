@@ -0,0 +1,63 @@
+
+# -*- coding: utf-8 -*-
+
+import datetime
+import unittest
+
+import testing_common
+
+import dpcore
+
+
+class TestConvertDatetime(unittest.TestCase):
+	""" test _convert_to_datetime() function """
+
+	def test_datetime_object(self):
+		""" datetime objects are used directly """
+
+		d = datetime.datetime(2012, 7, 24, 18, 40, 49)
+		self.assertTrue(dpcore._convert_to_datetime(d) is d)
+		self.assertEqual(d, dpcore._convert_to_datetime(datetime.datetime(2012, 7, 24, 18, 40, 49, 123456)))
+	# ### def test_datetime_object
+
+	def test_canonical(self):
+		""" string in the form written by _get_tstamp_string() """
+
+		d = datetime.datetime(2012, 7, 24, 18, 40, 49)
+		self.assertEqual(d, dpcore._convert_to_datetime("2012-07-24 18:40:49"))
+		self.assertEqual(d, dpcore._parse_canonical_datetime(dpcore._get_tstamp_string(d)))
+		self.assertTrue(dpcore._parse_canonical_datetime("2012-07-24 18:40") is None)
+		self.assertTrue(dpcore._parse_canonical_datetime("2012- 7-24 18:40:49") is None)
+	# ### def test_canonical
+
+	def test_fuzzy(self):
+		""" string in loose form """
+
+		self.assertEqual(datetime.datetime(2012, 7, 24, 18, 40, 0), dpcore._convert_to_datetime("2012/7/24 18:40"))
+		self.assertEqual(datetime.datetime(2012, 7, 24, 18, 40, 49), dpcore._convert_to_datetime("12-07-24 18:40:49"))
+
+		n = datetime.datetime.now()
+		d = dpcore._convert_to_datetime("7/24 18:40")
+		self.assertEqual((n.year, 7, 24, 18, 40,), (d.year, d.month, d.day, d.hour, d.minute,))
+		self.assertTrue(dpcore._convert_to_datetime(None) is None)
+		self.assertTrue(dpcore._convert_to_datetime("no time") is None)
+	# ### def test_fuzzy
+
+	def test_memo(self):
+		""" results not depending on current time are memorized """
+
+		d = dpcore._convert_to_datetime("2012/7/24 18:40")
+		self.assertTrue(d is dpcore._convert_to_datetime("2012/7/24 18:40"))
+		self.assertFalse("18:40" in dpcore._datetime_memo)
+		dpcore._convert_to_datetime("18:40")
+		self.assertFalse("18:40" in dpcore._datetime_memo)
+		self.assertTrue(len(dpcore._datetime_memo) <= dpcore._DATETIME_MEMO_SIZE)
+	# ### def test_memo
+# ### class TestConvertDatetime
+
+
+
+if __name__ == '__main__':
+	unittest.main()
+
+# vim: ts=4 sw=4 ai nowarp
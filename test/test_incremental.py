@@ -0,0 +1,133 @@
+
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+import yaml
+
+import testing_common
+
+import dpcore
+
+
+_sample_doc = """product-backlog:
+- story-id: CkhKPbtZP6sCVXnYoDkOTUw
+  story: story 1.
+  task:
+  - t-id: TXziJidzClwYymTAjDlONQA
+    t: task of story 1.
+- story-id: Cqq28BRXWH70ZmfX60xVwPA
+  s: story 2 (with short key).
+  task:
+  - t-id: TELS6qH02CTdclq1as7HhNw
+    t: task of story 2.
+    status: new
+"""
+
+
+class TestIncrementalWrite(unittest.TestCase):
+	""" test modification tracking and write back of unmodified stories """
+
+	def setUp(self):
+		self.orig_rt_config = dpcore._rt_config
+		dpcore._rt_config = dpcore.RuntimeConfiguration("Test User", None, None)
+		self.workdir = tempfile.mkdtemp()
+		self.projfile = os.path.join(self.workdir, "dp.txt")
+		fp = open(self.projfile, "w")
+		fp.write(_sample_doc)
+		fp.close()
+	# ### def setUp
+
+	def tearDown(self):
+		dpcore._rt_config = self.orig_rt_config
+		shutil.rmtree(self.workdir)
+	# ### def tearDown
+
+	def _read_projfile(self):
+		fp = open(self.projfile, "r")
+		c = fp.read()
+		fp.close()
+		return c
+	# ### def _read_projfile
+
+	def test_loaded_not_modified(self):
+		""" objects loaded from file are not modified """
+
+		proj = dpcore.read_project(self.projfile)
+
+		for story in proj.product_backlog:
+			self.assertFalse(dpcore.is_subtree_modified(story))
+			self.assertTrue(story._source_chunk is not None)
+	# ### def test_loaded_not_modified
+
+	def test_modified_story_only(self):
+		""" only modified story is serialized """
+
+		proj = dpcore.read_project(self.projfile)
+		self.assertTrue(dpcore.command_mark_complete(proj, ["TXziJidzClwYymTAjDlONQA"]))
+		self.assertTrue(dpcore.is_subtree_modified(proj.product_backlog[0]))
+		self.assertFalse(dpcore.is_subtree_modified(proj.product_backlog[1]))
+		dpcore.write_project(self.projfile, proj)
+
+		c = self._read_projfile()
+		self.assertTrue("  s: story 2 (with short key).\n" in c)
+		self.assertTrue("    status: new\n" in c)
+		self.assertTrue("mark task as done." in c)
+		self.assertFalse(dpcore.is_subtree_modified(proj.product_backlog[0]))
+
+		proj = dpcore.read_project(self.projfile)
+		self.assertTrue(dpcore._check_string_prefix(proj.product_backlog[0].subtask[0].status, "DONE"))
+		self.assertEqual("story 2 (with short key).", proj.product_backlog[1].story)
+	# ### def test_modified_story_only
+
+	def test_assigned_attribute(self):
+		""" assigning attribute directly marks object modified """
+
+		proj = dpcore.read_project(self.projfile)
+		proj.product_backlog[1].note = "note of story 2."
+		proj.product_backlog[0].subtask[0].point = 3
+		self.assertTrue(dpcore.is_subtree_modified(proj.product_backlog[0]))
+		self.assertTrue(dpcore.is_subtree_modified(proj.product_backlog[1]))
+		dpcore.write_project(self.projfile, proj)
+
+		proj = dpcore.read_project(self.projfile)
+		self.assertEqual("note of story 2.", proj.product_backlog[1].note)
+		self.assertEqual(3, proj.product_backlog[0].subtask[0].point)
+	# ### def test_assigned_attribute
+
+	def test_rebuild(self):
+		""" rebuild serialize whole project """
+
+		proj = dpcore.read_project(self.projfile)
+		dpcore.command_rebuild(proj, [])
+		dpcore.write_project(self.projfile, proj)
+
+		c = self._read_projfile()
+		self.assertTrue("  story: story 2 (with short key).\n" in c)
+		self.assertFalse("status: new" in c)
+	# ### def test_rebuild
+
+	def test_identical_to_full_dump(self):
+		""" output is identical to full serialization for normalized file """
+
+		proj = dpcore.read_project(self.projfile)
+		dpcore.command_rebuild(proj, [])
+		dpcore.write_project(self.projfile, proj)
+
+		proj = dpcore.read_project(self.projfile)
+		dpcore.command_mark_complete(proj, ["TELS6qH02CTdclq1as7HhNw"])
+		dpcore.command_add_story(proj, [])
+		yml = dpcore._dump_project_text(proj)
+
+		self.assertEqual(yaml.serialize(dpcore.yamlnodedump_project(proj), encoding='utf-8', allow_unicode=True), yml)
+	# ### def test_identical_to_full_dump
+# ### class TestIncrementalWrite
+
+
+
+if __name__ == '__main__':
+	unittest.main()
+
+# vim: ts=4 sw=4 ai nowarp
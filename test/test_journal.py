@@ -0,0 +1,190 @@
+
+# -*- coding: utf-8 -*-
+
+import datetime
+import os
+import shutil
+import sys
+import StringIO
+import tempfile
+import unittest
+
+import testing_common
+
+import dpcore
+
+
+_sample_doc = """product-backlog:
+- story-id: CkhKPbtZP6sCVXnYoDkOTUw
+  story: story 1.
+  task:
+  - t-id: TXziJidzClwYymTAjDlONQA
+    t: task of story 1.
+- story-id: Cqq28BRXWH70ZmfX60xVwPA
+  story: story 2.
+  task:
+  - t-id: TELS6qH02CTdclq1as7HhNw
+    t: task of story 2.
+"""
+
+
+class TestJournal(unittest.TestCase):
+	""" test command journal of project file """
+
+	def setUp(self):
+		self.orig_rt_config = dpcore._rt_config
+		dpcore._rt_config = dpcore.RuntimeConfiguration("Test User", None, None)
+		self.workdir = tempfile.mkdtemp()
+		self.projfile = os.path.join(self.workdir, "dp.txt")
+		fp = open(self.projfile, "w")
+		fp.write(_sample_doc)
+		fp.close()
+		self.orig_stderr = sys.stderr
+		sys.stderr = StringIO.StringIO()
+	# ### def setUp
+
+	def tearDown(self):
+		sys.stderr = self.orig_stderr
+		dpcore._rt_config = self.orig_rt_config
+		shutil.rmtree(self.workdir)
+	# ### def tearDown
+
+	def _run_journaled(self, cmdname, cmdargs, tstamp, author):
+		proj = dpcore.read_project(self.projfile, False, True)
+		journal_length = dpcore.replay_journal(self.projfile, proj)
+		self.assertTrue(dpcore.run_command(proj, dpcore._lookup_command(cmdname), cmdargs, tstamp, author))
+		dpcore.append_journal(self.projfile, cmdname, cmdargs, tstamp, author, 0 == journal_length)
+		return proj
+	# ### def _run_journaled
+
+	def test_replay(self):
+		""" project replayed from journal is identical to the one commands run on """
+
+		t1 = datetime.datetime(2012, 7, 24, 18, 40, 49)
+		t2 = datetime.datetime(2012, 7, 25, 9, 0, 0)
+		self._run_journaled("done", ["TXzi"], t1, "User A")
+		expected = self._run_journaled("add-task", ["Cqq2"], t2, "User B")
+		expected = dpcore._dump_project_text(expected)
+
+		fp = open(self.projfile, "r")
+		self.assertEqual(_sample_doc, fp.read())
+		fp.close()
+
+		proj = dpcore.read_project(self.projfile, False, True)
+		self.assertEqual(2, dpcore.replay_journal(self.projfile, proj))
+		self.assertEqual(expected, dpcore._dump_project_text(proj))
+		task = proj.product_backlog[0].subtask[0]
+		self.assertEqual("DONE (2012-07-24 18:40:49)", task.status)
+		self.assertEqual("User A", task.logrecord[0].author)
+		self.assertEqual(t1, task.logrecord[0].record_time)
+	# ### def test_replay
+
+	def test_compact(self):
+		""" compaction folds journal into project file """
+
+		proj = self._run_journaled("done", ["TELS"], datetime.datetime(2012, 7, 24, 18, 40, 49), "User A")
+		dpcore.compact_project(self.projfile, proj)
+
+		self.assertFalse(os.path.exists(dpcore._get_project_journal_filename(self.projfile)))
+		proj = dpcore.read_project(self.projfile)
+		self.assertEqual(0, dpcore.replay_journal(self.projfile, proj))
+		self.assertEqual("DONE (2012-07-24 18:40:49)", proj.product_backlog[1].subtask[0].status)
+	# ### def test_compact
+
+	def test_stale(self):
+		""" journal is replayed onto changed project file """
+
+		self._run_journaled("done", ["TELS"], datetime.datetime(2012, 7, 24, 18, 40, 49), "User A")
+		fp = open(self.projfile, "a")
+		fp.write("- story 3.\n")
+		fp.close()
+
+		proj = dpcore.read_project(self.projfile)
+		self.assertTrue(dpcore.replay_journal(self.projfile, proj) is None)
+		self.assertEqual("DONE (2012-07-24 18:40:49)", proj.product_backlog[1].subtask[0].status)
+		self.assertEqual("story 3.", proj.product_backlog[2].story)
+		self.assertTrue("WARN:" in sys.stderr.getvalue())
+	# ### def test_stale
+
+	def test_interrupted_compaction(self):
+		""" journal left by interrupted compaction is not replayed again """
+
+		proj = self._run_journaled("done", ["TELS"], datetime.datetime(2012, 7, 24, 18, 40, 49), "User A")
+		orig_discard_journal = dpcore.discard_journal
+		dpcore.discard_journal = lambda filename: None
+		try:
+			dpcore.compact_project(self.projfile, proj)
+		finally:
+			dpcore.discard_journal = orig_discard_journal
+
+		proj = dpcore.read_project(self.projfile)
+		self.assertEqual(0, dpcore.replay_journal(self.projfile, proj))
+		self.assertEqual(1, len(proj.product_backlog[1].subtask[0].logrecord))
+		self._run_journaled("done", ["TXzi"], datetime.datetime(2012, 7, 25, 9, 0, 0), "User B")
+
+		proj = dpcore.read_project(self.projfile)
+		self.assertEqual(1, dpcore.replay_journal(self.projfile, proj))
+		self.assertEqual(1, len(proj.product_backlog[1].subtask[0].logrecord))
+		self.assertEqual("DONE (2012-07-25 09:00:00)", proj.product_backlog[0].subtask[0].status)
+		self.assertEqual("", sys.stderr.getvalue())
+	# ### def test_interrupted_compaction
+
+	def _update(self, cmdname, cmdargs, tstamp):
+		orig_stdout = sys.stdout
+		sys.stdout = StringIO.StringIO()
+		try:
+			return dpcore.update_project(self.projfile, cmdname, cmdargs, tstamp)
+		finally:
+			sys.stdout = orig_stdout
+	# ### def _update
+
+	def test_hand_edit(self):
+		""" journaled command is kept when project file is edited by hand """
+
+		dpcore._rt_config.journal_threshold = 10
+		self.assertEqual((True, True,), self._update("done", ["TXzi"], datetime.datetime(2012, 7, 24, 18, 40, 49)))
+		fp = open(self.projfile, "r")
+		self.assertEqual(_sample_doc, fp.read())
+		fp.close()
+		fp = open(self.projfile, "a")
+		fp.write("- story 3.\n")
+		fp.close()
+
+		self.assertEqual((True, True,), self._update("done", ["TELS"], datetime.datetime(2012, 7, 25, 9, 0, 0)))
+		self.assertFalse(os.path.exists(dpcore._get_project_journal_filename(self.projfile)))
+		proj = dpcore.read_project(self.projfile)
+		self.assertEqual("DONE (2012-07-24 18:40:49)", proj.product_backlog[0].subtask[0].status)
+		self.assertEqual("DONE (2012-07-25 09:00:00)", proj.product_backlog[1].subtask[0].status)
+		self.assertEqual("story 3.", proj.product_backlog[2].story)
+	# ### def test_hand_edit
+
+	def test_add_not_journaled(self):
+		""" new story and task are written into project file at once """
+
+		dpcore._rt_config.journal_threshold = 10
+		self.assertEqual((True, True,), self._update("add-task", ["Cqq2"], datetime.datetime(2012, 7, 24, 18, 40, 49)))
+		self.assertFalse(os.path.exists(dpcore._get_project_journal_filename(self.projfile)))
+		fp = open(self.projfile, "r")
+		self.assertEqual(3, fp.read().count("  - t"))
+		fp.close()
+	# ### def test_add_not_journaled
+
+	def test_partial_entry(self):
+		""" partially written last entry is skipped """
+
+		self._run_journaled("done", ["TELS"], datetime.datetime(2012, 7, 24, 18, 40, 49), "User A")
+		fp = open(dpcore._get_project_journal_filename(self.projfile), "a")
+		fp.write('{"time": "2012-07-24 18:41:00", "comm')
+		fp.close()
+
+		proj = dpcore.read_project(self.projfile)
+		self.assertEqual(1, dpcore.replay_journal(self.projfile, proj))
+	# ### def test_partial_entry
+# ### class TestJournal
+
+
+
+if __name__ == '__main__':
+	unittest.main()
+
+# vim: ts=4 sw=4 ai nowarp
@@ -0,0 +1,137 @@
+
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+import yaml
+
+import testing_common
+
+import dpcore
+
+
+_sample_doc = """product-backlog:
+- story-id: CkhKPbtZP6sCVXnYoDkOTUw
+  story: story 1.
+  sub-story:
+  - story-id: CPQg8hovpmlR6oitUT0BmOQ
+    story: story 1.1.
+    task:
+    - t-id: TXziJidzClwYymTAjDlONQA
+      t: task of story 1.1.
+- story-id: Cqq28BRXWH70ZmfX60xVwPA
+  story: story 2.
+  task:
+  - t-id: TELS6qH02CTdclq1as7HhNw
+    t: task of story 2.
+    log:
+    - l: a log.
+      record-time: 2012-07-24 18:51:58
+      author: Test User
+"""
+
+
+class TestLazyLoad(unittest.TestCase):
+	""" test lazily loaded project """
+
+	def setUp(self):
+		self.orig_rt_config = dpcore._rt_config
+		dpcore._rt_config = dpcore.RuntimeConfiguration("Test User", None, None)
+		self.workdir = tempfile.mkdtemp()
+		self.projfile = os.path.join(self.workdir, "dp.txt")
+		fp = open(self.projfile, "w")
+		fp.write(_sample_doc)
+		fp.close()
+	# ### def setUp
+
+	def tearDown(self):
+		dpcore._rt_config = self.orig_rt_config
+		shutil.rmtree(self.workdir)
+	# ### def tearDown
+
+	def test_not_materialized(self):
+		""" only top-level stories are built on load """
+
+		proj = dpcore.read_project(self.projfile, False, True)
+
+		self.assertEqual(2, len(proj.product_backlog))
+		self.assertEqual("story 2.", proj.product_backlog[1].story)
+		for story in proj.product_backlog:
+			self.assertFalse(story.is_materialized())
+		self.assertTrue(proj._registry.find("TXziJidzClwYymTAjDlONQA") is None)
+	# ### def test_not_materialized
+
+	def test_find_object(self):
+		""" materialize only the story containing the object """
+
+		proj = dpcore.read_project(self.projfile, False, True)
+		obj = dpcore.find_object(proj, "TXziJidzClwYymTAjDlONQA")
+
+		self.assertEqual("task of story 1.1.", obj.task)
+		self.assertTrue(proj.product_backlog[0].is_materialized())
+		self.assertFalse(proj.product_backlog[1].is_materialized())
+		self.assertTrue(dpcore.find_object(proj, "TNotExist") is None)
+	# ### def test_find_object
+
+	def test_write_unmaterialized(self):
+		""" untouched stories are written back verbatim """
+
+		proj = dpcore.read_project(self.projfile, False, True)
+		self.assertTrue(dpcore.command_mark_complete(proj, ["TXziJidzClwYymTAjDlONQA"]))
+		dpcore.write_project(self.projfile, proj)
+		self.assertFalse(proj.product_backlog[1].is_materialized())
+
+		proj = dpcore.read_project(self.projfile)
+		self.assertTrue(dpcore._check_string_prefix(proj.product_backlog[0].substory[0].subtask[0].status, "DONE"))
+		self.assertEqual("a log.", proj.product_backlog[1].subtask[0].logrecord[0].log)
+	# ### def test_write_unmaterialized
+
+	def test_same_as_eager(self):
+		""" materialized project is same as eagerly loaded one """
+
+		proj = dpcore.read_project(self.projfile)
+		yml_eager = yaml.serialize(dpcore.yamlnodedump_project(proj))
+		proj = dpcore.read_project(self.projfile, False, True)
+		yml_lazy = yaml.serialize(dpcore.yamlnodedump_project(proj))
+
+		self.assertEqual(yml_eager, yml_lazy)
+	# ### def test_same_as_eager
+
+	def test_ampersand_text(self):
+		""" text with ampersand does not disable lazy loading """
+
+		fp = open(self.projfile, "w")
+		fp.write(_sample_doc.replace("story: story 2.", "story: R&D << story 2.").replace("t: task of story 2.", "t: task of R&D."))
+		fp.close()
+
+		proj = dpcore.read_project(self.projfile, False, True)
+		self.assertEqual("R&D << story 2.", proj.product_backlog[1].story)
+		self.assertFalse(proj.product_backlog[1].is_materialized())
+		self.assertEqual("task of R&D.", dpcore.find_object(proj, "TELS6qH02CTdclq1as7HhNw").task)
+	# ### def test_ampersand_text
+
+	def test_anchor(self):
+		""" anchors, aliases and merge keys (also under lazily loaded stories) are loaded by composing document """
+
+		for doc in (
+				_sample_doc.replace("      author: Test User", "      author: &a Test User\n    - l: another log.\n      author: *a"),
+				_sample_doc.replace("    - l: a log.", "    - &l\n      l: a log.").replace("      author: Test User", "      author: Test User\n    - <<: *l\n      l: another log."),):
+			fp = open(self.projfile, "w")
+			fp.write(doc)
+			fp.close()
+			proj = dpcore.read_project(self.projfile, False, True)
+			self.assertTrue(proj.product_backlog[1].is_materialized())
+			logs = dpcore.find_object(proj, "TELS6qH02CTdclq1as7HhNw").logrecord
+			self.assertEqual(["a log.", "another log.",], [l.log for l in logs])
+			self.assertEqual("Test User", logs[1].author)
+	# ### def test_anchor
+# ### class TestLazyLoad
+
+
+
+if __name__ == '__main__':
+	unittest.main()
+
+# vim: ts=4 sw=4 ai nowarp
@@ -0,0 +1,152 @@
+
+# -*- coding: utf-8 -*-
+
+import datetime
+import os
+import shutil
+import sys
+import StringIO
+import tempfile
+import unittest
+
+import testing_common
+
+import dpcore
+
+
+_sample_doc = """product-backlog:
+- story-id: CkhKPbtZP6sCVXnYoDkOTUw
+  story: story 1.
+  task:
+  - t-id: TXziJidzClwYymTAjDlONQA
+    t: task of story 1.
+- story-id: Cqq28BRXWH70ZmfX60xVwPA
+  story: story 2.
+  task:
+  - t-id: TELS6qH02CTdclq1as7HhNw
+    t: task of story 2.
+"""
+
+
+class TestProjectLock(unittest.TestCase):
+	""" test locking and optimistic update of project file """
+
+	def setUp(self):
+		self.orig_rt_config = dpcore._rt_config
+		dpcore._rt_config = dpcore.RuntimeConfiguration("Test User", None, None, lock_timeout=0.2)
+		self.workdir = tempfile.mkdtemp()
+		self.projfile = os.path.join(self.workdir, "dp.txt")
+		fp = open(self.projfile, "w")
+		fp.write(_sample_doc)
+		fp.close()
+		self.orig_replay_journal = dpcore.replay_journal
+		self.orig_stdout = sys.stdout
+		sys.stdout = StringIO.StringIO()
+		self.tstamp = datetime.datetime(2012, 7, 24, 18, 40, 49)
+	# ### def setUp
+
+	def tearDown(self):
+		sys.stdout = self.orig_stdout
+		dpcore.replay_journal = self.orig_replay_journal
+		dpcore._rt_config = self.orig_rt_config
+		shutil.rmtree(self.workdir)
+	# ### def tearDown
+
+	def _write_by_others(self):
+		proj = dpcore.read_project(self.projfile)
+		dpcore.command_mark_complete(proj, ["TELS"])
+		dpcore.write_project(self.projfile, proj)
+	# ### def _write_by_others
+
+	def _inject_concurrent_write(self, times):
+		counter = [0,]
+		def replay_with_concurrent_write(filename, proj):
+			counter[0] = counter[0] + 1
+			if counter[0] <= times:
+				self._write_by_others()
+			return self.orig_replay_journal(filename, proj)
+		dpcore.replay_journal = replay_with_concurrent_write
+		return counter
+	# ### def _inject_concurrent_write
+
+	def test_lock_timeout(self):
+		""" lock held by others is waited for a bounded time """
+
+		lockfp = dpcore.lock_project(self.projfile)
+		try:
+			self.assertTrue(dpcore.lock_project(self.projfile, 0.05) is None)
+			self.assertTrue(dpcore.update_project(self.projfile, "done", ["TXzi"], self.tstamp) is None)
+		finally:
+			dpcore.unlock_project(lockfp)
+
+		lockfp = dpcore.lock_project(self.projfile, 0.05)
+		self.assertFalse(lockfp is None)
+		dpcore.unlock_project(lockfp)
+
+		fp = open(self.projfile, "r")
+		self.assertEqual(_sample_doc, fp.read())
+		fp.close()
+	# ### def test_lock_timeout
+
+	def test_optimistic_retry(self):
+		""" command is run again on project file changed meanwhile """
+
+		counter = self._inject_concurrent_write(1)
+		self.assertEqual((True, True,), dpcore.update_project(self.projfile, "done", ["TXzi"], self.tstamp))
+		self.assertEqual(2, counter[0])
+
+		proj = dpcore.read_project(self.projfile)
+		self.assertEqual("DONE (2012-07-24 18:40:49)", proj.product_backlog[0].subtask[0].status)
+		self.assertTrue(dpcore._check_string_prefix(proj.product_backlog[1].subtask[0].status, "DONE"))
+	# ### def test_optimistic_retry
+
+	def test_exclusive(self):
+		""" exclusive mode reads project file under lock and never retries """
+
+		dpcore._rt_config.optimistic_lock = False
+		counter = self._inject_concurrent_write(0)
+		self.assertEqual((True, True,), dpcore.update_project(self.projfile, "done", ["TXzi"], self.tstamp))
+		self.assertEqual(1, counter[0])
+	# ### def test_exclusive
+
+	def test_server_reapply(self):
+		""" server re-applies unwritten commands if project file is changed by others """
+
+		server = dpcore.ProjectServer(self.projfile, dpcore._get_server_socket_filename(self.projfile), False, 60.0)
+		server.load()
+		self.assertTrue(server.handle_request({"command": "done", "args": ["TXzi"]})["result"])
+		self._write_by_others()
+		self.assertTrue(server.flush())
+
+		proj = dpcore.read_project(self.projfile)
+		self.assertTrue(dpcore._check_string_prefix(proj.product_backlog[0].subtask[0].status, "DONE"))
+		self.assertTrue(dpcore._check_string_prefix(proj.product_backlog[1].subtask[0].status, "DONE"))
+	# ### def test_server_reapply
+
+	def test_server_batch_locked(self):
+		""" batch is refused if pending modifications cannot be written, they are kept """
+
+		server = dpcore.ProjectServer(self.projfile, dpcore._get_server_socket_filename(self.projfile), False, 60.0)
+		server.load()
+		self.assertTrue(server.handle_request({"command": "done", "args": ["TXzi"]})["result"])
+		lockfp = dpcore.lock_project(self.projfile)
+		try:
+			resp = server.handle_request({"command": "batch", "args": []})
+		finally:
+			dpcore.unlock_project(lockfp)
+		self.assertFalse(resp["result"])
+		self.assertTrue(resp["output"].startswith("ERR:"))
+		self.assertEqual(1, len(server.pending))
+
+		self.assertTrue(server.flush())
+		proj = dpcore.read_project(self.projfile)
+		self.assertTrue(dpcore._check_string_prefix(proj.product_backlog[0].subtask[0].status, "DONE"))
+	# ### def test_server_batch_locked
+# ### class TestProjectLock
+
+
+
+if __name__ == '__main__':
+	unittest.main()
+
+# vim: ts=4 sw=4 ai nowarp
@@ -0,0 +1,131 @@
+
+# -*- coding: utf-8 -*-
+
+import cPickle
+import datetime
+import unittest
+
+import testing_common
+
+import dpcore
+
+
+_sample_doc = """product-backlog:
+- story-id: CkhKPbtZP6sCVXnYoDkOTUw
+  story: story 1.
+  task:
+  - t-id: TXziJidzClwYymTAjDlONQA
+    t: task of story 1.
+    log:
+    - l: mark task as done.
+      record-time: 2012-07-24 18:40:49
+      author: Test User
+    - l: |-
+        multiple line
+        log 中文
+      record-time: 2012-07-25 09:00:00
+      author: Other User
+      action: review
+  log:
+  - l-id: L1
+    l: story log.
+    record-time: 2012-07-24 10:00:00
+    author: Test User
+- story-id: Cqq28BRXWH70ZmfX60xVwPA
+  story: story 2.
+  task:
+  - t-id: TELS6qH02CTdclq1as7HhNw
+    t: task of story 2.
+    log:
+    - l: mark task as done.
+      record-time: 2012-07-26 18:40:49
+      author: Test User
+"""
+
+
+class TestLogStore(unittest.TestCase):
+	""" test LogStore and LogView """
+
+	def setUp(self):
+		self.orig_rt_config = dpcore._rt_config
+		dpcore._rt_config = dpcore.RuntimeConfiguration("Test User", None, None)
+		dpcore.select_log_store(True)
+	# ### def setUp
+
+	def tearDown(self):
+		dpcore.select_log_store(False)
+		dpcore._rt_config = self.orig_rt_config
+	# ### def tearDown
+
+	def _dump_normalized(self, proj):
+		dpcore.command_rebuild(proj, [])
+		return dpcore._dump_project_text(proj)
+	# ### def _dump_normalized
+
+	def test_same_output(self):
+		""" project with log store is serialized identically """
+
+		proj = dpcore._load_project_events(_sample_doc)
+		task = proj.product_backlog[0].subtask[0]
+		self.assertTrue(isinstance(task.logrecord, dpcore.LogView))
+		yml_store = self._dump_normalized(proj)
+
+		dpcore.select_log_store(False)
+		proj = dpcore._load_project_events(_sample_doc)
+		self.assertFalse(isinstance(proj.product_backlog[0].subtask[0].logrecord, dpcore.LogView))
+		self.assertEqual(self._dump_normalized(proj), yml_store)
+	# ### def test_same_output
+
+	def test_view(self):
+		""" read log records through view """
+
+		proj = dpcore._load_project_events(_sample_doc)
+		story = proj.product_backlog[0]
+		logrecs = story.subtask[0].logrecord
+
+		self.assertEqual(2, len(logrecs))
+		self.assertEqual(u"mark task as done.", logrecs[0].log)
+		self.assertEqual(datetime.datetime(2012, 7, 24, 18, 40, 49), logrecs[0].record_time)
+		self.assertEqual(u"multiple line\nlog 中文", logrecs[1].log)
+		self.assertEqual(u"review", logrecs[1].action)
+		self.assertTrue(logrecs[0].author is proj.product_backlog[1].subtask[0].logrecord[0].author)
+		self.assertEqual("L1", story.logrecord[0].log_id)
+		self.assertEqual([u"story log.",], [l.log for l in story.logrecord])
+	# ### def test_view
+
+	def test_append(self):
+		""" new log record marks only its story modified """
+
+		proj = dpcore._load_project_events(_sample_doc)
+		self.assertTrue(dpcore.command_mark_complete(proj, ["TELS6qH02CTdclq1as7HhNw"]))
+
+		logrecs = proj.product_backlog[1].subtask[0].logrecord
+		self.assertEqual(2, len(logrecs))
+		self.assertEqual("Test User", logrecs[1].author)
+		self.assertFalse(dpcore.is_subtree_modified(proj.product_backlog[0]))
+		self.assertTrue(dpcore.is_subtree_modified(proj.product_backlog[1]))
+
+		dpcore._clear_subtree_modified(proj.product_backlog[1])
+		self.assertFalse(dpcore.is_subtree_modified(proj.product_backlog[1]))
+	# ### def test_append
+
+	def test_pickle(self):
+		""" log store survives pickling (for project cache) """
+
+		proj = dpcore._load_project_events(_sample_doc, True)
+		proj.product_backlog[0].is_materialized()
+		logrecs = proj.product_backlog[0].subtask[0].logrecord
+		self.assertTrue(isinstance(logrecs, dpcore.LogView))
+
+		restored = cPickle.loads(cPickle.dumps(proj, cPickle.HIGHEST_PROTOCOL))
+		self.assertEqual([(l.log, l.record_time, l.author, l.action,) for l in logrecs], [(l.log, l.record_time, l.author, l.action,) for l in restored.product_backlog[0].subtask[0].logrecord])
+		self.assertEqual(self._dump_normalized(proj), self._dump_normalized(restored))
+	# ### def test_pickle
+# ### class TestLogStore
+
+
+
+if __name__ == '__main__':
+	unittest.main()
+
+# vim: ts=4 sw=4 ai nowarp
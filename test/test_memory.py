@@ -0,0 +1,94 @@
+
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import subprocess
+import unittest
+
+import testing_common
+
+import dpcore
+
+
+_measure_script = """
+import sys, resource, datetime
+sys.path.insert(0, %r)
+import dpcore
+dpcore._rt_config = dpcore.RuntimeConfiguration("Test User", None, None)
+n = %d
+tstamp = datetime.datetime(2012, 7, 24, 18, 40, 49)
+m = [{"t-id": "T%%022d" %% (i,), "t": "task", "log": [{"l": "mark task as done.", "record-time": tstamp, "author": u"Test User"}]} for i in range(n)]
+r = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+tasks = dpcore.load_tasks(m)
+sys.stdout.write(str((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - r) * 1024 / n))
+"""
+
+def _measure_task_memory(count):
+	""" get growth of peak RSS (in bytes) per task (with one log) loaded in a new process """
+
+	script = _measure_script % (os.path.dirname(os.path.abspath(dpcore.__file__)), count,)
+	p = subprocess.Popen([sys.executable, "-c", script], stdout=subprocess.PIPE)
+	out = p.communicate()[0]
+	return int(out)
+# ### def _measure_task_memory
+
+
+class TestCompactObject(unittest.TestCase):
+	""" test memory footprint of Story, Task and Log objects """
+
+	def setUp(self):
+		self.orig_rt_config = dpcore._rt_config
+		dpcore._rt_config = dpcore.RuntimeConfiguration("Test User", None, None)
+	# ### def setUp
+
+	def tearDown(self):
+		dpcore._rt_config = self.orig_rt_config
+	# ### def tearDown
+
+	def test_no_instance_dict(self):
+		""" objects do not carry __dict__ """
+
+		story = dpcore.Story(story="story")
+		task = dpcore.Task(task="task")
+		logrec = dpcore.Log(log="log")
+
+		for obj in (story, task, logrec,):
+			self.assertFalse(hasattr(obj, "__dict__"))
+	# ### def test_no_instance_dict
+
+	def test_shared_empty_container(self):
+		""" empty containers are shared until first append """
+
+		t1, t2, = dpcore.load_tasks(["task 1", "task 2",])
+
+		self.assertTrue(t1.subtask is t2.subtask)
+		self.assertTrue(t1.logrecord is t2.logrecord)
+		self.assertEqual(0, len(t1.subtask))
+
+		t1.append_log(dpcore.Log(log="log"))
+		self.assertEqual(1, len(t1.logrecord))
+		self.assertEqual(0, len(t2.logrecord))
+	# ### def test_shared_empty_container
+
+	def test_shared_author(self):
+		""" authors of loaded logs are shared """
+
+		l1, l2, = dpcore.load_logs([{"l": "log 1", "author": u"Someone"}, {"l": "log 2", "author": u"Someone"},])
+
+		self.assertTrue(l1.author is l2.author)
+	# ### def test_shared_author
+
+	def test_memory_per_task(self):
+		""" loaded task with a log takes less than 1KB (more than 2KB with per-instance dict) """
+
+		self.assertTrue(_measure_task_memory(50000) < 1024)
+	# ### def test_memory_per_task
+# ### class TestCompactObject
+
+
+
+if __name__ == '__main__':
+	unittest.main()
+
+# vim: ts=4 sw=4 ai nowarp
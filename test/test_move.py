@@ -0,0 +1,177 @@
+
+# -*- coding: utf-8 -*-
+
+import datetime
+import os
+import shutil
+import sys
+import StringIO
+import tempfile
+import unittest
+
+import testing_common
+
+import dpcore
+
+
+_sample_doc = """product-backlog:
+- story-id: CkhKPbtZP6sCVXnYoDkOTUw
+  story: story 1.
+  sub-story:
+  - story-id: CPQg8hovpmlR6oitUT0BmOQ
+    story: sub-story of story 1.
+    task:
+    - t-id: TXziJidzClwYymTAjDlONQA
+      t: task 1.
+      point: 3
+      status: DONE (2012-07-24 18:40:49)
+  task:
+  - t-id: TELS6qH02CTdclq1as7HhNw
+    t: task 2.
+    point: 5
+    sub-task:
+    - t-id: T0TtvAXLuEqwZAQEwgZwZUA
+      t: sub-task of task 2.
+      point: 1
+- story-id: Cqq28BRXWH70ZmfX60xVwPA
+  story: story 2.
+  task:
+  - t-id: To9M2jIpZaArrAHYq38T40A
+    t: task 4.
+    point: 2
+"""
+
+
+class TestMoveRemove(unittest.TestCase):
+	""" test parent references and move, rm commands """
+
+	def setUp(self):
+		self.orig_rt_config = dpcore._rt_config
+		dpcore._rt_config = dpcore.RuntimeConfiguration("Test User", None, None)
+		self.workdir = tempfile.mkdtemp()
+		self.projfile = os.path.join(self.workdir, "dp.txt")
+		fp = open(self.projfile, "w")
+		fp.write(_sample_doc)
+		fp.close()
+		self.orig_stdout = sys.stdout
+		sys.stdout = StringIO.StringIO()
+		self.tstamp = datetime.datetime(2012, 8, 1, 0, 0, 0)
+	# ### def setUp
+
+	def tearDown(self):
+		sys.stdout = self.orig_stdout
+		dpcore._rt_config = self.orig_rt_config
+		shutil.rmtree(self.workdir)
+	# ### def tearDown
+
+	def _run(self, proj, cmdfunc, args):
+		return dpcore.run_command(proj, cmdfunc, args, self.tstamp)
+	# ### def _run
+
+	def _ids(self, objs):
+		return [o.get_object_id() for o in objs]
+	# ### def _ids
+
+	def test_parent(self):
+		""" parent references are set on load and append """
+
+		for lazy in (False, True,):
+			proj = dpcore._load_project_events(_sample_doc, lazy)
+			story1 = proj.product_backlog[0]
+			self.assertTrue(story1._parent is proj)
+			self.assertTrue(proj._registry.get_parent(story1) is None)
+			self.assertTrue(story1.substory[0]._parent is story1)
+			self.assertTrue(story1.subtask[0].subtask[0]._parent is story1.subtask[0])
+			self.assertTrue(proj._registry.get_parent(dpcore.find_object(proj, "To9M2jIpZaArrAHYq38T40A")) is proj.product_backlog[1])
+
+		task = dpcore.Task(task="new task.")
+		self.assertTrue(task._parent is None)
+		story1.append_subtask(task)
+		self.assertTrue(task._parent is story1)
+	# ### def test_parent
+
+	def test_move(self):
+		""" tasks and stories are moved with everything under them """
+
+		proj = dpcore._load_project_events(_sample_doc)
+		story1, story2, = proj.product_backlog
+		self.assertTrue(self._run(proj, dpcore.command_move, ["TELS", "Cqq2"]))
+		self.assertEqual(["To9M2jIpZaArrAHYq38T40A", "TELS6qH02CTdclq1as7HhNw",], self._ids(story2.subtask))
+		self.assertEqual([], self._ids(story1.subtask))
+		self.assertEqual((1, 3,), (dpcore.get_rollup(story1).tasks, dpcore.get_rollup(story1).points,))
+		self.assertEqual((3, 8,), (dpcore.get_rollup(story2).tasks, dpcore.get_rollup(story2).points,))
+
+		self.assertTrue(self._run(proj, dpcore.command_move, ["CPQg"]))
+		self.assertEqual(["CkhKPbtZP6sCVXnYoDkOTUw", "Cqq28BRXWH70ZmfX60xVwPA", "CPQg8hovpmlR6oitUT0BmOQ",], self._ids(proj.product_backlog))
+		self.assertTrue(proj._registry.get_parent(proj.product_backlog[2]) is None)
+		self.assertEqual(0, dpcore.get_rollup(story1).stories)
+
+		self.assertTrue(self._run(proj, dpcore.command_move, ["Cqq2", "CPQg"]))
+		self.assertEqual((1, 4, 11,), (dpcore.get_rollup(proj.product_backlog[1]).stories, dpcore.get_rollup(proj.product_backlog[1]).tasks, dpcore.get_rollup(proj.product_backlog[1]).points,))
+
+		dpcore.write_project(self.projfile, proj)
+		proj = dpcore.read_project(self.projfile)
+		self.assertEqual(["CkhKPbtZP6sCVXnYoDkOTUw", "CPQg8hovpmlR6oitUT0BmOQ",], self._ids(proj.product_backlog))
+		self.assertEqual(["Cqq28BRXWH70ZmfX60xVwPA",], self._ids(proj.product_backlog[1].substory))
+		self.assertEqual(["T0TtvAXLuEqwZAQEwgZwZUA",], self._ids(dpcore.find_object(proj, "TELS6qH02CTdclq1as7HhNw").subtask))
+	# ### def test_move
+
+	def test_move_invalid(self):
+		""" stories cannot be moved under tasks, objects cannot be moved under themselves """
+
+		proj = dpcore._load_project_events(_sample_doc)
+		self.assertFalse(self._run(proj, dpcore.command_move, ["Cqq2", "TELS"]))
+		self.assertFalse(self._run(proj, dpcore.command_move, ["CkhK", "CPQg"]))
+		self.assertFalse(self._run(proj, dpcore.command_move, ["TELS", "T0Tt"]))
+		self.assertFalse(self._run(proj, dpcore.command_move, ["TELS"]))
+		self.assertFalse(self._run(proj, dpcore.command_move, ["CNotExist", "CkhK"]))
+		for l in sys.stdout.getvalue().strip().split("\n"):
+			self.assertTrue(l.startswith("ERR:"))
+		self.assertEqual(["CkhKPbtZP6sCVXnYoDkOTUw", "Cqq28BRXWH70ZmfX60xVwPA",], self._ids(proj.product_backlog))
+		self.assertEqual(["TELS6qH02CTdclq1as7HhNw",], self._ids(proj.product_backlog[0].subtask))
+	# ### def test_move_invalid
+
+	def test_move_lazy_story(self):
+		""" objects under moved story which is not materialized are found in the same batch """
+
+		proj = dpcore._load_project_events(_sample_doc, True)
+		self.assertTrue(self._run(proj, dpcore.command_batch, ["move CkhK Cqq2", "done TXzi", "move T0Tt To9M",]))
+		story2 = proj.product_backlog[0]
+		self.assertEqual(["Cqq28BRXWH70ZmfX60xVwPA",], self._ids(proj.product_backlog))
+		self.assertEqual(["CkhKPbtZP6sCVXnYoDkOTUw",], self._ids(story2.substory))
+		self.assertTrue(dpcore._check_string_prefix(dpcore.find_object(proj, "TXziJidzClwYymTAjDlONQA").status, "DONE"))
+		self.assertEqual(["T0TtvAXLuEqwZAQEwgZwZUA",], self._ids(story2.subtask[0].subtask))
+	# ### def test_move_lazy_story
+
+	def test_remove(self):
+		""" removed objects are not found anymore """
+
+		proj = dpcore._load_project_events(_sample_doc, True)
+		self.assertEqual(["T0TtvAXLuEqwZAQEwgZwZUA",], dpcore.resolve_object_id(proj, "T0"))
+		self.assertTrue(self._run(proj, dpcore.command_remove, ["TELS"]))
+		self.assertTrue(dpcore.find_object(proj, "T0TtvAXLuEqwZAQEwgZwZUA") is None)
+		self.assertEqual([], dpcore.resolve_object_id(proj, "T0"))
+		self.assertEqual((1, 3,), (dpcore.get_rollup(proj.product_backlog[0]).tasks, dpcore.get_rollup(proj.product_backlog[0]).points,))
+
+		# top-level story which is not materialized
+		self.assertTrue(self._run(proj, dpcore.command_remove, ["Cqq2"]))
+		self.assertEqual([], dpcore.resolve_object_id(proj, "To9M"))
+		self.assertEqual(["CkhKPbtZP6sCVXnYoDkOTUw",], self._ids(proj.product_backlog))
+
+		self.assertTrue(len(proj._registry._unregistered) > 0)
+		self.assertEqual(["CkhKPbtZP6sCVXnYoDkOTUw", "CPQg8hovpmlR6oitUT0BmOQ",], self._ids(proj._registry.stories))
+		self.assertEqual(["TXziJidzClwYymTAjDlONQA",], self._ids(proj._registry.tasks))
+		self.assertEqual(0, len(proj._registry._unregistered))
+
+		dpcore.write_project(self.projfile, proj)
+		proj = dpcore.read_project(self.projfile)
+		self.assertEqual(["CPQg8hovpmlR6oitUT0BmOQ", "TXziJidzClwYymTAjDlONQA",], self._ids(dpcore.iterate_objects(proj.product_backlog[0])))
+	# ### def test_remove
+# ### class TestMoveRemove
+
+
+
+if __name__ == '__main__':
+	unittest.main()
+
+# vim: ts=4 sw=4 ai nowarp
@@ -1,7 +1,10 @@
 
 # -*- coding: utf-8 -*-
 
+import sys
+import StringIO
 import unittest
+import yaml
 
 import testing_common
 
@@ -33,6 +36,78 @@ class TestCheckPrefix(unittest.TestCase):
 # ### class TestCheckPrefix
 
 
+_sample_doc = """product-backlog:
+- story-id: CkhKPbtZP6sCVXnYoDkOTUw
+  story: story 1.
+  task:
+  - t-id: TXziJidzClwYymTAjDlONQA
+    t: task 1 of story 1.
+  - t-id: TXzqLKHuBXvWV6KEbIPT8XU
+    t: task 2 of story 1.
+- story-id: Cqq28BRXWH70ZmfX60xVwPA
+  story: story 2.
+  task:
+  - t-id: TELS6qH02CTdclq1as7HhNw
+    t: task of story 2.
+"""
+
+
+class TestObjectIdPrefix(unittest.TestCase):
+	""" check resolving of object ID prefix """
+
+	def setUp(self):
+		self.orig_rt_config = dpcore._rt_config
+		dpcore._rt_config = dpcore.RuntimeConfiguration("Test User", None, None)
+		self.orig_stdout = sys.stdout
+		sys.stdout = StringIO.StringIO()
+	# ### def setUp
+
+	def tearDown(self):
+		sys.stdout = self.orig_stdout
+		dpcore._rt_config = self.orig_rt_config
+	# ### def tearDown
+
+	def test_resolve(self):
+		""" resolve full ID and ID prefix """
+
+		proj = dpcore.load_project(yaml.safe_load(_sample_doc))
+
+		self.assertEqual(["TXziJidzClwYymTAjDlONQA",], dpcore.resolve_object_id(proj, "TXzi"))
+		self.assertEqual(["TXziJidzClwYymTAjDlONQA", "TXzqLKHuBXvWV6KEbIPT8XU",], dpcore.resolve_object_id(proj, "TXz"))
+		self.assertEqual(["CkhKPbtZP6sCVXnYoDkOTUw",], dpcore.resolve_object_id(proj, "CkhKPbtZP6sCVXnYoDkOTUw"))
+		self.assertEqual([], dpcore.resolve_object_id(proj, "TNot"))
+	# ### def test_resolve
+
+	def test_command(self):
+		""" commands accept unique ID prefix only """
+
+		proj = dpcore.load_project(yaml.safe_load(_sample_doc))
+
+		self.assertTrue(dpcore.command_mark_complete(proj, ["TXzq"]))
+		self.assertTrue(dpcore._check_string_prefix(proj.product_backlog[0].subtask[1].status, "DONE"))
+
+		self.assertFalse(dpcore.command_mark_complete(proj, ["TXz"]))
+		self.assertTrue("ambiguous object ID" in sys.stdout.getvalue())
+		self.assertTrue(proj.product_backlog[0].subtask[0].status is None)
+
+		self.assertFalse(dpcore.command_add_task(proj, ["CNot"]))
+		self.assertTrue("parent object not found" in sys.stdout.getvalue())
+	# ### def test_command
+
+	def test_lazy_story(self):
+		""" resolving ID prefix materializes matched story only """
+
+		proj = dpcore._load_project_events(_sample_doc, True)
+
+		self.assertEqual(["TELS6qH02CTdclq1as7HhNw",], dpcore.resolve_object_id(proj, "TE"))
+		self.assertFalse(proj.product_backlog[1].is_materialized())
+		self.assertTrue(dpcore.command_mark_complete(proj, ["TE"]))
+		self.assertTrue(proj.product_backlog[1].is_materialized())
+		self.assertFalse(proj.product_backlog[0].is_materialized())
+	# ### def test_lazy_story
+# ### class TestObjectIdPrefix
+
+
 
 if __name__ == '__main__':
 	unittest.main()
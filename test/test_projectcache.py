@@ -0,0 +1,92 @@
+
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import testing_common
+
+import dpcore
+
+
+_sample_doc = """product-backlog:
+- story-id: CkhKPbtZP6sCVXnYoDkOTUw
+  story: a story with task.
+  point: 6
+  task:
+  - t-id: TXziJidzClwYymTAjDlONQA
+    t: a task of story.
+    status: DONE
+    log:
+    - l: mark task as done.
+      record-time: 2012-07-24 18:40:49
+      author: Test User
+"""
+
+
+class TestProjectCache(unittest.TestCase):
+	""" test cache sidecar file of read_project() and write_project() """
+
+	def setUp(self):
+		self.workdir = tempfile.mkdtemp()
+		self.projfile = os.path.join(self.workdir, "dp.txt")
+		fp = open(self.projfile, "w")
+		fp.write(_sample_doc)
+		fp.close()
+	# ### def setUp
+
+	def tearDown(self):
+		shutil.rmtree(self.workdir)
+	# ### def tearDown
+
+	def test_cache_hit(self):
+		""" read unchanged project from cache """
+
+		dpcore.read_project(self.projfile, True)
+		self.assertTrue(os.path.exists(dpcore._get_project_cache_filename(self.projfile)))
+
+		proj = dpcore._load_project_cache(self.projfile, dpcore._get_file_identity(self.projfile))
+		self.assertTrue(proj is not None)
+		self.assertEqual("a story with task.", proj.product_backlog[0].story)
+		self.assertEqual("DONE", proj.product_backlog[0].subtask[0].status)
+		self.assertTrue(dpcore.find_object(proj, "TXziJidzClwYymTAjDlONQA") is proj.product_backlog[0].subtask[0])
+		self.assertTrue(dpcore.get_active_registry() is proj._registry)
+	# ### def test_cache_hit
+
+	def test_cache_invalidate(self):
+		""" cache is not used after project file modified """
+
+		dpcore.read_project(self.projfile, True)
+
+		fp = open(self.projfile, "w")
+		fp.write(_sample_doc.replace("a story with task.", "a story which is edited."))
+		fp.close()
+
+		proj = dpcore._load_project_cache(self.projfile, dpcore._get_file_identity(self.projfile))
+		self.assertTrue(proj is None)
+
+		proj = dpcore.read_project(self.projfile, True)
+		self.assertEqual("a story which is edited.", proj.product_backlog[0].story)
+	# ### def test_cache_invalidate
+
+	def test_cache_after_write(self):
+		""" cache is refreshed by write """
+
+		proj = dpcore.read_project(self.projfile, True)
+		proj.product_backlog[0].point = 3
+		dpcore.write_project(self.projfile, proj, True)
+
+		proj = dpcore._load_project_cache(self.projfile, dpcore._get_file_identity(self.projfile))
+		self.assertTrue(proj is not None)
+		self.assertEqual(3, proj.product_backlog[0].point)
+	# ### def test_cache_after_write
+# ### class TestProjectCache
+
+
+
+if __name__ == '__main__':
+	unittest.main()
+
+# vim: ts=4 sw=4 ai nowarp
@@ -0,0 +1,118 @@
+
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import tempfile
+import unittest
+import yaml
+
+import testing_common
+
+import dpcore
+
+
+_sample_doc = """product-backlog:
+- story-id: CkhKPbtZP6sCVXnYoDkOTUw
+  story: story 1.
+  sub-story:
+  - story-id: CPQg8hovpmlR6oitUT0BmOQ
+    story: story 1.1.
+    task:
+    - t-id: TXziJidzClwYymTAjDlONQA
+      t: task 1 of story 1.1.
+    - t-id: TqLKHuBXvWV6KEbIPT8XUWw
+      t: task 2 of story 1.1.
+  demo-method: run demo.
+- story-id: Cqq28BRXWH70ZmfX60xVwPA
+  story: story 2.
+  task:
+  - t-id: TELS6qH02CTdclq1as7HhNw
+    t: task of story 2.
+"""
+
+
+class TestProjectIndex(unittest.TestCase):
+	""" test ID index sidecar file """
+
+	def setUp(self):
+		self.orig_rt_config = dpcore._rt_config
+		dpcore._rt_config = dpcore.RuntimeConfiguration("Test User", None, None)
+		self.workdir = tempfile.mkdtemp()
+		self.projfile = os.path.join(self.workdir, "dp.txt")
+		fp = open(self.projfile, "w")
+		fp.write(_sample_doc)
+		fp.close()
+		proj = dpcore.read_project(self.projfile)
+		dpcore.write_project(self.projfile, proj, True)
+		self.orig_get_file_identity = dpcore._get_file_identity
+	# ### def setUp
+
+	def tearDown(self):
+		dpcore._get_file_identity = self.orig_get_file_identity
+		dpcore._rt_config = self.orig_rt_config
+		shutil.rmtree(self.workdir)
+	# ### def tearDown
+
+	def test_lookup(self):
+		""" find text of objects """
+
+		kind, text, chain = dpcore.lookup_object_text(self.projfile, "TXziJidzClwYymTAjDlONQA")
+		self.assertEqual("task", kind)
+		self.assertEqual("    - t-id: TXziJidzClwYymTAjDlONQA\n      t: task 1 of story 1.1.\n", text)
+		self.assertEqual(("CkhKPbtZP6sCVXnYoDkOTUw", "CPQg8hovpmlR6oitUT0BmOQ",), chain)
+
+		kind, text, chain = dpcore.lookup_object_text(self.projfile, "CPQg8hovpmlR6oitUT0BmOQ")
+		self.assertEqual("story", kind)
+		self.assertTrue(text.endswith("      t: task 2 of story 1.1.\n"))
+
+		kind, text, chain = dpcore.lookup_object_text(self.projfile, "Cqq28BRXWH70ZmfX60xVwPA")
+		self.assertEqual(yaml.safe_load(_sample_doc)["product-backlog"][1], yaml.safe_load(text)[0])
+		self.assertEqual((), chain)
+
+		self.assertTrue(dpcore.lookup_object_text(self.projfile, "TNotExist") is None)
+	# ### def test_lookup
+
+	def test_outdated(self):
+		""" index is not used after project file modified """
+
+		fp = open(self.projfile, "a")
+		fp.write("- story 3.\n")
+		fp.close()
+
+		self.assertTrue(dpcore.lookup_object_text(self.projfile, "TXziJidzClwYymTAjDlONQA") is None)
+	# ### def test_outdated
+
+	def test_replaced_while_lookup(self):
+		""" text is not read from project file replaced after identity is taken """
+
+		def racing_get_file_identity(filename, content=None, digest=None):
+			r = self.orig_get_file_identity(filename, content, digest)
+			dpcore._replace_file(self.projfile, ["product-backlog:\n- story: story 0.\n", _sample_doc[len("product-backlog:\n"):],])
+			return r
+		dpcore._get_file_identity = racing_get_file_identity
+
+		r = dpcore.lookup_object_text(self.projfile, "TXziJidzClwYymTAjDlONQA")
+		self.assertTrue((r is None) or ("    - t-id: TXziJidzClwYymTAjDlONQA\n      t: task 1 of story 1.1.\n" == r[1]))
+	# ### def test_replaced_while_lookup
+
+	def test_rebuild_on_write(self):
+		""" index follows modified project """
+
+		proj = dpcore.read_project(self.projfile, False, True)
+		dpcore.command_mark_complete(proj, ["TXziJidzClwYymTAjDlONQA"])
+		dpcore.write_project(self.projfile, proj, True)
+
+		kind, text, chain = dpcore.lookup_object_text(self.projfile, "TXziJidzClwYymTAjDlONQA")
+		self.assertTrue("mark task as done." in text)
+		kind, text, chain = dpcore.lookup_object_text(self.projfile, "TELS6qH02CTdclq1as7HhNw")
+		self.assertEqual("  - t-id: TELS6qH02CTdclq1as7HhNw\n    t: task of story 2.\n", text)
+	# ### def test_rebuild_on_write
+# ### class TestProjectIndex
+
+
+
+if __name__ == '__main__':
+	unittest.main()
+
+# vim: ts=4 sw=4 ai nowarp
@@ -0,0 +1,178 @@
+
+# -*- coding: utf-8 -*-
+
+import datetime
+import sys
+import StringIO
+import unittest
+
+import testing_common
+
+import dpcore
+
+
+_sample_doc = """product-backlog:
+- story-id: CkhKPbtZP6sCVXnYoDkOTUw
+  story: story 1.
+  point: 8
+  sub-story:
+  - story-id: CPQg8hovpmlR6oitUT0BmOQ
+    story: sub-story of story 1.
+    task:
+    - t-id: TXziJidzClwYymTAjDlONQA
+      t: task 1.
+      point: 3
+      estimated-time: 4
+      status: DONE (2012-07-24 18:40:49)
+      log:
+      - l: mark task as done.
+        record-time: 2012-07-24 18:40:49
+        author: User A
+  task:
+  - t-id: TELS6qH02CTdclq1as7HhNw
+    t: task 2.
+    point: 5
+    estimated-time: 8
+    log:
+    - l: comment of task 2.
+      record-time: 2012-07-26 09:00:00
+      author: User B
+- story-id: Cqq28BRXWH70ZmfX60xVwPA
+  story: story 2.
+  task:
+  - t-id: T0TtvAXLuEqwZAQEwgZwZUA
+    t: task 3.
+    point: 1
+  - t-id: To9M2jIpZaArrAHYq38T40A
+    t: task 4.
+    point: 5
+    status: DONE (2012-07-30 09:00:00)
+    log:
+    - l: mark task as done.
+      record-time: 2012-07-30 09:00:00
+      author: User B
+"""
+
+
+class TestQuery(unittest.TestCase):
+	""" test query command and its filter terms """
+
+	def setUp(self):
+		self.orig_rt_config = dpcore._rt_config
+		dpcore._rt_config = dpcore.RuntimeConfiguration("Test User", None, None)
+		self.proj = dpcore._load_project_events(_sample_doc, True)
+	# ### def setUp
+
+	def tearDown(self):
+		dpcore._rt_config = self.orig_rt_config
+	# ### def tearDown
+
+	def _query(self, *args):
+		terms, limit, = dpcore.parse_query(args)
+		for idx in range(len(terms)):
+			if "under" == terms[idx][0]:
+				terms[idx] = ("under", "=", dpcore.find_object(self.proj, terms[idx][2]),)
+		result = []
+		for r in dpcore.iterate_query(self.proj, terms):
+			if isinstance(r, tuple):
+				result.append( (r[0].get_object_id(), r[1][1],) )
+			else:
+				result.append(r.get_object_id())
+		return result
+	# ### def _query
+
+	def test_parse(self):
+		""" filter terms are parsed and converted """
+
+		self.assertEqual(([("point", ">=", 3,), ("status", "=", "DONE",)], 2,), dpcore.parse_query(["point>=3", "status=done", "--limit", "2"]))
+		self.assertEqual(([("time", "<", datetime.datetime(2012, 8, 1, 0, 0, 0),)], None,), dpcore.parse_query(["time<2012-08-01 00:00:00"]))
+		for args in (["point>=three"], ["kind<task"], ["colour=red"], ["--limit"], ["status"],):
+			self.assertRaises(ValueError, dpcore.parse_query, args)
+	# ### def test_parse
+
+	def test_object_fields(self):
+		""" filter on status, point and estimated-time """
+
+		self.assertEqual(["TXziJidzClwYymTAjDlONQA", "To9M2jIpZaArrAHYq38T40A",], self._query("status=done"))
+		self.assertEqual(["TELS6qH02CTdclq1as7HhNw", "T0TtvAXLuEqwZAQEwgZwZUA",], self._query("status=open"))
+		self.assertEqual(["TELS6qH02CTdclq1as7HhNw", "T0TtvAXLuEqwZAQEwgZwZUA",], self._query("status!=done", "kind=task"))
+		self.assertEqual(["CkhKPbtZP6sCVXnYoDkOTUw", "TELS6qH02CTdclq1as7HhNw", "To9M2jIpZaArrAHYq38T40A",], self._query("point>3"))
+		self.assertEqual(["TELS6qH02CTdclq1as7HhNw",], self._query("status=open", "point>=3"))
+		self.assertEqual(["TXziJidzClwYymTAjDlONQA",], self._query("estimated-time<8"))
+		self.assertEqual(["CkhKPbtZP6sCVXnYoDkOTUw",], self._query("kind=story", "point!=1"))
+	# ### def test_object_fields
+
+	def test_log_fields(self):
+		""" filter on author and record time of log records """
+
+		self.assertEqual(["TELS6qH02CTdclq1as7HhNw", "To9M2jIpZaArrAHYq38T40A",], self._query("author=User B"))
+		self.assertEqual(["TELS6qH02CTdclq1as7HhNw",], self._query("author=User B", "time<2012-07-30"))
+		self.assertEqual([("To9M2jIpZaArrAHYq38T40A", u"mark task as done.",),], self._query("kind=log", "time>=2012-07-30"))
+	# ### def test_log_fields
+
+	def test_under(self):
+		""" filter on ancestry, with and without index lookup """
+
+		self.assertEqual(["CPQg8hovpmlR6oitUT0BmOQ", "TXziJidzClwYymTAjDlONQA", "TELS6qH02CTdclq1as7HhNw",], self._query("under=CkhKPbtZP6sCVXnYoDkOTUw"))
+		self.assertEqual(["TXziJidzClwYymTAjDlONQA",], self._query("under=CkhKPbtZP6sCVXnYoDkOTUw", "status=done"))
+		self.assertEqual(["To9M2jIpZaArrAHYq38T40A",], self._query("under=Cqq28BRXWH70ZmfX60xVwPA", "point>=3"))
+	# ### def test_under
+
+	def test_lazy(self):
+		""" results are generated on demand, unindexed query does not build everything """
+
+		terms, limit, = dpcore.parse_query(["kind=story"])
+		r = dpcore.iterate_query(self.proj, terms)
+		self.assertEqual("CkhKPbtZP6sCVXnYoDkOTUw", r.next().get_object_id())
+		self.assertFalse(self.proj.product_backlog[1].is_materialized())
+		self.assertTrue(self.proj._registry._field_index is None)
+	# ### def test_lazy
+
+	def test_index_refresh(self):
+		""" field index is dropped by modifying command """
+
+		self.assertEqual(["TXziJidzClwYymTAjDlONQA", "To9M2jIpZaArrAHYq38T40A",], self._query("status=done"))
+		self.assertFalse(self.proj._registry._field_index is None)
+		self.assertTrue(dpcore.run_command(self.proj, dpcore.command_mark_complete, ["T0Tt"], datetime.datetime(2012, 8, 1, 0, 0, 0)))
+		self.assertEqual(["TXziJidzClwYymTAjDlONQA", "T0TtvAXLuEqwZAQEwgZwZUA", "To9M2jIpZaArrAHYq38T40A",], self._query("status=done"))
+	# ### def test_index_refresh
+
+	def test_batch_index_refresh(self):
+		""" field index is dropped by modifying line of batch before query on the next line """
+
+		self.assertEqual(["TXziJidzClwYymTAjDlONQA", "To9M2jIpZaArrAHYq38T40A",], self._query("status=done"))
+		orig_stdout = sys.stdout
+		sys.stdout = StringIO.StringIO()
+		try:
+			self.assertTrue(dpcore.run_command(self.proj, dpcore.command_batch, ["done T0Tt", "query status=done"], datetime.datetime(2012, 8, 1, 0, 0, 0)))
+			output = sys.stdout.getvalue()
+		finally:
+			sys.stdout = orig_stdout
+		self.assertEqual(["TXziJidzClwYymTAjDlONQA", "T0TtvAXLuEqwZAQEwgZwZUA", "To9M2jIpZaArrAHYq38T40A",], [l.split(" ", 1)[0] for l in output.strip().split("\n")])
+		self.assertEqual("DONE (2012-08-01 00:00:00)", dpcore.find_object(self.proj, "T0TtvAXLuEqwZAQEwgZwZUA").status)
+	# ### def test_batch_index_refresh
+
+	def test_command(self):
+		""" command prints summaries up to limit """
+
+		orig_stdout = sys.stdout
+		sys.stdout = StringIO.StringIO()
+		try:
+			self.assertTrue(dpcore.command_query(self.proj, ["kind=task", "--limit", "2"]))
+			self.assertFalse(dpcore.command_query(self.proj, ["under=CNotExist"]))
+			output = sys.stdout.getvalue()
+		finally:
+			sys.stdout = orig_stdout
+		lines = output.strip().split("\n")
+		self.assertEqual(3, len(lines))
+		self.assertEqual("TXziJidzClwYymTAjDlONQA task DONE task 1.", lines[0])
+		self.assertTrue(lines[2].startswith("ERR:"))
+	# ### def test_command
+# ### class TestQuery
+
+
+
+if __name__ == '__main__':
+	unittest.main()
+
+# vim: ts=4 sw=4 ai nowarp
@@ -0,0 +1,115 @@
+
+# -*- coding: utf-8 -*-
+
+import unittest
+import yaml
+
+import testing_common
+
+import dpcore
+
+
+_sample_doc_a = """product-backlog:
+- story-id: CkhKPbtZP6sCVXnYoDkOTUw
+  story: story 1.
+  sub-story:
+  - story-id: CPQg8hovpmlR6oitUT0BmOQ
+    story: story 1.1.
+  task:
+  - t-id: TXziJidzClwYymTAjDlONQA
+    t: task of story 1.
+"""
+
+_sample_doc_b = """product-backlog:
+- story-id: Cqq28BRXWH70ZmfX60xVwPA
+  story: story 2.
+  task:
+  - t-id: TELS6qH02CTdclq1as7HhNw
+    t: task of story 2.
+"""
+
+
+class TestObjectRegistry(unittest.TestCase):
+	""" test ObjectRegistry and project-scoped object lookup """
+
+	def setUp(self):
+		self.orig_rt_config = dpcore._rt_config
+		dpcore._rt_config = dpcore.RuntimeConfiguration("Test User", None, None)
+	# ### def setUp
+
+	def tearDown(self):
+		dpcore._rt_config = self.orig_rt_config
+	# ### def tearDown
+
+	def test_side_by_side(self):
+		""" objects of projects loaded in one process are not mixed """
+
+		proj_a = dpcore._load_project_events(_sample_doc_a)
+		proj_b = dpcore._load_project_events(_sample_doc_b)
+
+		self.assertTrue(proj_a._registry is not proj_b._registry)
+		self.assertTrue(dpcore.find_object(proj_a, "TXziJidzClwYymTAjDlONQA") is not None)
+		self.assertTrue(dpcore.find_object(proj_a, "TELS6qH02CTdclq1as7HhNw") is None)
+		self.assertTrue(dpcore.find_object(proj_b, "TXziJidzClwYymTAjDlONQA") is None)
+		self.assertEqual(2, len(proj_a._registry.get_objects("story")))
+		self.assertEqual(1, len(proj_b._registry.get_objects("task")))
+	# ### def test_side_by_side
+
+	def test_reload(self):
+		""" registry of reloaded project does not keep objects of previous load """
+
+		for i in range(3):
+			proj = dpcore._load_project_events(_sample_doc_a)
+		self.assertEqual(2, len(proj._registry.stories))
+		self.assertEqual(1, len(proj._registry.tasks))
+	# ### def test_reload
+
+	def test_adopt(self):
+		""" object appended into another project is moved into registry of that project """
+
+		proj_a = dpcore._load_project_events(_sample_doc_a)
+		proj_b = dpcore._load_project_events(_sample_doc_b)
+
+		self.assertTrue(dpcore.command_add_task(proj_a, ["CPQg8hovpmlR6oitUT0BmOQ"]))
+		self.assertEqual(2, len(proj_a._registry.tasks))
+		self.assertEqual(1, len(proj_b._registry.tasks))
+
+		task = proj_b.product_backlog[0].subtask[0]
+		proj_a.product_backlog[0].append_subtask(task)
+		self.assertTrue(dpcore.find_object(proj_a, "TELS6qH02CTdclq1as7HhNw") is task)
+		self.assertTrue(proj_b._registry.find("TELS6qH02CTdclq1as7HhNw") is None)
+	# ### def test_adopt
+
+	def test_parent(self):
+		""" look up parent of objects """
+
+		proj = dpcore._load_project_events(_sample_doc_a)
+		registry = proj._registry
+		story = proj.product_backlog[0]
+
+		self.assertTrue(registry.get_parent(story) is None)
+		self.assertTrue(registry.get_parent(story.substory[0]) is story)
+		self.assertTrue(registry.get_parent(story.subtask[0]) is story)
+
+		dpcore.command_add_story(proj, ["CPQg8hovpmlR6oitUT0BmOQ"])
+		self.assertTrue(registry.get_parent(story.substory[0].substory[0]) is story.substory[0])
+	# ### def test_parent
+
+	def test_lazy_materialize(self):
+		""" lazily built objects are registered into owning project """
+
+		proj_a = dpcore._load_project_events(_sample_doc_a, True)
+		proj_b = dpcore._load_project_events(_sample_doc_b)
+
+		self.assertTrue(dpcore.find_object(proj_a, "TXziJidzClwYymTAjDlONQA") is not None)
+		self.assertTrue(proj_a._registry.find("TXziJidzClwYymTAjDlONQA") is not None)
+		self.assertTrue(proj_b._registry.find("TXziJidzClwYymTAjDlONQA") is None)
+	# ### def test_lazy_materialize
+# ### class TestObjectRegistry
+
+
+
+if __name__ == '__main__':
+	unittest.main()
+
+# vim: ts=4 sw=4 ai nowarp
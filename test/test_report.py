@@ -0,0 +1,132 @@
+
+# -*- coding: utf-8 -*-
+
+import datetime
+import sys
+import StringIO
+import unittest
+
+import testing_common
+
+import dpcore
+
+
+_sample_doc = """product-backlog:
+- story-id: CkhKPbtZP6sCVXnYoDkOTUw
+  story: story 1.
+  task:
+  - t-id: TXziJidzClwYymTAjDlONQA
+    t: task 1.
+    point: 3
+    estimated-time: 4
+    status: DONE (2012-07-24 18:40:49)
+  - t-id: TELS6qH02CTdclq1as7HhNw
+    t: task 2.
+    point: 5
+    status: DONE
+    log:
+    - l: mark task as done.
+      record-time: 2012-07-26 09:00:00
+      author: Test User
+    - l: comment after done.
+      record-time: 2012-07-28 09:00:00
+      author: Test User
+- story-id: Cqq28BRXWH70ZmfX60xVwPA
+  story: story 2.
+  task:
+  - t-id: T0TtvAXLuEqwZAQEwgZwZUA
+    t: task 3.
+    point: 2
+    estimated-time: 6
+  - t-id: To9M2jIpZaArrAHYq38T40A
+    t: task 4.
+    point: 1
+    status: DONE (2012-07-26 13:00:00)
+  - t-id: TqLKHuBXvWV6KEbIPT8XUWw
+    t: task 5.
+    status: DONE
+"""
+
+
+def _day(y, m, d):
+	return datetime.date(y, m, d).toordinal()
+# ### def _day
+
+
+class TestReport(unittest.TestCase):
+	""" test burndown and velocity report """
+
+	def setUp(self):
+		self.orig_rt_config = dpcore._rt_config
+		dpcore._rt_config = dpcore.RuntimeConfiguration("Test User", None, None)
+		self.proj = dpcore._load_project_events(_sample_doc, True)
+	# ### def setUp
+
+	def tearDown(self):
+		dpcore._rt_config = self.orig_rt_config
+	# ### def tearDown
+
+	def test_columns(self):
+		""" tasks are aggregated by status and completion days are found """
+
+		by_status, done_days, points, = dpcore.collect_report_columns(self.proj)
+		self.assertEqual({"DONE": [4, 9, 4,], "OPEN": [1, 2, 6,]}, by_status)
+		self.assertEqual([_day(2012, 7, 24), _day(2012, 7, 26), 0, _day(2012, 7, 26), 1,], list(done_days))
+		self.assertEqual([3, 5, 2, 1, 0,], list(points))
+	# ### def test_columns
+
+	def test_burndown(self):
+		""" per-day series of done and remaining work """
+
+		by_status, done_days, points, = dpcore.collect_report_columns(self.proj)
+		series = dpcore.compute_burndown(done_days, points, use_numpy=False)
+		self.assertEqual([
+				(_day(2012, 7, 24), 1, 3, 3, 3, 8,),
+				(_day(2012, 7, 25), 0, 0, 3, 3, 8,),
+				(_day(2012, 7, 26), 2, 6, 9, 1, 2,),
+			], series)
+
+		series = dpcore.compute_burndown(done_days, points, _day(2012, 7, 25), _day(2012, 7, 27), use_numpy=False)
+		self.assertEqual((_day(2012, 7, 25), 0, 0, 0, 3, 8,), series[0])
+		self.assertEqual((_day(2012, 7, 27), 0, 0, 6, 1, 2,), series[-1])
+		self.assertEqual([], dpcore.compute_burndown(done_days, points, _day(2012, 7, 27), _day(2012, 7, 25)))
+	# ### def test_burndown
+
+	@unittest.skipIf(dpcore._get_numpy() is None, "NumPy is not available")
+	def test_numpy(self):
+		""" vectorized series is identical """
+
+		by_status, done_days, points, = dpcore.collect_report_columns(self.proj)
+		for first_day, last_day, in ((None, None,), (_day(2012, 7, 25), _day(2012, 8, 3),),):
+			self.assertEqual(dpcore.compute_burndown(done_days, points, first_day, last_day, False), dpcore.compute_burndown(done_days, points, first_day, last_day, True))
+	# ### def test_numpy
+
+	def test_command(self):
+		""" report command of a story """
+
+		orig_stdout = sys.stdout
+		sys.stdout = StringIO.StringIO()
+		try:
+			self.assertTrue(dpcore.command_report(self.proj, ["Cqq2", "--until", "2012-07-27"]))
+			self.assertFalse(dpcore.command_report(self.proj, ["--since", "someday"]))
+			output = sys.stdout.getvalue()
+		finally:
+			sys.stdout = orig_stdout
+		self.assertEqual([
+				"status tasks points estimated-time",
+				"DONE 2 1 0",
+				"OPEN 1 2 6",
+				"date done-tasks done-points velocity-7d remaining-tasks remaining-points",
+				"2012-07-26 1 1 1 1 2",
+				"2012-07-27 0 0 1 1 2",
+				"ERR: need date for --since",
+			], output.strip().split("\n"))
+	# ### def test_command
+# ### class TestReport
+
+
+
+if __name__ == '__main__':
+	unittest.main()
+
+# vim: ts=4 sw=4 ai nowarp
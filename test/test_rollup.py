@@ -0,0 +1,185 @@
+
+# -*- coding: utf-8 -*-
+
+import datetime
+import os
+import shutil
+import sys
+import StringIO
+import tempfile
+import unittest
+
+import testing_common
+
+import dpcore
+
+
+_sample_doc = """product-backlog:
+- story-id: CkhKPbtZP6sCVXnYoDkOTUw
+  story: story 1.
+  sub-story:
+  - story-id: CPQg8hovpmlR6oitUT0BmOQ
+    story: sub-story of story 1.
+    task:
+    - t-id: TXziJidzClwYymTAjDlONQA
+      t: task 1.
+      point: 3
+      estimated-time: 4
+      status: DONE (2012-07-24 18:40:49)
+  task:
+  - t-id: TELS6qH02CTdclq1as7HhNw
+    t: task 2.
+    point: 5
+    estimated-time: 8
+    sub-task:
+    - t-id: T0TtvAXLuEqwZAQEwgZwZUA
+      t: sub-task of task 2.
+      point: 1
+      status: WIP
+- story-id: Cqq28BRXWH70ZmfX60xVwPA
+  story: story 2.
+  task:
+  - t-id: To9M2jIpZaArrAHYq38T40A
+    t: task 4.
+    point: 2
+"""
+
+
+def _to_tuple(rollup):
+	return (rollup.stories, rollup.tasks, rollup.done_tasks, rollup.points, rollup.done_points, rollup.estimated_time, rollup.done_estimated_time, rollup.status_count,)
+# ### def _to_tuple
+
+
+class TestRollup(unittest.TestCase):
+	""" test cached rollups of stories and tasks """
+
+	def setUp(self):
+		self.orig_rt_config = dpcore._rt_config
+		dpcore._rt_config = dpcore.RuntimeConfiguration("Test User", None, None)
+		self.tstamp = datetime.datetime(2012, 8, 1, 0, 0, 0)
+	# ### def setUp
+
+	def tearDown(self):
+		dpcore._rt_config = self.orig_rt_config
+	# ### def tearDown
+
+	def _check_consistent(self, proj):
+		""" cached rollups must be equal to the ones computed from scratch """
+
+		cached = [(obj, _to_tuple(obj._rollup),) for obj in dpcore.iterate_objects(proj) if obj._rollup is not None]
+		for obj in dpcore.iterate_objects(proj):
+			obj._rollup = None
+		for obj, r, in cached:
+			self.assertEqual(_to_tuple(dpcore.get_rollup(obj)), r)
+		self.assertEqual({}, dpcore._EMPTY_ROLLUP.status_count)
+		self.assertEqual(0, dpcore._EMPTY_ROLLUP.tasks)
+	# ### def _check_consistent
+
+	def test_load(self):
+		""" rollups are computed on load """
+
+		proj = dpcore._load_project_events(_sample_doc)
+		story1 = proj.product_backlog[0]
+		self.assertEqual((1, 3, 1, 9, 3, 12, 4, {"DONE": 1, "WIP": 1, "OPEN": 1},), _to_tuple(story1._rollup))
+		self.assertEqual((0, 1, 0, 1, 0, 0, 0, {"WIP": 1},), _to_tuple(story1.subtask[0]._rollup))
+		self.assertTrue(story1.subtask[0].subtask[0]._rollup is dpcore._EMPTY_ROLLUP)
+		r = dpcore.get_rollup(proj)
+		self.assertEqual((3, 4, 1, 11, 3, 12, 4, {"DONE": 1, "WIP": 1, "OPEN": 2},), _to_tuple(r))
+		self.assertEqual(8, r.get_remaining_points())
+		self.assertEqual(8, r.get_remaining_estimated_time())
+	# ### def test_load
+
+	def test_set_status(self):
+		""" status change is propagated through ancestors """
+
+		proj = dpcore._load_project_events(_sample_doc)
+		self.assertTrue(dpcore.run_command(proj, dpcore.command_mark_complete, ["T0Tt"], self.tstamp))
+		story1 = proj.product_backlog[0]
+		self.assertEqual((1, 3, 2, 9, 4, 12, 4, {"DONE": 2, "OPEN": 1},), _to_tuple(story1._rollup))
+		self.assertEqual({"DONE": 1}, story1.subtask[0]._rollup.status_count)
+		self._check_consistent(proj)
+	# ### def test_set_status
+
+	def test_append(self):
+		""" appended objects are added into ancestors """
+
+		proj = dpcore._load_project_events(_sample_doc)
+		story1 = proj.product_backlog[0]
+		leaf = story1.substory[0].subtask[0]
+		leaf.append_subtask(dpcore.Task(task="new sub-task.", point=7, status="DONE"))
+		self.assertFalse(leaf._rollup is dpcore._EMPTY_ROLLUP)
+		self.assertEqual((0, 1, 1, 7, 7, 0, 0, {"DONE": 1},), _to_tuple(leaf._rollup))
+
+		substory = dpcore.Story(story="new sub-story.")
+		substory.append_subtask([dpcore.Task(task="task A.", point=1), dpcore.Task(task="task B.", estimated_time=2)])
+		story1.append_substory(substory)
+		self.assertEqual((2, 6, 2, 17, 10, 14, 4, {"DONE": 2, "WIP": 1, "OPEN": 3},), _to_tuple(story1._rollup))
+		self._check_consistent(proj)
+	# ### def test_append
+
+	def test_cache(self):
+		""" rollups of project loaded from cache are not shared between objects """
+
+		workdir = tempfile.mkdtemp()
+		try:
+			projfile = os.path.join(workdir, "dp.txt")
+			fp = open(projfile, "w")
+			fp.write(_sample_doc)
+			fp.close()
+			dpcore.read_project(projfile, True)
+			proj = dpcore.read_project(projfile, True)
+		finally:
+			shutil.rmtree(workdir)
+		story1 = proj.product_backlog[0]
+		leaf_a = story1.substory[0].subtask[0]
+		leaf_b = story1.subtask[0].subtask[0]
+		self.assertTrue(leaf_a._rollup is dpcore._EMPTY_ROLLUP)
+		self.assertTrue(leaf_b._rollup is dpcore._EMPTY_ROLLUP)
+
+		leaf_a.append_subtask(dpcore.Task(task="new sub-task.", point=5))
+		self.assertEqual((0, 1, 0, 5, 0, 0, 0, {"OPEN": 1},), _to_tuple(leaf_a._rollup))
+		self.assertEqual((0, 0, 0, 0, 0, 0, 0, {},), _to_tuple(dpcore.get_rollup(leaf_b)))
+		self._check_consistent(proj)
+	# ### def test_cache
+
+	def test_lazy(self):
+		""" rollup of lazily loaded story is computed on request """
+
+		proj = dpcore._load_project_events(_sample_doc, True)
+		story2 = proj.product_backlog[1]
+		self.assertTrue(story2._rollup is None)
+		self.assertFalse(story2.is_materialized())
+		self.assertEqual((0, 1, 0, 2, 0, 0, 0, {"OPEN": 1},), _to_tuple(dpcore.get_rollup(story2)))
+		self.assertTrue(story2.is_materialized())
+
+		# not cached rollup is left alone
+		self.assertTrue(dpcore.run_command(proj, dpcore.command_mark_complete, ["TXzi"], self.tstamp))
+		self.assertTrue(proj.product_backlog[0]._rollup is None)
+		self.assertEqual(1, dpcore.get_rollup(proj.product_backlog[0]).done_tasks)
+	# ### def test_lazy
+
+	def test_status_command(self):
+		""" status command reports from rollup """
+
+		proj = dpcore._load_project_events(_sample_doc)
+		orig_stdout = sys.stdout
+		sys.stdout = StringIO.StringIO()
+		try:
+			self.assertTrue(dpcore.command_status(proj, ["CkhK"]))
+			output = sys.stdout.getvalue()
+		finally:
+			sys.stdout = orig_stdout
+		self.assertEqual([
+				"stories: 1",
+				"tasks: 3 (done: 1, open: 2)",
+				"points: 9 (done: 3, remaining: 6)",
+			], output.strip().split("\n"))
+	# ### def test_status_command
+# ### class TestRollup
+
+
+
+if __name__ == '__main__':
+	unittest.main()
+
+# vim: ts=4 sw=4 ai nowarp
@@ -0,0 +1,178 @@
+
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import sys
+import StringIO
+import tempfile
+import unittest
+
+import testing_common
+
+import dpcore
+
+
+_sample_doc = """product-backlog:
+- story-id: CkhKPbtZP6sCVXnYoDkOTUw
+  story: rebuild 指令，重建整份文件
+  task:
+  - t-id: TXziJidzClwYymTAjDlONQA
+    t: 檢查 story 標記下有沒有值
+    log:
+    - l: 重建文件時保留備份
+      record-time: 2012-07-24 18:40:49
+      author: Test User
+- story-id: Cqq28BRXWH70ZmfX60xVwPA
+  story: 寫出成 YAML 文件
+  note: write with yaml.serialize
+  task:
+  - t-id: TELS6qH02CTdclq1as7HhNw
+    t: 實作 write_dp_file()
+"""
+
+
+class TestTokenize(unittest.TestCase):
+	""" test tokenize_text() function """
+
+	def test_tokenize(self):
+		""" CJK bigrams and Latin words """
+
+		self.assertEqual([u"寫出", u"出成", u"yaml", u"文件",], dpcore.tokenize_text(u"寫出成 YAML 文件"))
+		self.assertEqual([u"write_dp_file", u"件",], dpcore.tokenize_text("write_dp_file() 件"))
+		self.assertEqual([], dpcore.tokenize_text(None))
+	# ### def test_tokenize
+# ### class TestTokenize
+
+
+class TestSearchIndex(unittest.TestCase):
+	""" test SearchIndex and search index sidecar file """
+
+	def setUp(self):
+		self.orig_rt_config = dpcore._rt_config
+		dpcore._rt_config = dpcore.RuntimeConfiguration("Test User", None, None)
+		self.workdir = tempfile.mkdtemp()
+		self.projfile = os.path.join(self.workdir, "dp.txt")
+		fp = open(self.projfile, "w")
+		fp.write(_sample_doc)
+		fp.close()
+		self.orig_get_search_entry = dpcore._get_search_entry
+	# ### def setUp
+
+	def tearDown(self):
+		dpcore._get_search_entry = self.orig_get_search_entry
+		dpcore._rt_config = self.orig_rt_config
+		shutil.rmtree(self.workdir)
+	# ### def tearDown
+
+	def _count_tokenized(self):
+		counter = []
+		def counting_get_search_entry(obj):
+			counter.append(obj.get_object_id())
+			return self.orig_get_search_entry(obj)
+		dpcore._get_search_entry = counting_get_search_entry
+		return counter
+	# ### def _count_tokenized
+
+	def _search(self, sidx, text):
+		return [objid for score, objid, kind, title, in sidx.search(text)]
+	# ### def _search
+
+	def test_search(self):
+		""" all tokens must match, objects are ranked """
+
+		sidx = dpcore.get_search_index(self.projfile)
+		self.assertEqual(["CkhKPbtZP6sCVXnYoDkOTUw", "Cqq28BRXWH70ZmfX60xVwPA", "TXziJidzClwYymTAjDlONQA",], sorted(self._search(sidx, u"文件")))
+		self.assertEqual(["Cqq28BRXWH70ZmfX60xVwPA",], self._search(sidx, u"yaml 文件"))
+		self.assertEqual(["TXziJidzClwYymTAjDlONQA",], self._search(sidx, u"備份"))
+		self.assertEqual(["TELS6qH02CTdclq1as7HhNw",], self._search(sidx, "write_dp_file"))
+		self.assertEqual([], self._search(sidx, u"不存在"))
+		self.assertEqual(["CkhKPbtZP6sCVXnYoDkOTUw", "TXziJidzClwYymTAjDlONQA",], sorted(self._search(sidx, u"重")))
+
+		r = sidx.search(u"重建")
+		self.assertEqual("CkhKPbtZP6sCVXnYoDkOTUw", r[0][1])
+		self.assertTrue(r[0][0] > r[1][0])
+	# ### def test_search
+
+	def test_single_character(self):
+		""" single CJK character matches both standalone character and bigrams """
+
+		proj = dpcore._load_project_events("""product-backlog:
+- story-id: CkhKPbtZP6sCVXnYoDkOTUw
+  story: 中
+- story-id: Cqq28BRXWH70ZmfX60xVwPA
+  story: 中文測試
+""")
+		sidx = dpcore.SearchIndex()
+		sidx.update(proj, dpcore._dump_project_chunks(proj))
+		self.assertEqual(["CkhKPbtZP6sCVXnYoDkOTUw", "Cqq28BRXWH70ZmfX60xVwPA",], sorted(self._search(sidx, u"中")))
+		self.assertEqual(["Cqq28BRXWH70ZmfX60xVwPA",], self._search(sidx, u"測"))
+	# ### def test_single_character
+
+	def test_incremental(self):
+		""" only changed chunks are tokenized on write """
+
+		proj = dpcore.read_project(self.projfile, True, True)
+		dpcore.command_rebuild(proj, [])
+		dpcore.write_project(self.projfile, proj, True)
+
+		counter = self._count_tokenized()
+		proj = dpcore.read_project(self.projfile, True, True)
+		proj.product_backlog[1].subtask[0].task = u"實作 dump_dp_file()"
+		dpcore.write_project(self.projfile, proj, True)
+		self.assertEqual(["Cqq28BRXWH70ZmfX60xVwPA", "TELS6qH02CTdclq1as7HhNw",], counter)
+
+		del counter[:]
+		sidx = dpcore.get_search_index(self.projfile)
+		self.assertEqual([], counter)
+		self.assertEqual(["TELS6qH02CTdclq1as7HhNw",], self._search(sidx, "dump_dp_file"))
+		self.assertEqual([], self._search(sidx, "write_dp_file"))
+		self.assertEqual(["TXziJidzClwYymTAjDlONQA",], self._search(sidx, u"備份"))
+	# ### def test_incremental
+
+	def test_project_index(self):
+		""" index kept with project starts from sidecar file and tokenizes only changed stories """
+
+		dpcore.get_search_index(self.projfile)
+		proj = dpcore.read_project(self.projfile, True, True)
+		dpcore.attach_search_index(self.projfile, proj)
+		counter = self._count_tokenized()
+		sidx = dpcore.get_project_search_index(proj)
+		self.assertEqual([], counter)
+		self.assertEqual(["TXziJidzClwYymTAjDlONQA",], self._search(sidx, u"備份"))
+
+		proj.product_backlog[1].subtask[0].task = u"實作 dump_dp_file()"
+		self.assertTrue(dpcore.get_project_search_index(proj) is sidx)
+		self.assertEqual(["Cqq28BRXWH70ZmfX60xVwPA", "TELS6qH02CTdclq1as7HhNw",], counter)
+		self.assertEqual(["TELS6qH02CTdclq1as7HhNw",], self._search(sidx, "dump_dp_file"))
+
+		del counter[:]
+		dpcore.get_project_search_index(proj)
+		self.assertEqual([], counter)
+	# ### def test_project_index
+
+	def test_command(self):
+		""" search command on loaded project """
+
+		proj = dpcore._load_project_events(_sample_doc, True)
+		orig_stdout = sys.stdout
+		sys.stdout = StringIO.StringIO()
+		try:
+			self.assertTrue(dpcore.command_search(proj, [u"文件".encode("utf-8"), "--limit", "1"]))
+			self.assertFalse(dpcore.command_search(proj, []))
+			output = sys.stdout.getvalue()
+		finally:
+			sys.stdout = orig_stdout
+		lines = output.strip().split("\n")
+		self.assertEqual(2, len(lines))
+		self.assertTrue(lines[0].split(" ", 1)[0] in ("CkhKPbtZP6sCVXnYoDkOTUw", "Cqq28BRXWH70ZmfX60xVwPA", "TXziJidzClwYymTAjDlONQA",))
+		self.assertTrue(lines[1].startswith("ERR:"))
+	# ### def test_command
+# ### class TestSearchIndex
+
+
+
+if __name__ == '__main__':
+	unittest.main()
+
+# vim: ts=4 sw=4 ai nowarp
@@ -0,0 +1,194 @@
+
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import testing_common
+
+import dpcore
+
+
+_sample_doc = """product-backlog:
+- story-id: CkhKPbtZP6sCVXnYoDkOTUw
+  story: a story with task.
+  task:
+  - t-id: TXziJidzClwYymTAjDlONQA
+    t: a task of story.
+- story-id: Cqq28BRXWH70ZmfX60xVwPA
+  story: 寫出成 YAML 文件
+"""
+
+_main_script = """
+import sys
+sys.path.insert(0, %r)
+import dpcore
+sys.argv = ["dp",] + sys.argv[1:]
+dpcore.main()
+"""
+
+
+class TestProjectServer(unittest.TestCase):
+	""" test ProjectServer and forward_command() """
+
+	def setUp(self):
+		self.workdir = tempfile.mkdtemp()
+		self.projfile = os.path.join(self.workdir, "dp.txt")
+		self.sockfile = dpcore._get_server_socket_filename(self.projfile)
+		fp = open(self.projfile, "w")
+		fp.write(_sample_doc)
+		fp.close()
+		self.orig_rt_config = dpcore._rt_config
+		dpcore._rt_config = dpcore.RuntimeConfiguration("Test User", self.projfile, None)
+	# ### def setUp
+
+	def tearDown(self):
+		dpcore._rt_config = self.orig_rt_config
+		shutil.rmtree(self.workdir)
+	# ### def tearDown
+
+	def _count_backup(self):
+		return len([fn for fn in os.listdir(self.workdir) if fn.startswith("dp.txt.") and fn[7:].isdigit()])
+	# ### def _count_backup
+
+	def _start_server(self, server):
+		t = threading.Thread(target=server.serve_forever)
+		t.start()
+		for i in range(50):
+			if os.path.exists(self.sockfile):
+				break
+			time.sleep(0.1)
+		return t
+	# ### def _start_server
+
+	def test_coalesce_write(self):
+		""" modifications are written once on flush """
+
+		server = dpcore.ProjectServer(self.projfile, self.sockfile, False, 60.0)
+		server.load()
+
+		r = server.handle_request({"command": "done", "args": ["TXziJidzClwYymTAjDlONQA"]})
+		self.assertTrue(r["result"])
+		r = server.handle_request({"command": "add-task", "args": ["CkhKPbtZP6sCVXnYoDkOTUw"]})
+		self.assertTrue(r["result"])
+		self.assertEqual(0, self._count_backup())
+		self.assertTrue(server.get_flush_timeout() > 0)
+
+		self.assertTrue(server.flush())
+		self.assertFalse(server.flush())
+		self.assertEqual(1, self._count_backup())
+
+		proj = dpcore.read_project(self.projfile)
+		self.assertTrue(dpcore._check_string_prefix(proj.product_backlog[0].subtask[0].status, "DONE"))
+	# ### def test_coalesce_write
+
+	def test_failed_command(self):
+		""" failed command report error and not modify project """
+
+		server = dpcore.ProjectServer(self.projfile, self.sockfile, False, 60.0)
+		server.load()
+
+		r = server.handle_request({"command": "done", "args": ["TNotExist"]})
+		self.assertFalse(r["result"])
+		self.assertTrue(r["output"].startswith("ERR:"))
+		self.assertTrue(server.get_flush_timeout() is None)
+	# ### def test_failed_command
+
+	def test_forward(self):
+		""" forward command through socket """
+
+		self.assertTrue(dpcore.forward_command(self.sockfile, "rebuild", []) is None)
+
+		server = dpcore.ProjectServer(self.projfile, self.sockfile, False, 60.0)
+		t = self._start_server(server)
+		try:
+			r = dpcore.forward_command(self.sockfile, "done", ["TXziJidzClwYymTAjDlONQA"], "Test User")
+			self.assertEqual((True, "",), r)
+		finally:
+			server.shutdown()
+			t.join()
+
+		self.assertFalse(os.path.exists(self.sockfile))
+		self.assertEqual(1, self._count_backup())
+	# ### def test_forward
+
+	def test_request_author(self):
+		""" username of request applies to that request only """
+
+		server = dpcore.ProjectServer(self.projfile, self.sockfile, False, 60.0)
+		server.load()
+		self.assertTrue(server.handle_request({"command": "done", "args": ["TXzi"], "username": "Client A"})["result"])
+		self.assertEqual("Test User", dpcore._rt_config.username)
+		self.assertTrue(server.handle_request({"command": "add-story", "args": ["CkhK"]})["result"])
+		self.assertEqual(["Client A", "Test User",], [p[3] for p in server.pending])
+		logrec = server.proj.product_backlog[0].subtask[0].logrecord[-1]
+		self.assertEqual("Client A", logrec.author)
+	# ### def test_request_author
+
+	def test_stalled_client(self):
+		""" connection which sends nothing is dropped after timeout """
+
+		orig_timeout = dpcore.ProjectServer.REQUEST_TIMEOUT
+		dpcore.ProjectServer.REQUEST_TIMEOUT = 0.2
+		server = dpcore.ProjectServer(self.projfile, self.sockfile, False, 60.0)
+		t = self._start_server(server)
+		stalled = None
+		try:
+			stalled = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+			stalled.connect(self.sockfile)
+			time.sleep(0.1)
+			r = dpcore.forward_command(self.sockfile, "done", ["TXziJidzClwYymTAjDlONQA"], "Test User")
+			self.assertEqual((True, "",), r)
+		finally:
+			if stalled is not None:
+				stalled.close()
+			server.shutdown()
+			t.join()
+			dpcore.ProjectServer.REQUEST_TIMEOUT = orig_timeout
+	# ### def test_stalled_client
+
+	def test_server_not_answering(self):
+		""" forward_command() gives up on server which does not answer """
+
+		sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		try:
+			sock.bind(self.sockfile)
+			sock.listen(1)
+			self.assertTrue(dpcore.forward_command(self.sockfile, "ls", [], "Test User", 0.2) is None)
+		finally:
+			sock.close()
+	# ### def test_server_not_answering
+
+	def test_forward_piped_output(self):
+		""" non-ASCII output of forwarded command is written into pipe """
+
+		fp = open(os.path.join(self.workdir, ".dprc"), "w")
+		fp.write("username: Test User\ndp-active: dp.txt\n")
+		fp.close()
+		server = dpcore.ProjectServer(self.projfile, self.sockfile, False, 60.0)
+		t = self._start_server(server)
+		try:
+			script = _main_script % (os.path.dirname(os.path.abspath(dpcore.__file__)),)
+			p = subprocess.Popen([sys.executable, "-c", script, "show", "Cqq2"], cwd=self.workdir, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+			out, err, = p.communicate()
+		finally:
+			server.shutdown()
+			t.join()
+		self.assertEqual(0, p.returncode, err)
+		self.assertTrue("寫出成 YAML 文件" in out)
+	# ### def test_forward_piped_output
+# ### class TestProjectServer
+
+
+
+if __name__ == '__main__':
+	unittest.main()
+
+# vim: ts=4 sw=4 ai nowarp
@@ -0,0 +1,99 @@
+
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import subprocess
+import unittest
+import yaml
+
+import testing_common
+
+import dpcore
+
+
+def _generate_project_text(story_count, task_count):
+	result = ["product-backlog:\n",]
+	for i in range(story_count):
+		result.append("- story-id: C%022d\n  story: story %d\n  task:\n" % (i, i,))
+		for j in range(task_count):
+			result.append("  - t-id: T%011d%011d\n    t: task %d of story %d\n    point: 3\n    log:\n    - l: mark task as done.\n      record-time: 2012-07-24 18:40:49\n      author: Test User\n" % (i, j, j, i,))
+	return "".join(result)
+# ### def _generate_project_text
+
+_measure_script = """
+import sys, resource
+sys.path.insert(0, %r)
+import dpcore
+dpcore._rt_config = dpcore.RuntimeConfiguration("Test User", None, None)
+srctext = sys.stdin.read()
+r = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+proj = dpcore.%s(srctext)
+sys.stdout.write(str(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - r))
+"""
+
+def _measure_peak_memory(loadfuncname, srctext):
+	""" get growth of peak RSS (in KB) when loading given project text in a new process """
+
+	script = _measure_script % (os.path.dirname(os.path.abspath(dpcore.__file__)), loadfuncname,)
+	p = subprocess.Popen([sys.executable, "-c", script], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+	out = p.communicate(srctext)[0]
+	return int(out)
+# ### def _measure_peak_memory
+
+
+class TestEventLoad(unittest.TestCase):
+	""" test _load_project_events() function """
+
+	def setUp(self):
+		self.orig_rt_config = dpcore._rt_config
+		dpcore._rt_config = dpcore.RuntimeConfiguration("Test User", None, None)
+	# ### def setUp
+
+	def tearDown(self):
+		dpcore._rt_config = self.orig_rt_config
+	# ### def tearDown
+
+	def _check_same_result(self, srctext):
+		proj_composed = dpcore._load_project_composed(srctext)
+		proj_events = dpcore._load_project_events(srctext)
+
+		self.assertEqual(yaml.serialize(dpcore.yamlnodedump_project(proj_composed)), yaml.serialize(dpcore.yamlnodedump_project(proj_events)))
+		self.assertEqual([s._source_chunk for s in proj_composed.product_backlog], [s._source_chunk for s in proj_events.product_backlog])
+	# ### def _check_same_result
+
+	def test_product_backlog(self):
+		""" load document with product-backlog """
+
+		self._check_same_result("product-backlog:\n- story: story 1\n  sub-story: [story 1.1]\n  task:\n  - t: task 1\n    point: '3'\n    sub-task: task 1.1\n    log: [log 1, {l: log 2, record-time: 2012-01-01 10:00:00}]\n- story 2\n")
+	# ### def test_product_backlog
+
+	def test_story_list(self):
+		""" load document with list of stories """
+
+		self._check_same_result("- story 1\n- story: story 2\n  note: |-\n    multiple line\n    note\n")
+	# ### def test_story_list
+
+	def test_single_story(self):
+		""" load document with one story """
+
+		self._check_same_result("story: story 1\ntask: [task 1, task 2]\n")
+	# ### def test_single_story
+
+	def test_peak_memory(self):
+		""" loading from events use less memory than composing whole document """
+
+		srctext = _generate_project_text(200, 10)
+		mem_composed = _measure_peak_memory("_load_project_composed", srctext)
+		mem_events = _measure_peak_memory("_load_project_events", srctext)
+
+		self.assertTrue(mem_events < mem_composed, "peak memory growth (KB): events=%d, composed=%d" % (mem_events, mem_composed,))
+	# ### def test_peak_memory
+# ### class TestEventLoad
+
+
+
+if __name__ == '__main__':
+	unittest.main()
+
+# vim: ts=4 sw=4 ai nowarp
@@ -0,0 +1,102 @@
+
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+import testing_common
+
+import dpcore
+
+
+_sample_doc = """product-backlog:
+- story-id: CkhKPbtZP6sCVXnYoDkOTUw
+  story: story 1.
+  task:
+  - t-id: TXziJidzClwYymTAjDlONQA
+    t: task of story 1.
+"""
+
+
+class TestAtomicWrite(unittest.TestCase):
+	""" test write_project() replaces project file atomically """
+
+	def setUp(self):
+		self.orig_rt_config = dpcore._rt_config
+		dpcore._rt_config = dpcore.RuntimeConfiguration("Test User", None, None)
+		self.workdir = tempfile.mkdtemp()
+		self.projfile = os.path.join(self.workdir, "dp.txt")
+		fp = open(self.projfile, "w")
+		fp.write(_sample_doc)
+		fp.close()
+		os.chmod(self.projfile, 0640)
+		self.orig_dump_project_chunks = dpcore._dump_project_chunks
+	# ### def setUp
+
+	def tearDown(self):
+		dpcore._dump_project_chunks = self.orig_dump_project_chunks
+		dpcore._rt_config = self.orig_rt_config
+		shutil.rmtree(self.workdir)
+	# ### def tearDown
+
+	def _read_projfile(self):
+		fp = open(self.projfile, "r")
+		c = fp.read()
+		fp.close()
+		return c
+	# ### def _read_projfile
+
+	def test_replace(self):
+		""" project file is replaced with same permission """
+
+		ino = os.stat(self.projfile).st_ino
+		proj = dpcore.read_project(self.projfile)
+		dpcore.command_mark_complete(proj, ["TXziJidzClwYymTAjDlONQA"])
+		self.assertTrue(dpcore.write_project(self.projfile, proj))
+
+		st = os.stat(self.projfile)
+		self.assertNotEqual(ino, st.st_ino)
+		self.assertEqual(0640, stat.S_IMODE(st.st_mode))
+		self.assertTrue("mark task as done." in self._read_projfile())
+		self.assertEqual(["dp.txt",], os.listdir(self.workdir))
+	# ### def test_replace
+
+	def test_symlink(self):
+		""" file pointed by symbolic link is replaced, the link is kept """
+
+		os.mkdir(os.path.join(self.workdir, "shared"))
+		realfile = os.path.join(self.workdir, "shared", "real.txt")
+		os.rename(self.projfile, realfile)
+		os.symlink(os.path.join("shared", "real.txt"), self.projfile)
+
+		proj = dpcore.read_project(self.projfile)
+		dpcore.command_mark_complete(proj, ["TXziJidzClwYymTAjDlONQA"])
+		self.assertTrue(dpcore.write_project(self.projfile, proj))
+
+		self.assertTrue(os.path.islink(self.projfile))
+		self.assertTrue("mark task as done." in self._read_projfile())
+		self.assertEqual(["real.txt",], os.listdir(os.path.join(self.workdir, "shared")))
+	# ### def test_symlink
+
+	def test_failed_write(self):
+		""" project file is kept when write failed """
+
+		proj = dpcore.read_project(self.projfile)
+		dpcore.command_mark_complete(proj, ["TXziJidzClwYymTAjDlONQA"])
+		dpcore._dump_project_chunks = lambda proj: [("product-backlog:\n", None,), (None, "story",)]
+
+		self.assertRaises(TypeError, dpcore.write_project, self.projfile, proj)
+		self.assertEqual(_sample_doc, self._read_projfile())
+		self.assertEqual(["dp.txt",], os.listdir(self.workdir))
+	# ### def test_failed_write
+# ### class TestAtomicWrite
+
+
+
+if __name__ == '__main__':
+	unittest.main()
+
+# vim: ts=4 sw=4 ai nowarp
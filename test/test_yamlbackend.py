@@ -0,0 +1,78 @@
+
+# -*- coding: utf-8 -*-
+
+import unittest
+import yaml
+
+import testing_common
+
+import dpcore
+
+
+_sample_doc = u"""product-backlog:
+- story-id: CkhKPbtZP6sCVXnYoDkOTUw
+  story: rebuild 指令，重建整份文件並補上時間等資訊
+  note: |-
+    * 讀取時依照傳統方式讀取
+    * 寫出時使用 yaml.Nodes 搭配 yaml.serialize 實作
+  order: high
+  point: 6
+  task:
+  - t-id: TXziJidzClwYymTAjDlONQA
+    t: 檢查 story 或 t 標記下有沒有值，沒有的話就不給定 ID
+    status: DONE
+    log:
+    - l: mark task as done.
+      record-time: 2012-07-24 18:40:49
+      author: Test User
+"""
+
+
+class TestYAMLBackend(unittest.TestCase):
+	""" test select_yaml_backend() and output of both backends """
+
+	def tearDown(self):
+		dpcore.select_yaml_backend()
+	# ### def tearDown
+
+	def test_select_python(self):
+		""" select pure-Python backend """
+
+		r = dpcore.select_yaml_backend(False)
+		self.assertEqual("python", r)
+		self.assertEqual("python", dpcore.get_yaml_backend())
+	# ### def test_select_python
+
+	def test_select_libyaml(self):
+		""" select libyaml backend (fall back to Python when not available) """
+
+		r = dpcore.select_yaml_backend(True)
+		if yaml.__with_libyaml__:
+			self.assertEqual("libyaml", r)
+		else:
+			self.assertEqual("python", r)
+		self.assertEqual(r, dpcore.get_yaml_backend())
+	# ### def test_select_libyaml
+
+	def test_identical_output(self):
+		""" both backends produce identical document """
+
+		result = []
+		for use_libyaml in (False, True,):
+			dpcore.select_yaml_backend(use_libyaml)
+			c = yaml.load(_sample_doc.encode("utf-8"), Loader=dpcore._yaml_loader)
+			proj = dpcore.load_project(c)
+			yml = yaml.serialize(dpcore.yamlnodedump_project(proj), Dumper=dpcore._yaml_dumper, encoding='utf-8', allow_unicode=True)
+			result.append(yml)
+
+		self.assertEqual(result[0], result[1])
+		self.assertEqual(_sample_doc.encode("utf-8"), result[0])
+	# ### def test_identical_output
+# ### class TestYAMLBackend
+
+
+
+if __name__ == '__main__':
+	unittest.main()
+
+# vim: ts=4 sw=4 ai nowarp